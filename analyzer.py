@@ -0,0 +1,189 @@
+import argparse
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from dataset import META_COLUMNS, is_dataset, iter_articles
+from fraud_scoring import score_texts
+from output_writer import CHUNK_SIZE, open_writer, read_chunks
+from sentiment import polarity_batch
+
+# The rules behind the dashboard's "Fraud Article Analyzer" tab, usable without the UI.
+# analyze_text / build_explanation score one text, analyze_texts scores a whole batch,
+# and the CLI streams a CSV or JSONL file through a process pool:
+#   python analyzer.py case_notes.csv --text-column notes --output scored.csv --workers 4
+# The input can also be the Parquet article dataset, optionally only recent partitions:
+#   python analyzer.py articles_dataset --since 2024-01-01
+
+RESULT_COLUMNS = ["keywords", "trend", "severity_score", "severity_level", "sentiment", "tone_label", "explanation"]
+
+
+# Sentiment is included as extra context about tone rather than as a risk driver
+def tone_label(sentiment):
+    if sentiment <= -0.3:
+        return "strongly negative and focused on incidents or losses"
+    elif sentiment >= 0.3:
+        return "more positive and focused on prevention or response"
+    return "neutral or analytical, closer to an explanation or investigation"
+
+
+# --- BATCH API ---
+# Keywords, trend and severity reuse the same scoring rules used for the ACFE articles,
+# and sentiment is TextBlob's polarity, each in one batched pass. Returns one result
+# dict per text, in order
+def analyze_texts(texts):
+    texts = pd.Series(list(texts), dtype=object).fillna("").astype(str)
+    scored = score_texts(texts)
+    results = []
+    for keywords, trend, score, level, sentiment in zip(
+        scored["keyword_list"], scored["trend"], scored["severity_score"], scored["severity_level"],
+        polarity_batch(texts.tolist()),
+    ):
+        sentiment = float(sentiment)
+        results.append({
+            "keywords": keywords,
+            "trend": trend,
+            "severity_score": float(score),
+            "severity_level": level,
+            "sentiment": sentiment,
+            "tone_label": tone_label(sentiment),
+        })
+    return results
+
+
+def analyze_text(text: str):
+    return analyze_texts([text])[0]
+
+
+def build_explanation(result):
+    # Turning the numeric output into a short narrative that is easier to talk through in a meeting
+    sev = result["severity_level"]
+    trend = result["trend"]
+    kws = result["keywords"]
+    score = result["severity_score"]
+    tone = result["tone_label"]
+
+    if sev == "High":
+        risk_line = (
+            f"This text is labeled as high severity with a score around {score:.2f} "
+            f"because it includes higher risk fraud language in our current rule set."
+        )
+        action_line = (
+            "In a real setting at USAA, this type of content could be a good candidate for a weekly fraud update "
+            "and for more detailed analyst review if it connects to ongoing cases."
+        )
+    elif sev == "Medium":
+        risk_line = (
+            f"This text is labeled as medium severity with a score around {score:.2f}. "
+            "It points to a meaningful fraud issue but not the highest tier in this simple scoring approach."
+        )
+        action_line = (
+            "For USAA, this type of text is useful for ongoing monitoring and helps show how this trend develops over time, "
+            "especially if similar stories begin to appear more often."
+        )
+    else:
+        risk_line = (
+            f"This text is labeled as low severity with a score around {score:.2f}. "
+            "It likely reflects general commentary, education, or lower impact fraud activity."
+        )
+        action_line = (
+            "For USAA, this kind of content is more helpful for background context and training rather than immediate response."
+        )
+
+    if kws:
+        kw_line = (
+            f"The main fraud terms that influence this assessment are: {', '.join(kws)}."
+        )
+    else:
+        kw_line = (
+            "None of the core fraud terms in the current rule set were detected, "
+            "so the assessment is mainly driven by general language instead of specific keywords."
+        )
+
+    tone_line = f"The overall tone of the text appears {tone}."
+    trend_line = (
+        f"Based on the words used, this text is most closely aligned with the {trend} trend category in the dashboard."
+    )
+
+    explanation = " ".join([risk_line, trend_line, kw_line, tone_line, action_line])
+    return explanation
+
+
+# --- CHUNK WORKER ---
+# Scores one chunk of the input file. Runs in a worker process, so it takes and
+# returns plain frames: the input columns plus RESULT_COLUMNS
+def analyze_chunk(chunk, text_column):
+    results = analyze_texts(chunk[text_column])
+    for result in results:
+        result["explanation"] = build_explanation(result)
+        result["keywords"] = ", ".join(result["keywords"])
+    scored = pd.DataFrame(results, columns=RESULT_COLUMNS, index=chunk.index)
+    return pd.concat([chunk.drop(columns=RESULT_COLUMNS, errors="ignore"), scored], axis=1)
+
+
+# Run analyze_chunk over a stream of chunks and yield the scored chunks in input order.
+# workers <= 1 runs inline. At most max_in_flight chunks are queued at once, so memory
+# stays bounded however large the input file is
+def analyze_chunks(chunks, text_column, workers=1, max_in_flight=None):
+    if workers <= 1:
+        for chunk in chunks:
+            yield analyze_chunk(chunk, text_column)
+        return
+
+    max_in_flight = max_in_flight or workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(analyze_chunk, chunk, text_column))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV or JSONL file of texts with the fraud analyzer rules")
+    parser.add_argument("input", help="a .csv or .jsonl file, or a Parquet dataset directory")
+    parser.add_argument("--text-column", default="text", help="column holding the text to score")
+    parser.add_argument("--output", default="analyzed.csv", help="a .csv or .jsonl file, written as chunks finish")
+    parser.add_argument("--workers", type=int, default=1, help="processes used for scoring (1 = inline)")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="rows read and scored at a time")
+    parser.add_argument("--since", help="dataset input only: skip partitions scraped before this date (YYYY-MM-DD)")
+    return parser.parse_args(argv)
+
+
+# Dataset input reads the metadata plus the one text column; --since is pushed down
+# so older partitions are never opened
+def input_chunks(args):
+    if not is_dataset(args.input):
+        return read_chunks(args.input, chunksize=args.chunksize)
+    columns = [c for c in META_COLUMNS if c != "text_hash" and c != args.text_column] + [args.text_column]
+    filters = [("scrape_date", ">=", args.since)] if args.since else None
+    return iter_articles(args.input, columns=columns, filters=filters, chunksize=args.chunksize)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    rows = 0
+    writer = None
+    try:
+        for scored in analyze_chunks(input_chunks(args), args.text_column, args.workers):
+            if writer is None:
+                writer = open_writer(args.output, list(scored.columns), truncate=True)
+            writer.write_rows(scored.astype(object).where(scored.notna(), None).to_dict("records"))
+            rows += len(scored)
+            print(f"Scored {rows} rows...")
+    finally:
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ Scored {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed > 0 else 0:.0f} rows/sec).")
+    print(f"💾 Saved as {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import bs4
+
+from fraud_scoring import detect_keywords
+
+# The CPU-heavy part of the scraper: HTML parsing and keyword detection. Everything
+# here is a plain function of the page HTML so it can run in worker processes.
+# Summaries are added later, in batches, by summarizer.py
+
+PARSERS = ["html.parser", "lxml"]
+
+
+# --- EXTRACTORS ---
+# What to read off an article page, as simple CSS selectors: a tag name, classes, or
+# both ("h1", "h5.margin-top-1", "div.cell.large-8", ".byline"). Each source compiles
+# its selectors once into an Extractor, a small picklable value that worker processes
+# can use as is
+def compile_selector(selector):
+    if not selector:
+        return None
+    if not re.fullmatch(r"[A-Za-z][\w-]*(\.[\w-]+)*|(\.[\w-]+)+", selector.strip()):
+        raise ValueError(f"Unsupported selector {selector!r}, expected tag, tag.class or .class")
+    tag, *classes = selector.strip().split(".")
+    return tag or None, frozenset(classes)
+
+
+def _matches(rule, name, classes):
+    tag, wanted = rule
+    return (tag is None or tag == name) and wanted <= classes
+
+
+@dataclass(frozen=True)
+class Extractor:
+    title: tuple
+    body: tuple
+    author: tuple = None
+
+    @classmethod
+    def from_selectors(cls, title, body, author=None):
+        return cls(compile_selector(title), compile_selector(body), compile_selector(author))
+
+    @property
+    def rules(self):
+        return [rule for rule in (self.title, self.author, self.body) if rule is not None]
+
+    # The first element matching rule, in document order
+    def find(self, soup, rule):
+        if rule is None:
+            return None
+        for element in soup.find_all(rule[0] or True):
+            if _matches(rule, element.name, set(element.get("class") or ())):
+                return element
+        return None
+
+
+# The ACFE Insights Blog article layout, also used for pages of unknown sources
+ACFE_EXTRACTOR = Extractor.from_selectors(title="h1", body="div.cell.large-8", author="h5.margin-top-1")
+
+
+# --- PARTIAL PARSING ---
+# The scraper only ever reads the title, author and body elements. This strainer tells
+# Beautiful Soup to skip building tree nodes for everything else on the page
+# (navigation, footer, scripts)
+class ArticleStrainer(bs4.SoupStrainer):
+    def __init__(self, extractor=ACFE_EXTRACTOR):
+        super().__init__()
+        self.extractor_rules = extractor.rules
+
+    @property
+    def includes_everything(self):
+        return False
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        classes = (attrs or {}).get("class", "")
+        if not isinstance(classes, str):
+            classes = " ".join(classes)
+        classes = set(classes.split())
+        return any(_matches(rule, name, classes) for rule in self.extractor_rules)
+
+    def allow_string_creation(self, string):
+        return False
+
+
+# --- PARSE ---
+# Pull the title, author and body text out of one article page
+def parse_article(html, parser="html.parser", strain=True, extractor=ACFE_EXTRACTOR):
+    souped_article = bs4.BeautifulSoup(html, parser, parse_only=ArticleStrainer(extractor) if strain else None)
+
+    article_title = extractor.find(souped_article, extractor.title)
+    article_author = extractor.find(souped_article, extractor.author)
+    article_body = extractor.find(souped_article, extractor.body)
+
+    if not article_title or not article_body:
+        return None
+
+    return {
+        'title': article_title.get_text(strip=True),
+        'author': article_author.get_text(strip=True) if article_author else "Unknown",
+        'text': article_body.get_text(separator=' ', strip=True),
+    }
+
+
+# --- ONE PAGE ---
+# Parse and detect keywords on one page. Returns the parsed article (or None when
+# the page is missing content), the keywords found, and the output row (still
+# without a summary) when the article is fraud-related. Errors come back as a string so they survive the trip between processes,
+# and so do the parse and detect times, since a worker process cannot record its own metrics
+def process_page(html, url, parser="html.parser", strain=True, extractor=ACFE_EXTRACTOR):
+    timings = {}
+    try:
+        start = time.perf_counter()
+        article = parse_article(html, parser=parser, strain=strain, extractor=extractor)
+        timings['parse'] = time.perf_counter() - start
+        if article is None:
+            return {'article': None, 'keywords': [], 'row': None, 'error': None, 'timings': timings}
+        start = time.perf_counter()
+        keywords = detect_keywords(article['text'])
+        timings['detect'] = time.perf_counter() - start
+        row = None
+        if keywords:
+            row = {
+                'title': article['title'],
+                'author': article['author'],
+                'url': url,
+                'text': article['text'],
+                'keywords_found': ', '.join(keywords),
+            }
+        return {'article': {'title': article['title']}, 'keywords': keywords, 'row': row, 'error': None, 'timings': timings}
+    except Exception as e:
+        return {'article': None, 'keywords': [], 'row': None, 'error': f"{type(e).__name__}: {e}", 'timings': timings}
+
+
+# --- PROCESS POOL ---
+# Run process_page over a stream of (key, html, url) or (key, html, url, extractor) jobs
+# and yield (key, result) in the same order. Jobs with html None are passed straight through with a None result,
+# so callers can keep pages that need no parsing in the same ordered stream.
+# workers <= 1 runs inline, which is cheaper for small crawls. At most max_in_flight
+# pages are queued at once so memory stays bounded
+def process_pages(jobs, workers=1, parser="html.parser", strain=True, max_in_flight=None):
+    jobs = (job if len(job) == 4 else (*job, ACFE_EXTRACTOR) for job in jobs)
+    if workers <= 1:
+        for key, html, url, extractor in jobs:
+            yield key, None if html is None else process_page(html, url, parser, strain, extractor)
+        return
+
+    max_in_flight = max_in_flight or workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for key, html, url, extractor in jobs:
+            future = None if html is None else pool.submit(process_page, html, url, parser, strain, extractor)
+            pending.append((key, future))
+            if len(pending) >= max_in_flight:
+                key_done, future = pending.popleft()
+                yield key_done, future and future.result()
+        while pending:
+            key_done, future = pending.popleft()
+            yield key_done, future and future.result()
@@ -0,0 +1,767 @@
+import argparse
+import contextlib
+import html
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import article_parser
+import embeddings
+import fraud_scoring
+import rollups
+import search_index
+import sentiment
+import summarizer
+
+# Micro benchmarks for the hot paths of the pipeline. Run one with
+#   python benchmark.py scoring --n 100000
+# and the regression suite, which replays the recorded pages end to end and fails when
+# anything got slower than the saved baseline, with
+#   python benchmark.py suite --save-baseline     (once, on the machine that runs it)
+#   python benchmark.py suite --rows 10000 100000 1000000
+
+
+# --- SYNTHETIC DATA ---
+FILLER_WORDS = (
+    "the organization reported that internal controls auditors reviewed payments vendor "
+    "accounts employees management investigation losses customers board policy risk"
+).split()
+PHRASES = fraud_scoring.FRAUD_KEYWORDS + ["phishing", "ransomware", "corruption", "irregularity"]
+
+
+def synthetic_articles(n, words_per_article=300, seed=0):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        words = [rng.choice(FILLER_WORDS) for _ in range(words_per_article)]
+        for _ in range(rng.randint(0, 4)):
+            words.insert(rng.randrange(len(words)), rng.choice(PHRASES))
+        texts.append(" ".join(words))
+    return pd.Series(texts)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+# --- LEGACY SCORING ---
+# The row-by-row .apply chain the dashboard used before fraud_scoring, kept here as the baseline
+def legacy_detect(body_text):
+    body_lower = body_text.lower()
+    return [kw for kw in fraud_scoring.FRAUD_KEYWORDS if kw.lower() in body_lower]
+
+
+def legacy_trend(keywords_str):
+    ks = str(keywords_str).lower()
+    if "money laundering" in ks:
+        return "Money Laundering"
+    if "embezzlement" in ks:
+        return "Embezzlement"
+    if "bribery" in ks:
+        return "Bribery or Corruption"
+    if "scam" in ks or "fraud investigation" in ks:
+        return "Scams or Fraud Cases"
+    if ks.strip() == "":
+        return "Uncategorized"
+    return "General Fraud"
+
+
+def legacy_severity(keyword_list):
+    score = 0.0
+    for kw in keyword_list:
+        score += fraud_scoring.keyword_weight(kw)
+    return max(0.0, min(score, 1.0))
+
+
+def legacy_bucket(score):
+    if score >= 0.7:
+        return "High"
+    elif score >= 0.3:
+        return "Medium"
+    return "Low"
+
+
+def legacy_detect_chain(texts):
+    return texts.apply(lambda t: ", ".join(legacy_detect(t)))
+
+
+def legacy_derived_chain(keywords_found):
+    df = pd.DataFrame({"keywords_found": keywords_found})
+    df["trend"] = df["keywords_found"].apply(legacy_trend)
+    df["keyword_list"] = df["keywords_found"].apply(
+        lambda s: [kw.strip().lower() for kw in str(s).split(",") if kw.strip()]
+    )
+    df["keyword_count"] = df["keyword_list"].apply(len)
+    df["severity_score"] = df["keyword_list"].apply(legacy_severity)
+    df["severity_level"] = df["severity_score"].apply(legacy_bucket)
+    return df
+
+
+def legacy_chain(texts):
+    return legacy_derived_chain(legacy_detect_chain(texts))
+
+
+# --- BENCHMARKS ---
+def bench_scoring(args):
+    texts = synthetic_articles(args.n)
+    n = len(texts)
+    print(f"Scoring {n} synthetic articles (~300 words each)")
+
+    keywords_found, detect_s = timed(legacy_detect_chain, texts)
+    legacy, derived_s = timed(legacy_derived_chain, keywords_found)
+    vectorized, vectorized_s = timed(fraud_scoring.score_texts, texts)
+    _, strings_s = timed(fraud_scoring.score_keyword_strings, keywords_found)
+
+    print("  from raw text (scraper, analyzer)")
+    print(f"    legacy .apply chain         {detect_s + derived_s:8.2f}s  {n / (detect_s + derived_s):10.0f} articles/sec")
+    print(f"    score_texts                 {vectorized_s:8.2f}s  {n / vectorized_s:10.0f} articles/sec")
+    print("  from stored keywords_found (dashboard load)")
+    print(f"    legacy .apply chain         {derived_s:8.2f}s  {n / derived_s:10.0f} rows/sec")
+    print(f"    score_keyword_strings       {strings_s:8.2f}s  {n / strings_s:10.0f} rows/sec")
+
+    # The word boundary matcher is stricter than plain substring search, so report agreement
+    # instead of asserting it
+    agree = (legacy["severity_level"] == vectorized["severity_level"]).mean()
+    print(f"  severity level agreement with legacy: {agree:.1%}")
+
+
+def bench_search(args):
+    texts = synthetic_articles(args.n, words_per_article=200)
+    scored = fraud_scoring.score_texts(texts)
+    df = pd.DataFrame({
+        "url": [f"article-{i}" for i in range(len(texts))],
+        "title": "", "summary": "", "text": texts,
+        "keywords_found": scored["keywords_found"],
+    })
+    print(f"Keyword filter and search over {len(df)} synthetic articles")
+
+    index, build_s = timed(search_index.build_index, df.to_dict("records"))
+    keyword_index = search_index.keyword_postings(scored["keyword_list"])
+    print(f"  index build (once per data version)  {build_s:8.2f}s")
+
+    _, scan_s = timed(lambda: df["keywords_found"].str.contains("bribery", case=False))
+    _, postings_s = timed(lambda: keyword_index.get("bribery"))
+    print(f"  keyword filter, str.contains scan    {scan_s * 1000:8.2f} ms")
+    print(f"  keyword filter, postings lookup      {postings_s * 1000:8.2f} ms")
+
+    _, text_scan_s = timed(lambda: df["text"].str.contains(r"money\s+laundering", case=False))
+    _, phrase_s = timed(index.search, '"money laundering"')
+    _, terms_s = timed(index.search, "bribery embezzlement", 20)
+    print(f"  phrase, regex scan over text         {text_scan_s * 1000:8.2f} ms")
+    print(f"  phrase, positional index + BM25      {phrase_s * 1000:8.2f} ms")
+    print(f"  two terms, BM25 top 20               {terms_s * 1000:8.2f} ms")
+
+
+# The Overview tab before rollups: value_counts, a Counter over keyword_list and a
+# crosstab over the filtered frame on every rerun
+def legacy_overview(filtered):
+    from collections import Counter
+
+    severity = filtered["severity_level"].value_counts().reindex(["High", "Medium", "Low"]).fillna(0)
+    trends = filtered["trend"].value_counts()
+    crosstab = pd.crosstab(filtered["trend"], filtered["severity_level"])
+    keywords = Counter(kw for kws in filtered["keyword_list"] for kw in kws)
+    return severity, trends, crosstab, keywords.most_common(5)
+
+
+def bench_overview(args):
+    texts = synthetic_articles(args.n, words_per_article=100)
+    df = fraud_scoring.score_texts(texts)
+    print(f"Overview aggregates over {len(df)} synthetic articles")
+
+    cubes, build_s = timed(rollups.Rollups, df)
+    print(f"  cube build (once per data version)   {build_s:8.2f}s")
+    keyword = df["keyword_list"].explode().mode()[0]
+    for label, trend, keyword_filter in (("no filters", None, None), ("trend + keyword", "General Fraud", keyword)):
+        mask = pd.Series(True, index=df.index)
+        if trend:
+            mask &= df["trend"] == trend
+        if keyword_filter:
+            mask &= df["keyword_list"].map(lambda kws: keyword_filter in kws)
+        _, legacy_s = timed(legacy_overview, df[mask])
+        _, cube_s = timed(cubes.query, trend, None, keyword_filter)
+        print(f"  {label:<16} filtered frame    {legacy_s * 1000:8.2f} ms")
+        print(f"  {label:<16} cube query        {cube_s * 1000:8.2f} ms")
+
+
+# --- RECORDED PAGES ---
+# articles.csv holds the h1, h5 and body div of each article as raw HTML. Wrapping them
+# in the header and footer of the saved blog index (acfe_blog.txt) gives pages about
+# the size and shape of what the scraper really downloads
+def recorded_pages(articles_path="articles.csv", blog_path="acfe_blog.txt"):
+    with open(blog_path, encoding="utf-8") as f:
+        blog = f.read()
+    header = blog[:blog.index('<div class="grid-x grid-margin-x results"')]
+    footer = blog[blog.index("</main>"):]
+    fragments = pd.read_csv(articles_path).fillna("")
+    return [
+        header + row["title"] + row["author"] + row["text"] + footer
+        for _, row in fragments.iterrows()
+    ]
+
+
+def bench_parse(args):
+    pages = recorded_pages()
+    pages = (pages * (args.repeat))[: args.n or None]
+    jobs = [(i, html, f"page-{i}") for i, html in enumerate(pages)]
+    print(f"Parsing {len(pages)} recorded pages (avg {sum(map(len, pages)) / len(pages) / 1024:.0f} KB)")
+
+    for parser in article_parser.PARSERS:
+        for strain in (False, True):
+            for workers in args.workers:
+                _, elapsed = timed(lambda: list(article_parser.process_pages(jobs, workers, parser, strain)))
+                label = f"{parser:<11} {'strained' if strain else 'full tree':<9} workers={workers:<2}"
+                print(f"  {label}  {elapsed:7.2f}s  {len(pages) / elapsed:8.1f} pages/sec")
+
+
+# --- SUMMARIZERS ---
+# Cold runs start from an empty summary cache, warm runs repeat the same batch so every
+# article is a cache hit
+def bench_summarize(args):
+    df = pd.read_csv("fraud_articles_summarized.csv").fillna("")
+    texts = df["text"].tolist() * args.repeat
+    keyword_lists = [fraud_scoring.detect_keywords(t) for t in texts]
+    print(f"Summarizing {len(texts)} articles from fraud_articles_summarized.csv")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            s = summarizer.Summarizer(backend, cache_path=os.path.join(tmp, f"{backend}.sqlite"))
+            _, cold_s = timed(s.summarize_batch, texts, keyword_lists)
+            cold_p50, cold_p95 = s.percentile(50), s.percentile(95)
+            s.latencies.clear()
+            _, warm_s = timed(s.summarize_batch, texts, keyword_lists)
+            print(f"  {backend:<13} cold {cold_s:7.2f}s  p50 {cold_p50 * 1000:7.2f} ms  p95 {cold_p95 * 1000:7.2f} ms")
+            print(f"  {'':<13} warm {warm_s:7.2f}s  p50 {s.percentile(50) * 1000:7.2f} ms  p95 {s.percentile(95) * 1000:7.2f} ms")
+            s.close()
+
+
+# --- SENTIMENT ---
+# Parity with TextBlob on the stored titles, summaries and bodies, then throughput.
+# Exits non-zero when the fast path disagrees, so it doubles as the parity check
+# Fast polarity against TextBlob on every stored title, summary and body. Fails when
+# more than max_mismatch of the texts differ by over tolerance, or any by over
+# max_diff. Returns the texts and the absolute differences
+def sentiment_parity(tolerance=1e-9, max_mismatch=0.0, max_diff=1e-6):
+    from textblob import TextBlob
+
+    df = pd.read_csv("fraud_articles_summarized.csv").fillna("")
+    texts = df["title"].tolist() + df["summary"].tolist() + df["text"].tolist()
+    expected = np.array([TextBlob(t).sentiment.polarity for t in texts])
+    diff = np.abs(expected - sentiment.polarity_batch(texts))
+    mismatch = (diff > tolerance).mean()
+    print(f"Parity on {len(texts)} stored texts: max |diff| {diff.max():.2e}, "
+          f"{mismatch:.1%} over {tolerance:g}")
+    if mismatch > max_mismatch or diff.max() > max_diff:
+        raise SystemExit(f"Sentiment parity check failed: {mismatch:.1%} of texts over {tolerance:g} "
+                         f"(allowed {max_mismatch:.1%}), max |diff| {diff.max():.2e} (allowed {max_diff:g})")
+    return df, diff
+
+
+def bench_sentiment(args):
+    from textblob import TextBlob
+
+    df, _ = sentiment_parity(args.tolerance, args.max_mismatch, args.max_diff)
+
+    bodies = df["text"].tolist() * args.repeat
+    print(f"Throughput over {len(bodies)} article bodies")
+    _, textblob_s = timed(lambda: [TextBlob(t).sentiment.polarity for t in bodies])
+    _, fast_s = timed(sentiment.polarity_batch, bodies)
+    print(f"  TextBlob per row       {textblob_s:8.2f}s  {len(bodies) / textblob_s:10.0f} texts/sec")
+    print(f"  polarity_batch         {fast_s:8.2f}s  {len(bodies) / fast_s:10.0f} texts/sec")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = sentiment.SentimentCache(os.path.join(tmp, "sentiment.sqlite"))
+        sentiment.cached_polarity_batch(bodies, cache)
+        _, cached_s = timed(sentiment.cached_polarity_batch, bodies, cache)
+        cache.close()
+    print(f"  cached_polarity_batch  {cached_s:8.2f}s  {len(bodies) / cached_s:10.0f} texts/sec (all hits)")
+
+
+# --- REGRESSION SUITE ---
+# Each case runs real pipeline code against local stand-ins (fakes.serve_pages for the
+# website, fakes.FakeSupabase for the database) and reports one throughput number.
+# Results go to a JSON file, and --baseline compares every case with a saved run
+DEFAULT_RESULTS_PATH = "benchmark_results.json"
+DEFAULT_BASELINE_PATH = "benchmark_baseline.json"
+
+# Columns kept in the scaled-up tables. Bodies are left out so a million rows fit in
+# memory; the crawl and scrape cases cover the HTML side with the real pages
+SCALED_COLUMNS = ["title", "author", "url", "keywords_found", "summary", "sentiment", "cluster_id"]
+
+
+# The stored articles repeated up to n rows, each copy with its own url
+def scaled_rows(n):
+    df = pd.read_csv("fraud_articles_summarized.csv")
+    df = df[[c for c in SCALED_COLUMNS if c in df.columns]]
+    copies = np.arange(n) // len(df)
+    df = df.iloc[np.arange(n) % len(df)].reset_index(drop=True)
+    df["url"] = df["url"] + "&copy=" + pd.Series(copies).astype(str)
+    return df
+
+
+# Index pages shaped like the recorded one, each listing its own set of article links
+def recorded_index_pages(n_pages, blog_path="acfe_blog.txt"):
+    with open(blog_path, encoding="utf-8") as f:
+        blog = f.read()
+    return [blog.replace("blog-detail?s=", f"blog-detail?s=p{page}-") for page in range(1, n_pages + 1)]
+
+
+# Run a CLI main() without its console output
+def quietly(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+# Serve --index-pages recorded index pages and crawl them into tmp. Returns the seconds
+# it took and the article URLs found
+def serve_and_crawl(args, tmp, extra_argv=()):
+    import scrape_blog
+    from fakes import serve_pages
+
+    pages = recorded_index_pages(args.index_pages)
+    served = {"/blog": pages[0], **{f"/blog?page={n}": html for n, html in enumerate(pages[1:], start=2)}}
+    with serve_pages(served) as (_, base):
+        _, elapsed = timed(quietly, scrape_blog.main, [
+            "--start", base + "/blog", "--page-url", base + "/blog?page={page}",
+            "--max-pages", str(len(pages)), "--rps", "100000", "--full",
+            "--urls", os.path.join(tmp, "urls.txt"), "--new-urls", os.path.join(tmp, "new_urls.txt"),
+            "--dump", "", "--frontier", os.path.join(tmp, "frontier.json"), "--cache", os.path.join(tmp, "crawl.sqlite"),
+            "--page-store", os.path.join(tmp, "pages"), "--dates", os.path.join(tmp, "dates.csv"), *extra_argv,
+        ])
+    with open(os.path.join(tmp, "urls.txt"), encoding="utf-8") as f:
+        return elapsed, [line.strip() for line in f]
+
+
+def case_crawl(args, tmp):
+    elapsed, _ = serve_and_crawl(args, tmp)
+    return args.index_pages, elapsed, "index pages"
+
+
+# A link selector that names the link's ancestors finds the same articles as the simple one
+def case_crawl_compound(args, tmp):
+    for run in ("simple", "compound"):
+        os.makedirs(os.path.join(tmp, run))
+    _, expected = serve_and_crawl(args, os.path.join(tmp, "simple"))
+    elapsed, found = serve_and_crawl(args, os.path.join(tmp, "compound"),
+                                     ["--selector", "div.news-listing-item h3 > a.color-secondary"])
+    if not expected or found != expected:
+        raise SystemExit(f"crawl_compound: found {len(found)} urls, expected {len(expected)}")
+    return args.index_pages, elapsed, "index pages"
+
+
+# Every cache and store of the scraper goes in tmp
+def scrape_argv(tmp, n_urls):
+    return [
+        "--urls", os.path.join(tmp, "article_urls.txt"), "--output", os.path.join(tmp, "scraped.csv"),
+        "--limit", str(n_urls), "--rps", "100000", "--per-host", "8", "--full",
+        "--cache", os.path.join(tmp, "fetch.sqlite"), "--checkpoint", os.path.join(tmp, "checkpoint.json"),
+        "--summary-cache", os.path.join(tmp, "summaries.sqlite"),
+        "--sentiment-cache", os.path.join(tmp, "sentiment.sqlite"),
+        "--dedup-index", os.path.join(tmp, "dedup.sqlite"), "--page-store", os.path.join(tmp, "pages"),
+        "--dates", os.path.join(tmp, "dates.csv"),
+    ]
+
+
+# Serve --pages recorded article pages and scrape them. Returns the seconds it took
+def serve_and_scrape(args, tmp):
+    import scrape_articles
+    from fakes import serve_pages
+
+    pages = recorded_pages()
+    served = {f"/article-{i}": pages[i % len(pages)] for i in range(args.pages)}
+    with serve_pages(served) as (_, base):
+        with open(os.path.join(tmp, "article_urls.txt"), "w", encoding="utf-8") as f:
+            f.writelines(f"{base}{path}\n" for path in served)
+        _, elapsed = timed(quietly, scrape_articles.main, scrape_argv(tmp, len(served)))
+    return elapsed
+
+
+def case_scrape(args, tmp):
+    return args.pages, serve_and_scrape(args, tmp), "pages"
+
+
+# A malformed URL among good ones is logged and skipped. Every good page is still
+# scraped and written, the same rows a scrape without the bad line writes
+def case_bad_url(args, tmp):
+    import scrape_articles
+    from fakes import serve_pages
+
+    pages = recorded_pages()
+    served = {f"/article-{i}": pages[i % len(pages)] for i in range(args.pages)}
+    with serve_pages(served) as (_, base):
+        good = [f"{base}{path}" for path in served]
+        with open(os.path.join(tmp, "article_urls.txt"), "w", encoding="utf-8") as f:
+            f.writelines(f"{url}\n" for url in good[:len(good) // 2] + ["htp:/bad url"] + good[len(good) // 2:])
+        _, elapsed = timed(quietly, scrape_articles.main, scrape_argv(tmp, len(served) + 1))
+    written = set(pd.read_csv(os.path.join(tmp, "scraped.csv"))["url"])
+    expected = {url for url, page in zip(good, served.values()) if article_parser.process_page(page, url)["row"]}
+    if written != expected:
+        raise SystemExit(f"bad_url: wrote {len(written)} rows, expected {len(expected)}")
+    return len(served) + 1, elapsed, "pages"
+
+
+# The sentiment parity check at its default tolerances, so the suite fails when the fast
+# scorer stops matching TextBlob
+def case_sentiment(args, tmp):
+    (_, diff), elapsed = timed(quietly, sentiment_parity)
+    return len(diff), elapsed, "texts"
+
+
+# Re-extracting every article from the page store after a scrape, with no server running.
+# Summaries of unchanged text come from the summary cache, as they would after a selector change
+def case_replay(args, tmp):
+    import scrape_articles
+
+    serve_and_scrape(args, tmp)
+    _, elapsed = timed(quietly, scrape_articles.main, scrape_argv(tmp, args.pages) + ["--replay"])
+    return args.pages, elapsed, "pages"
+
+
+# What the dashboard does on a cold load: read the table from Supabase in pages, then
+# derived columns, keyword postings and the Overview cubes
+def case_dashboard(rows):
+    def run(args, tmp):
+        import dashboard_data
+        from fakes import FakeSupabase
+
+        client = FakeSupabase()
+        client.table(dashboard_data.TABLE_NAME).upsert(scaled_rows(rows).to_dict("records")).execute()
+
+        def load():
+            df = dashboard_data.fetch_table(client, dashboard_data.OVERVIEW_COLUMNS)
+            df = dashboard_data.add_derived_columns(df)
+            search_index.keyword_postings(df["keyword_list"])
+            rollups.Rollups(df)
+
+        _, elapsed = timed(load)
+        return rows, elapsed, "rows"
+    return run
+
+
+def case_report(rows):
+    def run(args, tmp):
+        from week_4_code import build_report
+
+        path = os.path.join(tmp, f"report_{rows}.csv")
+        scaled_rows(rows).to_csv(path, index=False)
+        _, elapsed = timed(quietly, build_report, path, tmp, 1, "", True)
+        return rows, elapsed, "rows"
+    return run
+
+
+def case_sync(rows):
+    def run(args, tmp):
+        import update_supabase
+        from fakes import FakeSupabase
+
+        path = os.path.join(tmp, f"sync_{rows}.csv")
+        scaled_rows(rows).to_csv(path, index=False)
+        argv = ["--input", path, "--state", os.path.join(tmp, f"sync_{rows}.json")]
+        _, elapsed = timed(lambda: quietly(update_supabase.main, argv, client=FakeSupabase()))
+        return rows, elapsed, "rows"
+    return run
+
+
+# Counting every article into a fresh time series store, the rows spread one a day over ten years
+def case_trends(rows):
+    def run(args, tmp):
+        import timeseries
+
+        df = scaled_rows(rows)
+        days = pd.to_timedelta(np.arange(rows) % 3650, unit="D")
+        df["published"] = (pd.Timestamp("2025-10-21") - days).strftime("%Y-%m-%d")
+        path = os.path.join(tmp, f"trends_{rows}.csv")
+        df.to_csv(path, index=False)
+        _, elapsed = timed(timeseries.update, path, os.path.join(tmp, f"trends_{rows}.sqlite"))
+        return rows, elapsed, "rows"
+    return run
+
+
+def suite_cases(args):
+    cases = {"crawl": case_crawl, "crawl_compound": case_crawl_compound, "scrape": case_scrape, "replay": case_replay,
+             "bad_url": case_bad_url, "sentiment": case_sentiment}
+    for rows in args.rows:
+        cases[f"dashboard_{rows}"] = case_dashboard(rows)
+        cases[f"report_{rows}"] = case_report(rows)
+        cases[f"sync_{rows}"] = case_sync(rows)
+        cases[f"trends_{rows}"] = case_trends(rows)
+    return cases
+
+
+# Best of --repeat runs per case, so one noisy run does not count as a regression
+def bench_suite(args):
+    cases = suite_cases(args)
+    selected = [name for name in cases if not args.cases or any(name.startswith(c) for c in args.cases)]
+    results = {}
+    for name in selected:
+        best = None
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                items, elapsed, unit = cases[name](args, tmp)
+            if best is None or elapsed < best[1]:
+                best = (items, elapsed, unit)
+        items, elapsed, unit = best
+        results[name] = {"items": items, "seconds": elapsed, "rate": items / elapsed, "unit": unit}
+        print(f"  {name:<20} {elapsed:8.2f}s  {items / elapsed:10.0f} {unit}/sec")
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "cases": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results saved to {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to record one")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["cases"]
+    regressions = []
+    print(f"Compared with {args.baseline} (fails below {1 - args.tolerance:.0%} of baseline)")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"  {name:<20} new, no baseline")
+            continue
+        ratio = result["rate"] / baseline[name]["rate"]
+        flag = "REGRESSION" if ratio < 1 - args.tolerance else ""
+        print(f"  {name:<20} {ratio:6.2f}x baseline  {flag}")
+        if flag:
+            regressions.append(name)
+    if regressions:
+        raise SystemExit(f"Performance regression in: {', '.join(regressions)}")
+
+
+# --- SIMILAR ARTICLES ---
+# The stored articles cut into random excerpts, so the collection has the topic structure
+# of the real one at any size. Reports the encode rate, query latency through the
+# clustered index, and its recall@k against an exact scan of every vector
+def bench_similar(args):
+    stored = pd.read_csv("fraud_articles_summarized.csv")
+    base = [embeddings.article_text(*row) for row in zip(stored["title"], stored["summary"], stored["text"])]
+    rng = random.Random(0)
+    texts = []
+    for i in range(args.n):
+        words = base[i % len(base)].split()
+        size = rng.randint(30, 300)
+        start = rng.randrange(max(1, len(words) - size))
+        texts.append(" ".join(words[start:start + size]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = embeddings.EmbeddingIndex(tmp)
+        _, elapsed = timed(lambda: [
+            index.add([f"a{i}" for i in range(s, min(s + 10_000, args.n))], texts[s:s + 10_000], batch_size=1024)
+            for s in range(0, args.n, 10_000)
+        ])
+        print(f"Encoded and indexed {args.n} articles in {elapsed:.2f}s ({args.n / elapsed:.0f}/sec), "
+              f"{0 if index.centroids is None else len(index.centroids)} clusters")
+
+        queries = [f"a{i}" for i in range(0, args.n, max(1, args.n // 200))]
+        everything = np.asarray(index.vectors[index.rows])
+        for nprobe in args.nprobe:
+            found, elapsed = timed(lambda: [index.similar_to_url(q, args.k, nprobe) for q in queries])
+            recall = []
+            for query, results in zip(queries, found):
+                position = index.position[query]
+                scores = everything @ everything[position]
+                scores[position] = -np.inf
+                exact = set(np.argsort(-scores)[:args.k].tolist())
+                recall.append(len(exact & {index.position[url] for url, _ in results}) / args.k)
+            print(f"  nprobe={nprobe:<3} {elapsed / len(queries) * 1000:6.2f} ms/query  recall@{args.k} {np.mean(recall):.3f}")
+        _, elapsed = timed(index.add, ["new-article"], ["A vendor kickback scheme hidden in procurement invoices."])
+        print(f"  adding one article: {elapsed * 1000:.1f} ms")
+        index.close()
+
+
+# --- MULTI-SOURCE SCRAPE ---
+# Two local sites with different page layouts and rate limits, declared in a sources
+# file: the recorded ACFE pages, and the same articles in a second layout. Each is
+# scraped on its own, then both in one run, which should take about as long as the
+# slower one rather than the two added up
+def newsroom_pages():
+    stored = pd.read_csv("fraud_articles_summarized.csv").fillna("")
+    return [
+        "<html><body><nav><a href='/'>Home</a></nav>"
+        f"<h2 class='headline'>{html.escape(row['title'])}</h2><span class='byline'>{html.escape(row['author'])}</span>"
+        f"<div class='story-body'><p>{html.escape(row['text'])}</p></div><footer>Newsroom</footer></body></html>"
+        for _, row in stored.iterrows()
+    ]
+
+
+def bench_sources(args):
+    import scrape_articles
+    from fakes import serve_pages
+
+    layouts = {
+        "acfe_local": (recorded_pages(), {"title_selector": "h1", "body_selector": "div.cell.large-8",
+                                          "author_selector": "h5.margin-top-1", "rps": args.rps[0]}),
+        "newsroom": (newsroom_pages(), {"title_selector": "h2.headline", "body_selector": "div.story-body",
+                                        "author_selector": "span.byline", "rps": args.rps[1]}),
+    }
+    with contextlib.ExitStack() as stack, tempfile.TemporaryDirectory() as tmp:
+        declared = []
+        urls = {}
+        for name, (pages, selectors) in layouts.items():
+            served = {f"/{name}/{i}": pages[i % len(pages)] for i in range(args.pages)}
+            _, base = stack.enter_context(serve_pages(served))
+            declared.append({"name": name, "index_url": base + "/", "page_url": base + "/?page={page}",
+                             "link_selector": "a", **selectors})
+            urls[name] = [base + path for path in served]
+        sources_file = os.path.join(tmp, "sources.json")
+        with open(sources_file, "w", encoding="utf-8") as f:
+            json.dump(declared, f)
+
+        def scrape(run, run_urls):
+            run_dir = os.path.join(tmp, run)
+            os.makedirs(run_dir)
+            with open(os.path.join(run_dir, "article_urls.txt"), "w", encoding="utf-8") as f:
+                f.writelines(url + "\n" for url in run_urls)
+            argv = scrape_argv(run_dir, len(run_urls))
+            argv = argv[:argv.index("--rps")] + argv[argv.index("--rps") + 2:]
+            _, elapsed = timed(quietly, scrape_articles.main, argv + ["--sources-file", sources_file])
+            tagged = pd.read_csv(os.path.join(run_dir, "scraped.csv"))["source"].value_counts().to_dict()
+            return elapsed, tagged
+
+        print(f"{args.pages} pages per source, at {args.rps[0]:g} and {args.rps[1]:g} requests/sec")
+        alone = {}
+        for name in layouts:
+            alone[name], tagged = scrape(name, urls[name])
+            print(f"  {name:<16} {alone[name]:6.2f}s  {tagged}")
+        print(f"  {'one after other':<16} {sum(alone.values()):6.2f}s")
+        elapsed, tagged = scrape("together", [url for pair in zip(*urls.values()) for url in pair])
+        print(f"  {'together':<16} {elapsed:6.2f}s  {tagged} (slowest source alone {max(alone.values()):.2f}s)")
+
+
+# --- DASHBOARD COLD START ---
+# A fresh interpreter runs the dashboard script once with Streamlit's AppTest (imports
+# plus the first render) and then once more (a widget rerun, served from the caches).
+# Supabase settings are removed so every run reads the same local data
+COLDSTART_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=300)
+start = time.perf_counter()
+app.run()
+first = time.perf_counter() - start
+start = time.perf_counter()
+app.run()
+rerun = time.perf_counter() - start
+heavy = [m for m in sys.argv[2:] if m in sys.modules]
+print(json.dumps({"first": first, "rerun": rerun, "errors": [e.message for e in app.exception], "loaded": heavy}))
+"""
+HEAVY_MODULES = ["supabase", "pyarrow", "textblob", "nltk", "matplotlib", "analyzer", "dataset"]
+
+
+def bench_coldstart(args):
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = {k: v for k, v in os.environ.items() if k not in ("SUPABASE_URL", "SUPABASE_KEY", "PUB_KEY")}
+    env["PYTHONPATH"] = here + os.pathsep + env.get("PYTHONPATH", "")
+    runs = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-c", COLDSTART_SCRIPT, os.path.join(here, args.script)] + HEAVY_MODULES,
+            cwd=here, env=env, capture_output=True, text=True, check=True,
+        )
+        total = time.perf_counter() - start
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        if result["errors"]:
+            raise SystemExit(f"{args.script} failed: {result['errors'][0]}")
+        runs.append((total, result))
+    total, result = min(runs, key=lambda run: run[0])
+    print(f"{args.script}: best of {args.repeat} fresh processes")
+    print(f"  process start to first render  {total:6.2f}s")
+    print(f"  imports + first render         {result['first']:6.2f}s")
+    print(f"  rerun                          {result['rerun']:6.2f}s")
+    print(f"  heavy modules loaded: {', '.join(result['loaded']) or 'none'}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline micro benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    scoring = sub.add_parser("scoring", help="keyword detection and severity scoring")
+    scoring.add_argument("--n", type=int, default=100_000)
+    scoring.set_defaults(func=bench_scoring)
+
+    search = sub.add_parser("search", help="keyword filter and full text search")
+    search.add_argument("--n", type=int, default=100_000)
+    search.set_defaults(func=bench_search)
+
+    overview = sub.add_parser("overview", help="dashboard Overview aggregates, filtered frame vs rollup cubes")
+    overview.add_argument("--n", type=int, default=100_000)
+    overview.set_defaults(func=bench_overview)
+
+    parse = sub.add_parser("parse", help="HTML parse and keyword detection over recorded pages")
+    parse.add_argument("--repeat", type=int, default=1, help="replay the recorded pages this many times")
+    parse.add_argument("--n", type=int, default=0, help="cap on the number of pages (0 = all)")
+    parse.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parse.set_defaults(func=bench_parse)
+
+    summarize = sub.add_parser("summarize", help="summarizer backends, cold and cached")
+    summarize.add_argument("--repeat", type=int, default=10, help="replay the articles this many times")
+    summarize.add_argument("--backends", nargs="+", choices=summarizer.BACKENDS, default=["keyword", "textrank"])
+    summarize.set_defaults(func=bench_summarize)
+
+    sentiment_parser = sub.add_parser("sentiment", help="fast polarity vs TextBlob, parity and throughput")
+    sentiment_parser.add_argument("--repeat", type=int, default=10, help="replay the article bodies this many times")
+    sentiment_parser.add_argument("--tolerance", type=float, default=1e-9, help="a text differing by more is a mismatch")
+    sentiment_parser.add_argument("--max-mismatch", type=float, default=0.0, help="fail above this share of mismatches")
+    sentiment_parser.add_argument("--max-diff", type=float, default=1e-6, help="fail if any text differs by more")
+    sentiment_parser.set_defaults(func=bench_sentiment)
+
+    suite = sub.add_parser("suite", help="end to end regression suite with JSON results and a baseline")
+    suite.add_argument("--cases", nargs="+", help="only cases whose name starts with one of these")
+    suite.add_argument("--rows", type=int, nargs="+", default=[10_000], help="scale-up sizes for dashboard, report, sync and trends")
+    suite.add_argument("--pages", type=int, default=200, help="article pages served to the scrape case")
+    suite.add_argument("--index-pages", type=int, default=20, help="blog index pages served to the crawl case")
+    suite.add_argument("--repeat", type=int, default=3, help="runs per case, the best one counts")
+    suite.add_argument("--output", default=DEFAULT_RESULTS_PATH)
+    suite.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    suite.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    suite.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a case fails")
+    suite.set_defaults(func=bench_suite)
+
+    similar = sub.add_parser("similar", help="embedding index build rate, query latency and recall")
+    similar.add_argument("--n", type=int, default=100_000)
+    similar.add_argument("--k", type=int, default=10)
+    similar.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    similar.set_defaults(func=bench_similar)
+
+    sources_parser = sub.add_parser("sources", help="two rate limited sources scraped one after the other vs together")
+    sources_parser.add_argument("--pages", type=int, default=40, help="article pages per source")
+    sources_parser.add_argument("--rps", type=float, nargs=2, default=[20.0, 10.0], help="requests/sec of each source")
+    sources_parser.set_defaults(func=bench_sources)
+
+    coldstart = sub.add_parser("coldstart", help="dashboard import and first render time in a fresh process")
+    coldstart.add_argument("--script", default="fraud_dashboard.py")
+    coldstart.add_argument("--repeat", type=int, default=5)
+    coldstart.set_defaults(func=bench_coldstart)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import os
+
+import pandas as pd
+import streamlit as st
+from dotenv import load_dotenv
+
+from dedup import unique_stories
+from fraud_scoring import score_keyword_strings
+from metrics import timer
+from rollups import Rollups
+import search_index
+
+load_dotenv()
+
+TABLE_NAME = "articles_summarized"
+LOCAL_CSV = "fraud_articles_summarized.csv"
+# dataset.DEFAULT_DATASET_PATH. dataset.py (and pyarrow) are only imported once there
+# is a dataset to read, and the Supabase client only once there is a URL, which keeps
+# both out of the dashboard's cold start when they are not used
+LOCAL_DATASET = "articles_dataset"
+# embeddings.DEFAULT_EMBEDDINGS_PATH, written by `python embeddings.py build` or the pipeline
+LOCAL_EMBEDDINGS = ".embeddings"
+# timeseries.DEFAULT_TIMESERIES_PATH, the per week counts written by the pipeline's trends stage
+LOCAL_TIMESERIES = ".timeseries.sqlite"
+
+# The overview never shows the article body, so we leave the heavy text column out
+OVERVIEW_COLUMNS = ["title", "author", "url", "keywords_found", "summary", "cluster_id"]
+# The search index is the only thing that needs the body
+SEARCH_COLUMNS = ["url", "title", "summary", "text"]
+
+# How long a loaded copy of the table is reused before we go back to Supabase
+CACHE_TTL_SECONDS = 600
+PAGE_SIZE = 1000
+
+
+# --- CLIENT ---
+# One Supabase client per server process, shared by every session and rerun
+@st.cache_resource
+def get_client():
+    url = os.getenv("SUPABASE_URL")
+    if not url:
+        print("URL not found, using local csv")
+        return None
+    from supabase import create_client
+
+    return create_client(url, os.getenv("PUB_KEY"))
+
+
+# --- RAW READS ---
+# Read the table in pages with range() so one huge response never has to come back at once
+def fetch_table(client, columns, page_size=PAGE_SIZE):
+    rows = []
+    start = 0
+    while True:
+        page = (
+            client.table(TABLE_NAME)
+            .select(",".join(columns))
+            .range(start, start + page_size - 1)
+            .execute()
+        )
+        rows.extend(page.data)
+        if len(page.data) < page_size:
+            break
+        start += page_size
+    return pd.DataFrame(rows, columns=columns)
+
+
+# Reading in the data that comes from the earlier scraping and summarization step.
+# The Parquet dataset is preferred when there is one: it only reads the columns asked
+# for, and the overview columns never touch the article bodies
+def read_local(columns):
+    if os.path.isdir(os.path.join(LOCAL_DATASET, "meta")):
+        from dataset import read_articles
+
+        return read_articles(LOCAL_DATASET, columns=columns)
+    available = pd.read_csv(LOCAL_CSV, nrows=0).columns
+    df = pd.read_csv(LOCAL_CSV, usecols=[c for c in columns if c in available])
+    for col in columns:
+        if col not in df.columns:
+            df[col] = ""
+    return df
+
+
+# --- DERIVED COLUMNS ---
+# Trend, keyword list and severity all come out of one vectorized pass in fraud_scoring
+def add_derived_columns(df):
+    # Some rows may not have keywords yet, so I fill them with empty strings
+    df["keywords_found"] = df["keywords_found"].fillna("")
+    # Same idea for the summary text, just making sure we do not get NaN issues later
+    df["summary"] = df["summary"].fillna("")
+    scored = score_keyword_strings(df["keywords_found"])
+    # A trend already stored upstream wins over the one we derive here
+    if "trend" in df.columns:
+        scored = scored.drop(columns="trend")
+    for col in scored.columns:
+        df[col] = scored[col]
+    return df
+
+
+# Changes whenever any article is added, removed or edited, so caches keyed on it
+# are rebuilt exactly when the data changes
+def data_version(df):
+    hashed = pd.util.hash_pandas_object(df[["url", "title", "keywords_found", "summary"]], index=False)
+    return format(int(hashed.sum()) & 0xFFFFFFFFFFFFFFFF, "016x")
+
+
+# --- CACHED ENTRY POINT ---
+# Everything the page needs, built once per data version. Streamlit keeps the
+# result for CACHE_TTL_SECONDS, so widget changes only filter an in-memory frame
+# instead of re-querying Supabase and re-running the derived column logic.
+# With unique=True reposts of the same story (same near-duplicate cluster) are dropped
+# first, so every count, chart and filter sees each story once.
+# Returns the frame, the keyword -> row positions index used by the keyword filter,
+# the Overview count cubes, and the data version
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner="Loading articles...")
+def load_dashboard_data(columns=tuple(OVERVIEW_COLUMNS), unique=True):
+    client = get_client()
+    with timer("dashboard_fetch"):
+        if client is not None:
+            df = fetch_table(client, list(columns))
+        else:
+            df = read_local(list(columns))
+    with timer("dashboard_derive"):
+        if unique:
+            df = unique_stories(df)
+        df = add_derived_columns(df).reset_index(drop=True)
+        keyword_index = search_index.keyword_postings(df["keyword_list"])
+        rollups = Rollups(df)
+    return df, keyword_index, rollups, data_version(df)
+
+
+# --- SEARCH INDEX ---
+# Built from title, summary and text the first time a data version is seen and kept
+# on disk, so later sessions and server restarts just load it
+@st.cache_resource(max_entries=2, show_spinner="Building search index...")
+def load_search_index(version):
+    def load_records():
+        client = get_client()
+        if client is not None:
+            docs = fetch_table(client, SEARCH_COLUMNS)
+        else:
+            docs = read_local(SEARCH_COLUMNS)
+        return docs.to_dict("records")
+
+    with timer("dashboard_search_index"):
+        return search_index.load_or_build(version, load_records)
+
+
+# --- SIMILAR ARTICLES ---
+# The embedding index built by the pipeline, or None when there is none yet. Opened once
+# per server process and reloaded after CACHE_TTL_SECONDS to pick up new articles.
+# Searching only reads arrays loaded at open and the memory-mapped vectors
+@st.cache_resource(ttl=CACHE_TTL_SECONDS, show_spinner="Loading article embeddings...")
+def load_embedding_index():
+    if not os.path.isdir(LOCAL_EMBEDDINGS):
+        return None
+    from embeddings import EmbeddingIndex
+
+    with timer("dashboard_embeddings"):
+        try:
+            index = EmbeddingIndex(LOCAL_EMBEDDINGS, read_only=True)
+        except FileNotFoundError:
+            return None
+    return index if len(index) else None
+
+
+# --- TIME SERIES ---
+# Weekly counts by trend, severity and keyword, plus the current keyword spikes, read
+# from the rollup store instead of the articles: a few small frames however many
+# articles there are. None when the pipeline has not counted anything yet
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def load_time_series():
+    if not os.path.exists(LOCAL_TIMESERIES):
+        return None
+    from timeseries import TimeSeriesStore
+
+    with timer("dashboard_timeseries"):
+        store = TimeSeriesStore(LOCAL_TIMESERIES)
+        try:
+            weekly = {dim: store.series(dim, "week") for dim in ("trend", "severity", "keyword")}
+            if weekly["trend"].empty:
+                return None
+            return {**weekly, "spikes": store.spikes(), "undated": store.undated()}
+        finally:
+            store.close()
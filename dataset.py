@@ -0,0 +1,289 @@
+import argparse
+import datetime
+import os
+import shutil
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from fetch_cache import content_hash
+from output_writer import CHUNK_SIZE, read_chunks
+
+# The articles as a typed Parquet dataset, partitioned by scrape date (hive style,
+# scrape_date=YYYY-MM-DD). Light metadata and heavy bodies live in two datasets with
+# the same layout:
+#   articles_dataset/meta/scrape_date=2024-02-23/part-<id>.parquet   url, title, ..., text_hash
+#   articles_dataset/text/scrape_date=2024-02-23/part-<id>.parquet   url, text, html
+# Reading metadata never opens a text file, and when bodies are asked for only the
+# text partitions holding the selected urls are read. Every url has exactly one row
+# across all partitions: writing a newer copy removes the older one.
+#   python dataset.py import fraud_articles_summarized.csv
+#   python dataset.py info
+
+DEFAULT_DATASET_PATH = "articles_dataset"
+
+META_SCHEMA = pa.schema([
+    ("url", pa.string()),
+    ("title", pa.string()),
+    ("author", pa.string()),
+    ("keywords_found", pa.string()),
+    ("summary", pa.string()),
+    ("sentiment", pa.float64()),
+    ("text_hash", pa.string()),  # sha256 of text, so changes show up without reading bodies
+    ("cluster_id", pa.int64()),  # near-duplicate cluster from dedup.py
+    ("published", pa.string()),  # YYYY-MM-DD from the blog index, None when not known
+    ("source", pa.string()),     # name of the site in sources.py
+])
+TEXT_SCHEMA = pa.schema([
+    ("url", pa.string()),
+    ("text", pa.string()),
+    ("html", pa.string()),
+])
+PARTITION_SCHEMA = pa.schema([("scrape_date", pa.string())])
+
+META_COLUMNS = META_SCHEMA.names + ["scrape_date"]
+TEXT_COLUMNS = [c for c in TEXT_SCHEMA.names if c != "url"]
+
+
+def is_dataset(path):
+    return os.path.isdir(os.path.join(path, "meta"))
+
+
+def _dataset(root, part):
+    path = os.path.join(root, part)
+    schema = META_SCHEMA if part == "meta" else TEXT_SCHEMA
+    if not os.path.isdir(path):
+        return None
+    return ds.dataset(
+        path, format="parquet", schema=pa.unify_schemas([schema, PARTITION_SCHEMA]),
+        partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+    )
+
+
+# filters: None, a pyarrow expression, or pyarrow's list-of-tuples form, e.g.
+# [("scrape_date", ">=", "2024-01-01"), ("keywords_found", "!=", "")]. Only metadata
+# columns can be filtered on; the scrape_date part also prunes whole partitions
+def _expression(filters):
+    if filters is None or isinstance(filters, pc.Expression):
+        return filters
+    return pq.filters_to_expression(filters)
+
+
+def _split_columns(columns):
+    columns = list(columns) if columns is not None else [c for c in META_COLUMNS if c != "text_hash"]
+    unknown = [c for c in columns if c not in META_COLUMNS and c not in TEXT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown dataset columns {unknown}, expected some of {META_COLUMNS + TEXT_COLUMNS}")
+    return columns, [c for c in columns if c in META_COLUMNS], [c for c in columns if c in TEXT_COLUMNS]
+
+
+# Bodies for the rows of one metadata table. The scrape_date filter means only the
+# partitions those rows came from are opened
+def _attach_text(root, meta, text_columns):
+    df = meta.to_pandas()
+    text = _dataset(root, "text")
+    if text is None or not len(df):
+        for col in text_columns:
+            df[col] = None
+        return df
+    dates = pa.array(df["scrape_date"].unique().tolist(), type=pa.string())
+    bodies = text.to_table(
+        columns=["url"] + text_columns,
+        filter=pc.field("scrape_date").isin(dates) & pc.field("url").isin(meta.column("url")),
+    ).to_pandas()
+    return df.merge(bodies, on="url", how="left")
+
+
+def _empty(columns):
+    return pd.DataFrame({c: pd.Series(dtype="float64" if c == "sentiment" else object) for c in columns})
+
+
+# --- READ ---
+# Columns default to every metadata column. Text columns are joined in only if asked for
+def read_articles(root=DEFAULT_DATASET_PATH, columns=None, filters=None):
+    columns, meta_columns, text_columns = _split_columns(columns)
+    meta = _dataset(root, "meta")
+    if meta is None:
+        return _empty(columns)
+    needed = list(dict.fromkeys(meta_columns + (["url", "scrape_date"] if text_columns else [])))
+    table = meta.to_table(columns=needed, filter=_expression(filters))
+    df = _attach_text(root, table, text_columns) if text_columns else table.to_pandas()
+    return df[columns]
+
+
+# Same, as a stream of frames of at most chunksize rows, for inputs bigger than memory
+def iter_articles(root=DEFAULT_DATASET_PATH, columns=None, filters=None, chunksize=CHUNK_SIZE):
+    columns, meta_columns, text_columns = _split_columns(columns)
+    meta = _dataset(root, "meta")
+    if meta is None:
+        return
+    needed = list(dict.fromkeys(meta_columns + (["url", "scrape_date"] if text_columns else [])))
+    for batch in meta.to_batches(columns=needed, filter=_expression(filters), batch_size=chunksize):
+        if not batch.num_rows:
+            continue
+        table = pa.Table.from_batches([batch])
+        df = _attach_text(root, table, text_columns) if text_columns else table.to_pandas()
+        yield df[columns]
+
+
+# --- WRITE ---
+def _tables(df):
+    df = df.reset_index(drop=True)
+    text = df["text"] if "text" in df.columns else pd.Series(None, index=df.index, dtype=object)
+    df = df.assign(text_hash=[content_hash(t) if isinstance(t, str) else None for t in text])
+    meta = {}
+    for field in META_SCHEMA:
+        values = df[field.name] if field.name in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if pa.types.is_floating(field.type):
+            values = pd.to_numeric(values, errors="coerce")
+        elif pa.types.is_integer(field.type):
+            values = [None if pd.isna(v) else int(v) for v in pd.to_numeric(values, errors="coerce")]
+        else:
+            values = values.astype(object).where(values.notna(), None)
+        meta[field.name] = values
+    bodies = {
+        field.name: (df[field.name].astype(object).where(df[field.name].notna(), None)
+                     if field.name in df.columns else [None] * len(df))
+        for field in TEXT_SCHEMA
+    }
+    return (
+        pa.Table.from_pydict({k: list(v) for k, v in meta.items()}, schema=META_SCHEMA),
+        pa.Table.from_pydict({k: list(v) for k, v in bodies.items()}, schema=TEXT_SCHEMA),
+    )
+
+
+def _partition_dir(root, part, scrape_date):
+    return os.path.join(root, part, f"scrape_date={scrape_date}")
+
+
+def _write_file(table, directory):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet")
+    pq.write_table(table, path + ".tmp", compression="zstd")
+    os.replace(path + ".tmp", path)
+
+
+# Drop urls from every partition that holds any of them. Only the affected partitions
+# are rewritten; a partition left empty is removed
+def remove_urls(root, urls):
+    urls = pa.array(sorted(set(urls)), type=pa.string())
+    meta = _dataset(root, "meta")
+    if meta is None or not len(urls):
+        return 0
+    hits = meta.to_table(columns=["scrape_date"], filter=pc.field("url").isin(urls))
+    removed = hits.num_rows
+    for scrape_date in set(hits.column("scrape_date").to_pylist()):
+        for part in ("meta", "text"):
+            directory = _partition_dir(root, part, scrape_date)
+            if not os.path.isdir(directory):
+                continue
+            old_files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".parquet")]
+            kept = pq.read_table(old_files, schema=META_SCHEMA if part == "meta" else TEXT_SCHEMA)
+            kept = kept.filter(pc.invert(pc.is_in(kept.column("url"), value_set=urls)))
+            if kept.num_rows:
+                _write_file(kept, directory)
+            for path in old_files:
+                os.remove(path)
+            if not kept.num_rows:
+                shutil.rmtree(directory)
+    return removed
+
+
+# Store rows under one scrape date (today by default). Older copies of the same urls
+# are removed first, so readers never see duplicates. Returns the number of rows written
+def write_articles(df, root=DEFAULT_DATASET_PATH, scrape_date=None):
+    df = df[df["url"].notna()].drop_duplicates("url", keep="last")
+    if not len(df):
+        return 0
+    scrape_date = scrape_date or datetime.date.today().isoformat()
+    remove_urls(root, df["url"])
+    meta, text = _tables(df)
+    _write_file(meta, _partition_dir(root, "meta", scrape_date))
+    _write_file(text, _partition_dir(root, "text", scrape_date))
+    return len(df)
+
+
+# Set cluster_id from a url -> cluster mapping. Only metadata files are rewritten
+def write_cluster_ids(root, cluster_ids):
+    meta_root = os.path.join(root, "meta")
+    for directory in sorted(os.listdir(meta_root)):
+        directory = os.path.join(meta_root, directory)
+        old_files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".parquet")]
+        table = pq.read_table(old_files, schema=META_SCHEMA)
+        current = table.column("cluster_id").to_pylist()
+        updated = [cluster_ids.get(url, old) for url, old in zip(table.column("url").to_pylist(), current)]
+        if updated == current:
+            continue
+        table = table.set_column(
+            META_SCHEMA.get_field_index("cluster_id"), "cluster_id", pa.array(updated, type=pa.int64())
+        )
+        _write_file(table, directory)
+        for path in old_files:
+            os.remove(path)
+
+
+# --- IMPORT ---
+# Bring a scraper output (.csv / .jsonl, or a pandas .json dump) into the dataset.
+# Only rows that are new or differ from the stored copy are written, chunk by chunk,
+# and with prune=True urls no longer in the file are removed too. Returns
+# (rows written, rows removed)
+def import_file(path, root=DEFAULT_DATASET_PATH, scrape_date=None, prune=False):
+    compare = [c for c in META_SCHEMA.names if c != "url"]
+    stored = read_articles(root, columns=["url"] + compare)
+    stored_hashes = dict(zip(stored["url"], pd.util.hash_pandas_object(stored[compare].fillna(""), index=False)))
+
+    chunks = [pd.read_json(path)] if path.endswith(".json") else read_chunks(path)
+    seen = set()
+    written = 0
+    for chunk in chunks:
+        chunk = chunk[chunk["url"].notna()].drop_duplicates("url", keep="last")
+        seen.update(chunk["url"])
+        meta, _ = _tables(chunk)
+        hashes = pd.util.hash_pandas_object(meta.select(compare).to_pandas().fillna(""), index=False)
+        changed = [stored_hashes.get(url) != h for url, h in zip(chunk["url"], hashes)]
+        written += write_articles(chunk[changed], root, scrape_date)
+
+    removed = remove_urls(root, set(stored["url"]) - seen) if prune else 0
+    return written, removed
+
+
+def info(root=DEFAULT_DATASET_PATH):
+    meta = read_articles(root, columns=["scrape_date"])
+    sizes = {}
+    for part in ("meta", "text"):
+        sizes[part] = sum(
+            os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(os.path.join(root, part)) for f in files
+        )
+    return meta["scrape_date"].value_counts().sort_index(), sizes
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the Parquet article dataset")
+    parser.add_argument("--root", default=DEFAULT_DATASET_PATH, help="dataset directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    imp = commands.add_parser("import", help="add new and changed rows from a scraper output file")
+    imp.add_argument("input", help="a .csv, .jsonl or pandas .json file")
+    imp.add_argument("--date", help="scrape date for the imported rows (default today, YYYY-MM-DD)")
+    imp.add_argument("--prune", action="store_true", help="remove urls that are not in the input")
+    commands.add_parser("info", help="rows per scrape date and size on disk")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "import":
+        written, removed = import_file(args.input, args.root, args.date, args.prune)
+        print(f"✅ Wrote {written} new or changed rows to {args.root}, removed {removed}")
+    else:
+        per_date, sizes = info(args.root)
+        for scrape_date, count in per_date.items():
+            print(f"{scrape_date}  {count} rows")
+        print(f"{per_date.sum()} rows, metadata {sizes['meta'] / 1024:.0f} KiB, text {sizes['text'] / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
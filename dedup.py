@@ -0,0 +1,283 @@
+import argparse
+import re
+import sqlite3
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from fetch_cache import content_hash
+
+# Near-duplicate detection for articles that were reposted or syndicated under another
+# url. Every article gets a MinHash signature over its word 5-shingles, and
+# locality-sensitive hashing (the signature cut into bands, each band hashed to a
+# bucket) finds the few candidates worth comparing, so adding an article costs a
+# handful of indexed lookups instead of a comparison against every stored article.
+# Candidates whose estimated Jaccard similarity reaches the threshold join the same
+# cluster; a cluster id is the id of the cluster's first article. When a new article
+# bridges two clusters the younger one is renamed to the older, and the renamed
+# articles are reported by remapped(), so rows already written can be given the new id.
+# Signatures and buckets are kept in sqlite, so later runs only index new articles:
+#   python dedup.py fraud_articles_summarized.csv
+
+DEFAULT_DEDUP_INDEX_PATH = ".dedup_index.sqlite"
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 32       # 32 bands of 4 rows: pairs at 0.7 similarity are nearly always
+ROWS = NUM_PERM // BANDS  # candidates, pairs under 0.3 rarely are
+THRESHOLD = 0.7
+
+# Multiply-shift hashing, the top 32 bits of (a * x + b) mod 2^64 with a odd, from fixed
+# seeds so signatures stay comparable across runs. The product has to wrap: a hash that
+# grows with x has the same minimum (the smallest shingle) for every permutation.
+# SIGNATURE_VERSION changes whenever signatures do, so an index of old ones is rebuilt
+SIGNATURE_VERSION = 2
+_rng = np.random.default_rng(3602)
+PERM_A = _rng.integers(0, 1 << 64, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+PERM_B = _rng.integers(0, 1 << 64, size=NUM_PERM, dtype=np.uint64)
+BAND_MULTIPLIERS = _rng.integers(1, 1 << 63, size=ROWS, dtype=np.uint64) | np.uint64(1)
+SHINGLE_BASE = np.uint64(1_000_003)
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+EMPTY_SIGNATURE = np.full(NUM_PERM, 0xFFFFFFFF, dtype=np.uint32)
+
+
+# --- SIGNATURES ---
+# Token hashes (crc32, stable across processes) are computed once per distinct token
+# of the batch, and each shingle hash is a polynomial over its tokens' hashes
+def shingle_hashes(texts, k=SHINGLE_SIZE):
+    token_lists = [WORD_PATTERN.findall(t.lower()) if isinstance(t, str) else [] for t in texts]
+    codes, uniques = pd.factorize(pd.Series([tok for toks in token_lists for tok in toks], dtype=object))
+    token_hash = np.array([zlib.crc32(u.encode("utf-8")) for u in uniques], dtype=np.uint64)[codes]
+
+    shingles = []
+    start = 0
+    for tokens in token_lists:
+        h = token_hash[start:start + len(tokens)]
+        start += len(tokens)
+        width = min(k, len(h))
+        if width == 0:
+            shingles.append(np.zeros(0, dtype=np.uint64))
+            continue
+        n = len(h) - width + 1
+        combined = np.zeros(n, dtype=np.uint64)
+        for j in range(width):
+            combined = combined * SHINGLE_BASE + h[j:j + n]
+        shingles.append(np.unique(combined & np.uint64(0xFFFFFFFF)))
+    return shingles
+
+
+def signatures(texts):
+    sigs = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+    for i, shingles in enumerate(shingle_hashes(texts)):
+        if not len(shingles):
+            sigs[i] = EMPTY_SIGNATURE
+            continue
+        hashed = (shingles[:, None] * PERM_A[None, :] + PERM_B[None, :]) >> np.uint64(32)
+        sigs[i] = hashed.min(axis=0).astype(np.uint32)
+    return sigs
+
+
+# One bucket key per band, as signed 64 bit ints so sqlite can store them
+def band_keys(signature):
+    bands = signature.reshape(BANDS, ROWS).astype(np.uint64)
+    return (bands * BAND_MULTIPLIERS[None, :]).sum(axis=1).view(np.int64)
+
+
+def similarity(a, b):
+    return float(np.mean(a == b))
+
+
+# --- INDEX ---
+class DedupIndex:
+    def __init__(self, path=DEFAULT_DEDUP_INDEX_PATH, threshold=THRESHOLD):
+        self.threshold = threshold
+        # Clusters that took in another cluster since the index was opened
+        self._merged = set()
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE,
+                text_hash TEXT,
+                signature BLOB,
+                cluster INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS bands (band INTEGER, key INTEGER, doc INTEGER);
+            CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, key);
+            CREATE INDEX IF NOT EXISTS bands_doc ON bands (doc);
+            CREATE INDEX IF NOT EXISTS docs_cluster ON docs (cluster);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+            """
+        )
+        # Signatures from another version cannot be compared with new ones, so they are
+        # dropped and every article is indexed again (rebuilt tells the caller to do that)
+        found = self.conn.execute("SELECT value FROM meta WHERE key = 'signature_version'").fetchone()
+        stored = self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        self.rebuilt = bool(stored) and (found is None or int(found[0]) != SIGNATURE_VERSION)
+        with self.conn:
+            if self.rebuilt:
+                self.conn.execute("DELETE FROM bands")
+                self.conn.execute("DELETE FROM docs")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('signature_version', ?)",
+                              (SIGNATURE_VERSION,))
+
+    def _lookup(self, urls):
+        found = {}
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            found.update(
+                (url, (doc_id, text_hash)) for url, doc_id, text_hash in self.conn.execute(
+                    f"SELECT url, id, text_hash FROM docs WHERE url IN ({','.join('?' * len(chunk))})", chunk
+                )
+            )
+        return found
+
+    # Stored docs sharing at least one bucket with this signature, that really are
+    # similar enough
+    def _matches(self, doc_id, signature, keys):
+        rows = self.conn.execute(
+            f"SELECT DISTINCT d.id, d.signature, d.cluster FROM bands b JOIN docs d ON d.id = b.doc "
+            f"WHERE (b.band, b.key) IN (VALUES {','.join(['(?, ?)'] * len(keys))}) AND b.doc != ?",
+            [v for band, key in enumerate(keys.tolist()) for v in (band, key)] + [doc_id],
+        ).fetchall()
+        return [
+            cluster for _, blob, cluster in rows
+            if similarity(signature, np.frombuffer(blob, dtype=np.uint32)) >= self.threshold
+        ]
+
+    # Index the articles (in order) and return their cluster ids. Articles already
+    # indexed with the same text are not hashed again; edited ones are re-indexed
+    def add_many(self, urls, texts):
+        urls = list(urls)
+        texts = ["" if not isinstance(t, str) else t for t in texts]
+        hashes = [content_hash(t) for t in texts]
+        known = self._lookup(urls)
+        todo = [i for i, (url, h) in enumerate(zip(urls, hashes)) if known.get(url, (None, None))[1] != h]
+
+        for i, signature in zip(todo, signatures([texts[i] for i in todo])):
+            url = urls[i]
+            if url in known:
+                doc_id = known[url][0]
+                self.conn.execute("DELETE FROM bands WHERE doc = ?", (doc_id,))
+                self.conn.execute(
+                    "UPDATE docs SET text_hash = ?, signature = ?, cluster = id WHERE id = ?",
+                    (hashes[i], signature.tobytes(), doc_id),
+                )
+            else:
+                doc_id = self.conn.execute(
+                    "INSERT INTO docs (url, text_hash, signature) VALUES (?, ?, ?)",
+                    (url, hashes[i], signature.tobytes()),
+                ).lastrowid
+                self.conn.execute("UPDATE docs SET cluster = id WHERE id = ?", (doc_id,))
+            known[url] = (doc_id, hashes[i])
+            if not texts[i].strip():
+                continue  # nothing to compare, stays a cluster of its own
+
+            keys = band_keys(signature)
+            clusters = set(self._matches(doc_id, signature, keys))
+            if clusters:
+                # Merge every matched cluster (and this doc) into the oldest one
+                target = min(clusters | {doc_id})
+                merged = list(clusters | {doc_id})
+                if clusters - {target}:
+                    self._merged.add(target)
+                self.conn.execute(
+                    f"UPDATE docs SET cluster = ? WHERE cluster IN ({','.join('?' * len(merged))}) OR id = ?",
+                    [target] + merged + [doc_id],
+                )
+            self.conn.executemany(
+                "INSERT INTO bands (band, key, doc) VALUES (?, ?, ?)",
+                [(band, key, doc_id) for band, key in enumerate(keys.tolist())],
+            )
+        self.conn.commit()
+        found = self.clusters_for(urls)
+        return [found[url] for url in urls]
+
+    def clusters_for(self, urls):
+        found = {}
+        urls = list(urls)
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            found.update(self.conn.execute(
+                f"SELECT url, cluster FROM docs WHERE url IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return found
+
+    # url -> cluster id for every article of a cluster that took in another one since
+    # the index was opened (or since the last call), so stored rows can be rewritten
+    def remapped(self):
+        found = {}
+        merged = list(self._merged)
+        for i in range(0, len(merged), 500):
+            chunk = merged[i:i + 500]
+            found.update(self.conn.execute(
+                f"SELECT url, cluster FROM docs WHERE cluster IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        self._merged.clear()
+        return found
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+# --- STORY COUNTS ---
+# One row per cluster, the cluster's first article winning. Rows without a cluster id
+# (written before dedup existed) count as their own story
+def unique_stories(df, column="cluster_id"):
+    if column not in df.columns:
+        return df
+    clusters = pd.to_numeric(df[column], errors="coerce")
+    first = ~clusters.duplicated() | clusters.isna()
+    return df[first.to_numpy()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Index articles for near-duplicates and store their cluster ids")
+    parser.add_argument("input", help="scraper output (.csv / .jsonl) or Parquet dataset directory")
+    parser.add_argument("--index", default=DEFAULT_DEDUP_INDEX_PATH, help="signature and bucket store")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="estimated Jaccard similarity for a duplicate")
+    return parser.parse_args(argv)
+
+
+# Index every article of a scraper output or dataset and store the cluster ids back
+# into it. Returns url -> cluster id
+def index_file(index, path):
+    from dataset import is_dataset, iter_articles, write_cluster_ids
+    from output_writer import read_chunks, rewrite_column
+
+    if is_dataset(path):
+        chunks = iter_articles(path, columns=["url", "text"])
+    else:
+        chunks = read_chunks(path, columns=["url", "text"])
+    cluster_ids = {}
+    for chunk in chunks:
+        chunk = chunk[chunk["url"].notna()]
+        cluster_ids.update(zip(chunk["url"], index.add_many(chunk["url"], chunk["text"])))
+    # Ids of earlier chunks may have changed when later ones merged their clusters
+    cluster_ids.update(index.clusters_for(cluster_ids))
+
+    if is_dataset(path):
+        write_cluster_ids(path, cluster_ids)
+    else:
+        rewrite_column(path, "cluster_id", cluster_ids)
+    return cluster_ids
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    index = DedupIndex(args.index, args.threshold)
+    try:
+        cluster_ids = index_file(index, args.input)
+    finally:
+        index.close()
+    clusters = pd.Series(cluster_ids)
+    sizes = clusters.value_counts()
+    print(f"✅ {len(clusters)} articles, {len(sizes)} stories, {int((sizes > 1).sum())} with near-duplicates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+import argparse
+import os
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+
+from fetch_cache import content_hash
+from search_index import tokenize
+
+# "Similar articles": every article is turned into a unit vector and neighbours are
+# found by cosine similarity. Encoders are picked by name, like the summarizer backends:
+#   "hashing"      (default) signed feature hashing of words and word pairs, numpy only
+#   "transformers" a sentence embedding model from Hugging Face (mean pooled, on CPU,
+#                  in batches), needs transformers + torch and a model download
+# Vectors are cached by a hash of the encoder settings and the text in a memory-mapped
+# float32 file, so an unchanged article is never encoded twice and the vectors are
+# never all read into memory. Search goes through an inverted file index: the vectors
+# are clustered with k-means, and a query only scores the articles in the few clusters
+# closest to it. New articles join their nearest cluster; the clusters are trained
+# again only once the collection has grown a few times over:
+#   python embeddings.py build fraud_articles_summarized.csv --prune
+#   python embeddings.py similar --text "vendor kickbacks in procurement"
+
+DEFAULT_EMBEDDINGS_PATH = ".embeddings"
+BACKENDS = ["hashing", "transformers"]
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+HASHING_DIM = 384
+BATCH_SIZE = 32
+# What gets encoded: title and summary, then the start of the body
+MAX_BODY_CHARS = 2000
+
+# Below this many articles every search is exact. Above it the index has about
+# sqrt(n) clusters and a query scores the NPROBE closest ones
+MIN_TRAIN = 2048
+NPROBE = 8
+RETRAIN_GROWTH = 4
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+
+# Words too common to say anything about what an article is about
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers him his how i if in into is it its itself just may me might more most must my no nor not
+now of off on once only or other our ours out over own said same she should so some such than that the
+their them then there these they this those through to too under until up very was we were what when where
+which while who whom why will with would you your
+""".split())
+
+
+def article_text(title, summary, text):
+    parts = [p for p in (title, summary, text[:MAX_BODY_CHARS] if isinstance(text, str) else None) if isinstance(p, str)]
+    return "\n".join(parts)
+
+
+# --- ENCODERS ---
+# Each word and each pair of neighbouring words adds 1 + log(count) to one of `dim`
+# buckets, with a sign, both picked by crc32 (stable across processes). That is a random
+# projection of the bag of words, so cosine similarity of two vectors tracks the overlap
+# of their vocabularies. A batch is counted with one np.unique over (doc, feature) pairs
+class HashingEncoder:
+    def __init__(self, dim=HASHING_DIM):
+        self.dim = dim
+        self.settings = f"hashing:{dim}"
+
+    def __call__(self, texts):
+        features = []
+        docs = []
+        for i, text in enumerate(texts):
+            words = [w for w in tokenize(text) if w not in STOPWORDS]
+            grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            features.extend(zlib.crc32(g.encode("utf-8")) for g in grams)
+            docs.extend([i] * len(grams))
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if features:
+            pairs, counts = np.unique(
+                np.array(docs, dtype=np.uint64) << np.uint64(32) | np.array(features, dtype=np.uint64), return_counts=True
+            )
+            doc = (pairs >> np.uint64(32)).astype(np.int64)
+            feature = (pairs & np.uint64(0xFFFFFFFF)).astype(np.int64)
+            sign = np.where(feature & (1 << 31), -1.0, 1.0)
+            np.add.at(vectors, (doc, feature % self.dim), sign * (1.0 + np.log(counts)))
+        return normalize(vectors)
+
+
+class TransformersEncoder:
+    def __init__(self, model=DEFAULT_MODEL, max_length=256):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.model = AutoModel.from_pretrained(model).eval()
+        self.max_length = max_length
+        self.dim = self.model.config.hidden_size
+        self.settings = f"transformers:{model}:{max_length}"
+
+    def __call__(self, texts):
+        with self.torch.no_grad():
+            batch = self.tokenizer(list(texts), padding=True, truncation=True,
+                                   max_length=self.max_length, return_tensors="pt")
+            hidden = self.model(**batch).last_hidden_state
+            mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+        return normalize(pooled.numpy().astype(np.float32))
+
+
+def make_encoder(backend="hashing", model=DEFAULT_MODEL):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {BACKENDS}")
+    return HashingEncoder() if backend == "hashing" else TransformersEncoder(model)
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+# --- K-MEANS ---
+# Plain Lloyd iterations on unit vectors (so nearest = highest dot product), seeded with
+# a random sample. Empty clusters keep their old centroid
+def kmeans(vectors, n_lists, iterations=KMEANS_ITERATIONS, seed=3602):
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        filled = np.bincount(assign, minlength=n_lists) > 0
+        centroids[filled] = normalize(sums[filled])
+    return centroids
+
+
+def assign_lists(vectors, centroids, chunk=8192):
+    return np.concatenate([
+        np.argmax(vectors[i:i + chunk] @ centroids.T, axis=1) for i in range(0, len(vectors), chunk)
+    ]).astype(np.int32) if len(vectors) else np.zeros(0, dtype=np.int32)
+
+
+# --- INDEX ---
+# One directory per encoder setting:
+#   vectors.f32     the vector cache, rows of float32, grown in place
+#   index.sqlite    content hash -> row, and url -> (hash, row, cluster) for indexed articles
+#   centroids.npy   cluster centroids, once there are enough articles to train them
+# Everything search needs (urls, rows, clusters, centroids) is loaded when the index
+# opens, so the dashboard only ever reads the memory map.
+# With read_only the index is opened for search only: sqlite in mode=ro and the vectors
+# mapped read only, so a long lived reader (the dashboard) never locks out a build.
+# Opening an index that was never built read only raises FileNotFoundError
+class EmbeddingIndex:
+    def __init__(self, root=DEFAULT_EMBEDDINGS_PATH, backend="hashing", model=DEFAULT_MODEL, encoder=None,
+                 read_only=False):
+        self.encoder = encoder or make_encoder(backend, model)
+        self.dim = self.encoder.dim
+        self.path = os.path.join(root, content_hash(self.encoder.settings)[:12])
+        self.read_only = read_only
+        db_path = os.path.join(self.path, "index.sqlite")
+        if read_only:
+            if not os.path.exists(db_path):
+                raise FileNotFoundError(f"No embedding index at {self.path}")
+            self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        else:
+            os.makedirs(self.path, exist_ok=True)
+            self.conn = sqlite3.connect(db_path)
+            self.conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, row INTEGER);
+                CREATE TABLE IF NOT EXISTS docs (url TEXT PRIMARY KEY, hash TEXT, row INTEGER, list INTEGER);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+                """
+            )
+            # Committed at once: an open transaction would hold the write lock until close
+            with self.conn:
+                self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('settings', ?)", (self.encoder.settings,))
+        self.count = self.conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        self.trained_on = int(self._meta("trained_on") or 0)
+        self.vectors = self._open_vectors(max(self.count, 1))
+
+        centroids_path = os.path.join(self.path, "centroids.npy")
+        self.centroids = np.load(centroids_path) if os.path.exists(centroids_path) else None
+        docs = self.conn.execute("SELECT url, hash, row, list FROM docs ORDER BY rowid").fetchall()
+        self.urls = [url for url, _, _, _ in docs]
+        self.hashes = [h for _, h, _, _ in docs]
+        self.rows = np.array([row for _, _, row, _ in docs], dtype=np.int64)
+        self.lists = np.array([lst for _, _, _, lst in docs], dtype=np.int32)
+        self.position = {url: i for i, url in enumerate(self.urls)}
+        self._by_list = None
+
+    def _meta(self, key):
+        found = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return found[0] if found else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # The file is grown by doubling, so appending n vectors costs O(n) over time
+    def _open_vectors(self, capacity):
+        path = os.path.join(self.path, "vectors.f32")
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if self.read_only:
+            return np.memmap(path, dtype=np.float32, mode="r", shape=(size // (self.dim * 4), self.dim))
+        needed = capacity * self.dim * 4
+        if size < needed:
+            with open(path, "ab") as f:
+                f.truncate(max(needed, size * 2))
+            size = os.path.getsize(path)
+        return np.memmap(path, dtype=np.float32, mode="r+", shape=(size // (self.dim * 4), self.dim))
+
+    def __len__(self):
+        return len(self.urls)
+
+    # --- ADD ---
+    # Index (or re-index) articles. Only texts whose hash is not cached yet are encoded,
+    # batch_size at a time. Returns how many were encoded
+    def add(self, urls, texts, batch_size=BATCH_SIZE):
+        texts = [t if isinstance(t, str) else "" for t in texts]
+        hashes = [content_hash(self.encoder.settings + "\0" + t) for t in texts]
+        changed = [i for i, (url, h) in enumerate(zip(urls, hashes))
+                   if url not in self.position or self.hashes[self.position[url]] != h]
+        if not changed:
+            return 0
+
+        cached = {}
+        wanted = list({hashes[i] for i in changed})
+        for start in range(0, len(wanted), 500):
+            chunk = wanted[start:start + 500]
+            cached.update(self.conn.execute(
+                f"SELECT hash, row FROM vectors WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        todo = list({hashes[i]: i for i in changed if hashes[i] not in cached}.values())
+        for start in range(0, len(todo), batch_size):
+            batch = todo[start:start + batch_size]
+            encoded = self.encoder([texts[i] for i in batch])
+            if self.count + len(batch) > len(self.vectors):
+                self.vectors.flush()
+                self.vectors = self._open_vectors(self.count + len(batch))
+            self.vectors[self.count:self.count + len(batch)] = encoded
+            for offset, i in enumerate(batch):
+                cached[hashes[i]] = self.count + offset
+            self.conn.executemany("INSERT INTO vectors (hash, row) VALUES (?, ?)",
+                                  [(hashes[i], self.count + offset) for offset, i in enumerate(batch)])
+            self.count += len(batch)
+        self.vectors.flush()
+
+        new_rows = np.array([cached[hashes[i]] for i in changed], dtype=np.int64)
+        new_lists = (assign_lists(self.vectors[new_rows], self.centroids) if self.centroids is not None
+                     else np.full(len(changed), -1, dtype=np.int32))
+        appended_rows, appended_lists = [], []
+        for i, row, lst in zip(changed, new_rows.tolist(), new_lists.tolist()):
+            url = urls[i]
+            if url in self.position:
+                p = self.position[url]
+                self.hashes[p] = hashes[i]
+                self.rows[p] = row
+                self.lists[p] = lst
+            else:
+                self.position[url] = len(self.urls)
+                self.urls.append(url)
+                self.hashes.append(hashes[i])
+                appended_rows.append(row)
+                appended_lists.append(lst)
+        self.rows = np.concatenate([self.rows, np.array(appended_rows, dtype=np.int64)])
+        self.lists = np.concatenate([self.lists, np.array(appended_lists, dtype=np.int32)])
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO docs (url, hash, row, list) VALUES (?, ?, ?, ?)",
+            [(urls[i], hashes[i], int(row), int(lst)) for i, row, lst in zip(changed, new_rows, new_lists)],
+        )
+        self.conn.commit()
+        self._by_list = None
+
+        if len(self) >= MIN_TRAIN and (self.centroids is None or len(self) >= RETRAIN_GROWTH * self.trained_on):
+            self.train()
+        return len(todo)
+
+    # Drop every indexed article whose url is not in keep. Their cached vectors stay,
+    # so an article that comes back is not encoded again
+    def prune(self, keep):
+        keep = set(keep)
+        gone = [url for url in self.urls if url not in keep]
+        if not gone:
+            return 0
+        self.conn.executemany("DELETE FROM docs WHERE url = ?", [(url,) for url in gone])
+        self.conn.commit()
+        kept = [i for i, url in enumerate(self.urls) if url in keep]
+        self.urls = [self.urls[i] for i in kept]
+        self.hashes = [self.hashes[i] for i in kept]
+        self.rows = self.rows[kept]
+        self.lists = self.lists[kept]
+        self.position = {url: i for i, url in enumerate(self.urls)}
+        self._by_list = None
+        return len(gone)
+
+    # --- CLUSTERS ---
+    def train(self):
+        n_lists = max(1, int(np.sqrt(len(self))))
+        rng = np.random.default_rng(3602)
+        sample = np.sort(rng.choice(len(self), size=min(len(self), n_lists * KMEANS_SAMPLE_PER_LIST), replace=False))
+        self.centroids = kmeans(np.asarray(self.vectors[self.rows[sample]]), n_lists)
+        self.lists = np.concatenate([
+            assign_lists(np.asarray(self.vectors[self.rows[i:i + 8192]]), self.centroids)
+            for i in range(0, len(self), 8192)
+        ])
+        np.save(os.path.join(self.path, "centroids.npy"), self.centroids)
+        self.conn.executemany("UPDATE docs SET list = ? WHERE url = ?",
+                              [(int(lst), url) for url, lst in zip(self.urls, self.lists)])
+        self.trained_on = len(self)
+        self._set_meta("trained_on", self.trained_on)
+        self.conn.commit()
+        self._by_list = None
+
+    # Article positions grouped by cluster: one argsort, redone only after changes
+    def _groups(self):
+        if self._by_list is None:
+            order = np.argsort(self.lists, kind="stable")
+            bounds = np.searchsorted(self.lists[order], np.arange(len(self.centroids) + 1))
+            self._by_list = (order, bounds)
+        return self._by_list
+
+    # --- SEARCH ---
+    # The k most similar indexed articles to a unit vector, as [(url, similarity)]
+    def search(self, vector, k=5, nprobe=NPROBE, exclude=()):
+        if not len(self):
+            return []
+        if self.centroids is None:
+            candidates = np.arange(len(self))
+        else:
+            order, bounds = self._groups()
+            closest = np.argsort(-(self.centroids @ vector))[:nprobe]
+            candidates = np.concatenate([order[bounds[c]:bounds[c + 1]] for c in closest])
+        scores = np.asarray(self.vectors[self.rows[candidates]]) @ vector
+        excluded = {self.position[url] for url in exclude if url in self.position}
+        top = np.argsort(-scores)[:k + len(excluded)]
+        results = [(self.urls[candidates[i]], float(scores[i])) for i in top if candidates[i] not in excluded]
+        return results[:k]
+
+    def similar_to_url(self, url, k=5, nprobe=NPROBE):
+        if url not in self.position:
+            return []
+        vector = np.asarray(self.vectors[self.rows[self.position[url]]])
+        return self.search(vector, k, nprobe, exclude=[url])
+
+    def similar_to_text(self, text, k=5, nprobe=NPROBE):
+        return self.search(self.encoder([text])[0], k, nprobe)
+
+    def close(self):
+        if not self.read_only:
+            self.vectors.flush()
+            self.conn.commit()
+        self.conn.close()
+
+
+# --- BUILD ---
+def input_chunks(path, chunksize):
+    from dataset import is_dataset, iter_articles
+    from output_writer import read_chunks
+
+    if is_dataset(path):
+        return iter_articles(path, columns=["url", "title", "summary", "text"], chunksize=chunksize)
+    return read_chunks(path, chunksize=chunksize)
+
+
+# Index every article of a scraped CSV/JSONL or the Parquet dataset. With prune, articles
+# no longer in the input leave the index. Returns (articles read, newly encoded, pruned)
+def build(path, root=DEFAULT_EMBEDDINGS_PATH, backend="hashing", model=DEFAULT_MODEL,
+          prune=False, chunksize=5000, batch_size=BATCH_SIZE):
+    index = EmbeddingIndex(root, backend, model)
+    seen = []
+    encoded = 0
+    try:
+        for chunk in input_chunks(path, chunksize):
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            texts = [article_text(row.get("title"), row.get("summary"), row.get("text"))
+                     for row in chunk.to_dict("records")]
+            encoded += index.add(list(chunk["url"]), texts, batch_size=batch_size)
+            seen.extend(chunk["url"])
+        pruned = index.prune(seen) if prune else 0
+    finally:
+        index.close()
+    return len(seen), encoded, pruned
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Article embeddings and similar article search")
+    parser.add_argument("--store", default=DEFAULT_EMBEDDINGS_PATH)
+    parser.add_argument("--backend", choices=BACKENDS, default="hashing")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="transformers backend model")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="index new and changed articles")
+    build_parser.add_argument("input", help="scraped CSV/JSONL or Parquet dataset directory")
+    build_parser.add_argument("--prune", action="store_true", help="drop articles no longer in the input")
+    build_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    similar = sub.add_parser("similar", help="closest articles to an indexed url or to some text")
+    similar.add_argument("url", nargs="?")
+    similar.add_argument("--text")
+    similar.add_argument("-k", type=int, default=5)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "build":
+        start = time.perf_counter()
+        read, encoded, pruned = build(args.input, args.store, args.backend, args.model, args.prune,
+                                      batch_size=args.batch_size)
+        print(f"🧭 Indexed {read} articles ({encoded} encoded, {pruned} pruned) in {time.perf_counter() - start:.2f}s")
+        return encoded
+
+    index = EmbeddingIndex(args.store, args.backend, args.model, read_only=True)
+    try:
+        results = index.similar_to_text(args.text, args.k) if args.text else index.similar_to_url(args.url, args.k)
+    finally:
+        index.close()
+    for url, score in results:
+        print(f"{score:.3f}  {url}")
+
+
+if __name__ == "__main__":
+    main()
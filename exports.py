@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from output_writer import CHUNK_SIZE
+
+# Downloads for the dashboard's Data Table tab. Nothing is serialized until someone asks
+# for a file: the slice is then written chunk by chunk to a file named after the data
+# version, the filters and the format, and served from there. Later reruns, and other
+# sessions with the same filters, reuse the file until the data changes. Only the newest
+# MAX_EXPORTS files are kept
+
+DEFAULT_EXPORT_DIR = ".exports"
+MAX_EXPORTS = 20
+# Format name -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "JSONL": ("jsonl", "application/x-ndjson"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+# The same filters on the same data always name the same file
+def export_key(version, filters, fmt):
+    encoded = json.dumps({"version": version, "filters": filters, "format": fmt}, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def export_path(key, fmt, directory=DEFAULT_EXPORT_DIR):
+    return os.path.join(directory, f"fraud_articles_{key}.{EXPORT_FORMATS[fmt][0]}")
+
+
+# --- WRITE ---
+# One chunk of rows serialized at a time, so the whole slice never exists as text in
+# memory. Written to a temporary file and renamed, so a half-written export is never served
+def write_export(df, path, fmt, chunksize=CHUNK_SIZE):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        chunks = (df.iloc[start:start + chunksize] for start in range(0, max(len(df), 1), chunksize))
+        if fmt == "Parquet":
+            _write_parquet(chunks, tmp_path, export_schema(df))
+        else:
+            with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+                for i, chunk in enumerate(chunks):
+                    if fmt == "CSV":
+                        chunk.to_csv(f, index=False, header=i == 0)
+                    elif len(chunk):
+                        chunk.to_json(f, orient="records", lines=True, force_ascii=False)
+                        f.write("\n")
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def _write_parquet(chunks, path, schema):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, preserve_index=False, schema=schema))
+
+
+# The Parquet schema of the whole slice, fixed before the first chunk is written. Types
+# inferred from one chunk would make a column that is empty there (published or
+# cluster_id on older rows) a null column that later chunks cannot be written into.
+# Dataset columns keep their dataset.META_SCHEMA type, typed pandas columns map as
+# they are, and other object columns (the short derived ones) are inferred from the
+# whole column, one column at a time. A column that is never set is written as strings
+def export_schema(df):
+    import pyarrow as pa
+
+    from dataset import META_SCHEMA
+
+    schema = pa.Schema.from_pandas(df.head(0), preserve_index=False)
+    fields = []
+    for field in schema:
+        if field.name in META_SCHEMA.names:
+            field = field.with_type(META_SCHEMA.field(field.name).type)
+        elif pa.types.is_null(field.type):
+            inferred = pa.array(df[field.name], from_pandas=True).type
+            field = field.with_type(pa.string() if pa.types.is_null(inferred) else inferred)
+        fields.append(field)
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+# --- CACHE ---
+# The export for these filters, written now only if it is not on disk already
+def export_file(df, fmt, key, directory=DEFAULT_EXPORT_DIR):
+    path = export_path(key, fmt, directory)
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+    write_export(df, path, fmt)
+    prune_exports(directory)
+    return path
+
+
+# Drop all but the keep most recently used exports
+def prune_exports(directory=DEFAULT_EXPORT_DIR, keep=MAX_EXPORTS):
+    files = [os.path.join(directory, name) for name in os.listdir(directory) if name.startswith("fraud_articles_")]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for path in files[keep:]:
+        os.remove(path)
@@ -0,0 +1,162 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-ins for the outside services the pipeline talks to, so the scraper
+# can be exercised without hitting acfe.com
+
+
+# --- FAKE HTTP SERVER ---
+# pages maps a path like "/article-1" to either an HTML string or a dict with
+# "body", "status", "headers", "delay" and "fail_first" (how many requests
+# get a 503 before the page starts working, handy for checking retries).
+# Every page gets an ETag, and a matching If-None-Match is answered with a 304
+@contextmanager
+def serve_pages(pages, host="127.0.0.1", port=0):
+    hits = {}
+    hits_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            spec = pages.get(self.path)
+            if isinstance(spec, str):
+                spec = {"body": spec}
+            with hits_lock:
+                hits[self.path] = hits.get(self.path, 0) + 1
+                count = hits[self.path]
+
+            if spec is None:
+                self._send(404, "not found", {})
+                return
+            if spec.get("delay"):
+                time.sleep(spec["delay"])
+            if count <= spec.get("fail_first", 0):
+                self._send(503, "try again", {})
+                return
+            etag = '"%s"' % hashlib.md5(spec.get("body", "").encode("utf-8")).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, "", {"ETag": etag})
+                return
+            headers = {"ETag": etag, **spec.get("headers", {})}
+            self._send(spec.get("status", 200), spec.get("body", ""), headers)
+
+        def _send(self, status, body, headers):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if status != 304:
+                self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            if status != 304:
+                self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.hits = hits
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, f"http://{host}:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# Builds an article page with the same markup the ACFE blog uses
+def fake_article_html(title, author, body):
+    return (
+        f"<html><body><h1>{title}</h1>"
+        f'<h5 class="margin-top-1">{author}</h5>'
+        f'<div class="cell large-8"><p>{body}</p></div>'
+        f"</body></html>"
+    )
+
+
+# Builds a blog index page listing the given article links as cards
+def fake_index_html(article_urls):
+    cards = "".join(
+        f'<div class="news-listing-item"><h3><a class="color-secondary" href="{url}">{url}</a></h3></div>'
+        for url in article_urls
+    )
+    return f'<html><body><a href="/">Home</a><div class="results">{cards}</div></body></html>'
+
+
+# --- FAKE SUPABASE ---
+# Mimics the bits of the supabase client we use: table(name).upsert(rows).execute()
+# and table(name).select(columns).range(start, end).execute(). Rows are kept in
+# memory keyed by key (url by default), and every execute() is counted as one
+# round trip. latency adds a sleep per call to mimic the network
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, table, action, payload=None):
+        self.table = table
+        self.action = action
+        self.payload = payload
+        self.start = None
+        self.end = None
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def order(self, column, desc=False):
+        return self
+
+    def execute(self):
+        self.table.client.calls += 1
+        if self.table.client.latency:
+            time.sleep(self.table.client.latency)
+        return self.table._run(self)
+
+
+class FakeTable:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    @property
+    def rows(self):
+        return self.client.tables.setdefault(self.name, {})
+
+    def upsert(self, rows):
+        return FakeQuery(self, "upsert", rows if isinstance(rows, list) else [rows])
+
+    def select(self, columns="*"):
+        return FakeQuery(self, "select", columns)
+
+    def _run(self, query):
+        if query.action == "upsert":
+            for row in query.payload:
+                self.rows[row[self.client.key]] = dict(row)
+            return FakeResponse(query.payload)
+        data = list(self.rows.values())
+        if query.start is not None:
+            data = data[query.start:query.end + 1]
+        if query.payload != "*":
+            columns = [c.strip() for c in query.payload.split(",")]
+            data = [{c: row.get(c) for c in columns} for row in data]
+        return FakeResponse(data)
+
+
+class FakeSupabase:
+    def __init__(self, key="url", latency=0.0):
+        self.key = key
+        self.latency = latency
+        self.tables = {}
+        self.calls = 0
+
+    def table(self, name):
+        return FakeTable(self, name)
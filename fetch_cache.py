@@ -0,0 +1,123 @@
+import hashlib
+import sqlite3
+import time
+
+DEFAULT_CACHE_PATH = ".fetch_cache.sqlite"
+
+
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+# --- FETCH CACHE ---
+# Remembers what each URL looked like the last time we processed it, so the next
+# run can send If-None-Match / If-Modified-Since and skip pages that did not change.
+# Entries are loaded into memory when the cache opens, so the fetch threads can read
+# them without touching sqlite; writes happen from the main thread.
+class FetchCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT,
+                fetched_at REAL
+            )
+            """
+        )
+        self.entries = {
+            url: {"etag": etag, "last_modified": last_modified, "body_hash": body_hash}
+            for url, etag, last_modified, body_hash in self.conn.execute(
+                "SELECT url, etag, last_modified, body_hash FROM pages"
+            )
+        }
+
+    def conditional_headers(self, url):
+        entry = self.entries.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    # "new" if we have never seen the URL, "unchanged" on a 304 or identical body,
+    # otherwise "changed"
+    def classify(self, url, response):
+        entry = self.entries.get(url)
+        if entry is None:
+            return "new"
+        if response.status_code == 304:
+            return "unchanged"
+        if entry["body_hash"] == content_hash(response.content):
+            return "unchanged"
+        return "changed"
+
+    # Only call this once the page has been fully processed, so a crash mid-run
+    # never marks an unprocessed page as done
+    def store(self, url, response):
+        if response.status_code == 304:
+            return
+        entry = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "body_hash": content_hash(response.content),
+        }
+        self.entries[url] = entry
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages (url, etag, last_modified, body_hash, fetched_at) VALUES (?, ?, ?, ?, ?)",
+            (url, entry["etag"], entry["last_modified"], entry["body_hash"], time.time()),
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+# --- HASH CACHE ---
+# A plain key -> value table for results derived from content (summaries, sentiment),
+# where the key is a content hash. Lookups and writes go a batch at a time
+class HashCache:
+    table = "hash_cache"
+    column = "value"
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, {self.column}, created_at REAL)"
+        )
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        # Stay under sqlite's limit on the number of query parameters
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(self.conn.execute(
+                f"SELECT key, {self.column} FROM {self.table} WHERE key IN ({placeholders})", chunk
+            ))
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO {self.table} (key, {self.column}, created_at) VALUES (?, ?, ?)",
+            [(key, value, now) for key, value in items],
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,216 @@
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import count, timer
+
+# Status codes that usually clear up on their own, so they are worth a retry
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+
+# --- RATE LIMITING ---
+# Each host gets its own semaphore (how many requests can be open at once)
+# and its own "next free slot" time (how many requests can start per second).
+# limits overrides both per host, {host: (per_host, rps)}, so every source keeps its own
+# politeness. budget caps the requests open at once over all hosts, for crawls that
+# share one limiter between several sources
+class HostLimiter:
+    def __init__(self, per_host=4, rps=5.0, limits=None, budget=None):
+        self.per_host = per_host
+        self.rps = rps
+        self.limits = dict(limits or {})
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_slot = defaultdict(float)
+        self._budget = threading.BoundedSemaphore(budget) if budget else None
+
+    def host_limits(self, host):
+        return self.limits.get(host, (self.per_host, self.rps))
+
+    def _reserve_slot(self, host):
+        # Hand out start times spaced by the interval, so threads never start in a burst
+        per_host, rps = self.host_limits(host)
+        interval = 1.0 / rps if rps and rps > 0 else 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot[host])
+            self._next_slot[host] = slot + interval
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(per_host)
+            semaphore = self._semaphores[host]
+        return slot, semaphore
+
+    # Blocks until a request to host may start. Release the returned permit when it is done
+    def acquire(self, host):
+        slot, semaphore = self._reserve_slot(host)
+        semaphore.acquire()
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        # The shared budget is only taken once the request can really start, so a
+        # request waiting out its host's rate limit never holds up other hosts
+        if self._budget is not None:
+            self._budget.acquire()
+        return Permit(semaphore, self._budget)
+
+
+class Permit:
+    def __init__(self, semaphore, budget=None):
+        self.semaphore = semaphore
+        self.budget = budget
+
+    def release(self):
+        if self.budget is not None:
+            self.budget.release()
+        self.semaphore.release()
+
+
+# --- RUN STATS ---
+class FetchStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.ok = 0
+        self.failed = 0
+        self.retries = 0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, latency, ok, retries):
+        with self._lock:
+            self.latencies.append(latency)
+            self.retries += retries
+            if ok:
+                self.ok += 1
+            else:
+                self.failed += 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        pages = self.ok + self.failed
+        return {
+            "pages": pages,
+            "ok": self.ok,
+            "failed": self.failed,
+            "retries": self.retries,
+            "elapsed_s": elapsed,
+            "pages_per_s": pages / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+        }
+
+    def report(self):
+        s = self.summary()
+        return (
+            f"Fetched {s['pages']} pages ({s['ok']} ok, {s['failed']} failed, {s['retries']} retries) "
+            f"in {s['elapsed_s']:.2f}s: {s['pages_per_s']:.1f} pages/sec, "
+            f"p50 {s['p50_ms']:.0f} ms, p95 {s['p95_ms']:.0f} ms"
+        )
+
+
+# --- SESSION ---
+# One session for the whole run so TCP/TLS connections get reused between requests
+def make_session(pool_size=10):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _retry_delay(response, attempt, backoff):
+    # Respect Retry-After when the server tells us how long to wait
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+    return backoff * (2 ** attempt) + random.uniform(0, backoff)
+
+
+# --- FETCH ---
+# Fetch one URL with retries. Returns (url, response or None, error or None).
+# headers is where conditional request headers from the fetch cache go
+def fetch_one(session, url, limiter, stats, timeout=10, retries=3, backoff=0.5, headers=None):
+    host = urlsplit(url).netloc
+    attempt = 0
+    start = time.perf_counter()
+    while True:
+        response = None
+        error = None
+        with timer("fetch_wait"):
+            permit = limiter.acquire(host)
+        try:
+            with timer("fetch"):
+                response = session.get(url, timeout=timeout, headers=headers)
+        # Anything requests raises (a bad URL, too many redirects, a broken body) comes
+        # back as this URL's error instead of ending the whole crawl
+        except requests.RequestException as e:
+            error = e
+        finally:
+            permit.release()
+
+        if error is not None:
+            transient = isinstance(error, (requests.ConnectionError, requests.Timeout))
+        else:
+            transient = response.status_code in TRANSIENT_STATUS
+        if not transient or attempt >= retries:
+            break
+        time.sleep(_retry_delay(response, attempt, backoff))
+        attempt += 1
+
+    if error is None:
+        try:
+            response.raise_for_status()
+        except requests.HTTPError as e:
+            error = e
+    stats.record(time.perf_counter() - start, error is None, attempt)
+    count("fetch_retries", attempt)
+    count("fetch_ok" if error is None else "fetch_failed")
+    return url, response, error
+
+
+# Fetch many URLs on a bounded thread pool. Results come back in the same order as
+# the input URLs so the output file keeps the order of article_urls.txt.
+# At most max_in_flight pages are fetched ahead of the consumer, so a slow
+# consumer never has the whole crawl sitting in memory.
+# With a FetchCache, requests are sent as conditional requests (ETag / Last-Modified).
+# limits sets per host limits (see HostLimiter); a limiter passed in is shared as it is
+def fetch_all(urls, workers=8, per_host=4, rps=5.0, timeout=10, retries=3, backoff=0.5,
+              session=None, stats=None, cache=None, max_in_flight=None, limits=None, limiter=None):
+    session = session or make_session(pool_size=max(workers, per_host))
+    limiter = limiter or HostLimiter(per_host=per_host, rps=rps, limits=limits)
+    stats = stats if stats is not None else FetchStats()
+    max_in_flight = max_in_flight or workers * 2
+
+    def job(url):
+        return fetch_one(
+            session, url, limiter, stats,
+            timeout=timeout, retries=retries, backoff=backoff,
+            headers=cache.conditional_headers(url) if cache else None,
+        )
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for url in urls:
+            pending.append(pool.submit(job, url))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    stats.stop()
@@ -1,16 +1,18 @@
-import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-from collections import Counter
-from textblob import TextBlob
 import os
-from dotenv import load_dotenv
-from supabase import create_client, client
+import time
+
+import streamlit as st
+import numpy as np
 
-load_dotenv()
-valid_url = True
+from dashboard_data import load_dashboard_data, load_embedding_index, load_search_index, load_time_series
+from exports import EXPORT_FORMATS, export_file, export_key, export_path
+from metrics import METRICS, observe, timer
+from rollups import overview_stats
 
 
+# Every rerun is timed end to end. Metrics are off unless METRICS_LOG / METRICS_FILE
+# are set in the environment the server was started with
+render_start = time.perf_counter()
 
 # Set up the main Streamlit page layout and basic configuration
 st.set_page_config(
@@ -22,106 +24,11 @@ st.set_page_config(
 # Simple title that tells the user what this app is focused on
 st.title("USAA Fraud Article Intelligence Dashboard (ACFE Source)")
 
-DATABASE_URL = os.getenv('SUPABASE_URL')
-if not DATABASE_URL:
-    print("URL not found, using local csv")
-    valid_url = False
-
-def init_connection():
-    url = DATABASE_URL
-    key = os.getenv("PUB_KEY")
-    return create_client(url, key)
-
-if valid_url:
-    supabaser = init_connection()
-
-# Load the summarized fraud article data from the CSV file
-def load_data():
-    # Reading in the data that comes from the earlier scraping and summarization step
-    df = pd.read_csv("fraud_articles_summarized.csv")
-    # Some rows may not have keywords yet, so I fill them with empty strings
-    if "keywords_found" not in df.columns:
-        df["keywords_found"] = ""
-    df["keywords_found"] = df["keywords_found"].fillna("")
-    # Same idea for the summary text, just making sure we do not get NaN issues later
-    if "summary" not in df.columns:
-        df["summary"] = ""
-    df["summary"] = df["summary"].fillna("")
-    return df
-
-def load_data_2():
-    return supabaser.table('articles_summarized').select('*').execute()
-
-if valid_url:
-    df_raw = load_data_2()
-    df_dict = df_raw.__dict__
-    df = pd.DataFrame.from_dict(df_dict['data'])
-else:
-    df = load_data()
-
-print(df.describe)
-# Assign a simple fraud trend label based on detected keywords
-if "trend" not in df.columns:
-    def get_trend(keywords_str: str) -> str:
-        # Convert to lower case once so the checks are easier to write and read
-        ks = str(keywords_str).lower()
-        if "money laundering" in ks:
-            return "Money Laundering"
-        if "embezzlement" in ks:
-            return "Embezzlement"
-        if "bribery" in ks:
-            return "Bribery or Corruption"
-        if "scam" in ks or "fraud investigation" in ks:
-            return "Scams or Fraud Cases"
-        # If we do not see any of our core terms, we treat it as a general or uncategorized case
-        if ks.strip() == "":
-            return "Uncategorized"
-        return "General Fraud"
-    # Apply the trend logic once up front so the rest of the app can use it
-    df["trend"] = df["keywords_found"].apply(get_trend)
-
-# Turn the comma separated keyword string into a list and count how many items there are
-def parse_keywords(s):
-    if pd.isna(s):
-        return []
-    # Here I trim extra spaces and drop any empty fragments
-    return [kw.strip().lower() for kw in str(s).split(",") if kw.strip()]
-
-df["keyword_list"] = df["keywords_found"].apply(parse_keywords)
-df["keyword_count"] = df["keyword_list"].apply(len)
-
-# Compute a simple severity score using the keywords we detect
-def compute_severity(keyword_list):
-    # I split these into high and medium risk for clarity when explaining to stakeholders
-    high_risk_terms = {"money laundering", "embezzlement", "bribery"}
-    medium_risk_terms = {"fraud investigation", "scam"}
-    score = 0.0
-    # Each keyword pushes the score upward depending on its risk level
-    for kw in keyword_list:
-        if kw in high_risk_terms:
-            score += 0.4
-        elif kw in medium_risk_terms:
-            score += 0.2
-        else:
-            score += 0.1
-    # Clip the score into the zero to one range so it stays on a familiar scale
-    score = max(0.0, min(score, 1.0))
-    return score
-
-df["severity_score"] = df["keyword_list"].apply(compute_severity)
-
-# Bucket severity into high, medium, and low levels based on the numeric score
-def bucket_severity(score):
-    # These thresholds are chosen so that one strong indicator lands in medium
-    # and multiple strong indicators push an article into high severity
-    if score >= 0.7:
-        return "High"
-    elif score >= 0.3:
-        return "Medium"
-    else:
-        return "Low"
+# Reposted and syndicated copies of a story are counted once unless the user asks for every row
+unique_stories = st.sidebar.checkbox("Count each story once", value=True, help="Hide near-duplicate reposts")
 
-df["severity_level"] = df["severity_score"].apply(bucket_severity)
+# Cached per data version, so reruns triggered by widgets do not reload or recompute anything
+df, keyword_index, rollups, version = load_dashboard_data(unique=unique_stories)
 
 # Sidebar filters so the user can slice the data in different ways
 st.sidebar.header("Filters")
@@ -132,28 +39,33 @@ selected_trend = st.sidebar.selectbox("Filter by fraud trend", trend_options)
 severity_options = ["All", "High", "Medium", "Low"]
 selected_severity = st.sidebar.selectbox("Filter by severity level", severity_options)
 
-keyword_options = ["All"] + sorted(
-    set(
-        [
-            kw.strip()
-            for kws in df["keywords_found"]
-            for kw in str(kws).split(",")
-            if kw.strip()
-        ]
-    )
-)
+keyword_options = ["All"] + sorted(keyword_index)
 selected_keyword = st.sidebar.selectbox("Filter by keyword", keyword_options)
 
-# Apply the selected filters to the dataframe so the rest of the app sees just that slice
-filtered_df = df.copy()
-if selected_trend != "All":
-    filtered_df = filtered_df[filtered_df["trend"] == selected_trend]
-if selected_severity != "All":
-    filtered_df = filtered_df[filtered_df["severity_level"] == selected_severity]
-if selected_keyword != "All":
-    filtered_df = filtered_df[
-        filtered_df["keywords_found"].str.contains(selected_keyword, case=False)
-    ]
+# Full text search over title, summary and article body, ranked with BM25.
+# Put phrases in quotes, for example "money laundering"
+search_query = st.sidebar.text_input("Search articles", placeholder='e.g. "money laundering" crypto')
+
+# Apply the selected filters to the dataframe so the rest of the app sees just that slice.
+# Building one mask and slicing once avoids copying the whole frame on every rerun,
+# and the keyword filter and search both go through inverted indexes instead of scanning rows
+with timer("dashboard_filter"):
+    mask = np.ones(len(df), dtype=bool)
+    if selected_trend != "All":
+        mask &= (df["trend"] == selected_trend).to_numpy()
+    if selected_severity != "All":
+        mask &= (df["severity_level"] == selected_severity).to_numpy()
+    if selected_keyword != "All":
+        keyword_mask = np.zeros(len(df), dtype=bool)
+        keyword_mask[keyword_index[selected_keyword]] = True
+        mask &= keyword_mask
+    if search_query.strip():
+        results = load_search_index(version).search(search_query)
+        search_scores = df["url"].map(dict(results))
+        mask &= search_scores.notna().to_numpy()
+        filtered_df = df[mask].assign(search_score=search_scores[mask]).sort_values("search_score", ascending=False)
+    else:
+        filtered_df = df[mask]
 
 st.markdown(f"### Showing {len(filtered_df)} articles after filters")
 
@@ -162,38 +74,40 @@ tab_overview, tab_highrisk, tab_table, tab_analyzer = st.tabs(
     ["Overview", "Top High Risk Articles", "Data Table", "Fraud Article Analyzer"]
 )
 
-# Overview tab: high level metrics and charts that summarize the current filtered view
+# Overview tab: high level metrics and charts that summarize the current filtered view.
+# Sidebar filters are answered from the count cubes built once per data version, only
+# search results (an arbitrary set of rows) are counted directly. Charts are native
+# Streamlit charts, so no matplotlib figures pile up over a long session
 with tab_overview:
     if filtered_df.empty:
         st.warning("No articles match the current filters.")
     else:
-        total_articles = len(filtered_df)
-        high_count = (filtered_df["severity_level"] == "High").sum()
-        med_count = (filtered_df["severity_level"] == "Medium").sum()
-        low_count = (filtered_df["severity_level"] == "Low").sum()
+        if search_query.strip():
+            stats = overview_stats(filtered_df)
+        else:
+            stats = rollups.query(
+                trend=None if selected_trend == "All" else selected_trend,
+                severity=None if selected_severity == "All" else selected_severity,
+                keyword=None if selected_keyword == "All" else selected_keyword,
+            )
+        total_articles = stats.total
+        high_count = int(stats.severity_counts["High"])
+        med_count = int(stats.severity_counts["Medium"])
+        low_count = int(stats.severity_counts["Low"])
 
         # Quick metric cards, so someone scanning the page can see the mix at a glance
         col1, col2, col3, col4 = st.columns(4)
         col1.metric("Total articles", total_articles)
-        col2.metric("High severity", int(high_count))
-        col3.metric("Medium severity", int(med_count))
-        col4.metric("Low severity", int(low_count))
+        col2.metric("High severity", high_count)
+        col3.metric("Medium severity", med_count)
+        col4.metric("Low severity", low_count)
 
         st.subheader("Summary of current view")
         # Identify the most common trend in the filtered slice
-        top_trend = (
-            filtered_df["trend"].value_counts().idxmax()
-            if not filtered_df["trend"].value_counts().empty
-            else "N/A"
-        )
-        # Collect all keywords so we can talk about which terms dominate this view
-        all_keywords = [
-            kw
-            for kws in filtered_df["keyword_list"]
-            for kw in kws
-        ]
-        keyword_counts = Counter(all_keywords)
-        top_keywords = ", ".join([k for k, _ in keyword_counts.most_common(3)]) if keyword_counts else "N/A"
+        top_trend = stats.top_trend
+        # Which terms dominate this view
+        keyword_counts = stats.keyword_counts
+        top_keywords = ", ".join(keyword_counts.index[:3]) if len(keyword_counts) else "N/A"
         # This paragraph is written in a plain tone that I would feel comfortable presenting as a student
         summary_text = (
             f"In this view, we are looking at {total_articles} fraud related articles from the ACFE source. "
@@ -205,58 +119,68 @@ with tab_overview:
         st.write(summary_text)
 
         st.subheader("Fraud severity distribution")
-        severity_counts = (
-            filtered_df["severity_level"]
-            .value_counts()
-            .reindex(["High", "Medium", "Low"])
-            .fillna(0)
+        st.bar_chart(
+            stats.severity_counts.rename("Number of articles"),
+            x_label="Severity level", y_label="Number of articles", sort=False,
         )
-        fig_sev, ax_sev = plt.subplots()
-        severity_counts.plot(kind="bar", ax=ax_sev)
-        ax_sev.set_ylabel("Number of articles")
-        ax_sev.set_title("Articles by severity level")
-        st.pyplot(fig_sev)
 
         st.subheader("Fraud trend distribution")
-        trend_counts = filtered_df["trend"].value_counts()
-        fig_trend, ax_trend = plt.subplots()
-        trend_counts.plot(kind="bar", ax=ax_trend)
-        ax_trend.set_ylabel("Number of articles")
-        ax_trend.set_title("Articles by fraud trend")
-        st.pyplot(fig_trend)
+        st.bar_chart(
+            stats.trend_counts.rename("Number of articles"),
+            x_label="Fraud trend", y_label="Number of articles", sort=False,
+        )
 
         # New visual: severity mix within each fraud trend
         st.subheader("Severity mix within each fraud trend")
-        if not filtered_df.empty:
-            # Create a crosstab of trend vs severity level
-            severity_trend = pd.crosstab(filtered_df["trend"], filtered_df["severity_level"])
-
-            # Ensure consistent column order and fill any missing levels with zero
-            severity_trend = severity_trend.reindex(columns=["High", "Medium", "Low"], fill_value=0)
-
-            # Convert counts to percentages within each trend so we can see the mix
-            severity_trend_pct = severity_trend.div(severity_trend.sum(axis=1), axis=0)
-
-            fig_combo, ax_combo = plt.subplots()
-            severity_trend_pct.plot(kind="bar", stacked=True, ax=ax_combo)
-            ax_combo.set_ylabel("Share of articles")
-            ax_combo.set_title("Severity mix by fraud trend")
-            ax_combo.legend(title="Severity level", bbox_to_anchor=(1.05, 1), loc="upper left")
-            st.pyplot(fig_combo)
+        if not stats.severity_by_trend.empty:
+            # Stacked to 100% so we can see the mix within each trend
+            st.bar_chart(
+                stats.severity_by_trend,
+                x_label="Fraud trend", y_label="Share of articles", stack="normalize", sort=False,
+            )
         else:
             st.info("Not enough data to calculate severity by fraud trend.")
 
         st.subheader("Top fraud keywords")
-        if keyword_counts:
-            top5 = keyword_counts.most_common(5)
-            fig_kw, ax_kw = plt.subplots()
-            ax_kw.bar([k for k, _ in top5], [v for _, v in top5])
-            ax_kw.set_ylabel("Frequency")
-            ax_kw.set_title("Top five fraud related keywords")
-            st.pyplot(fig_kw)
+        if len(keyword_counts):
+            st.bar_chart(
+                keyword_counts.head(5).rename("Frequency"),
+                x_label="Keyword", y_label="Frequency", sort=False,
+            )
         else:
             st.info("No keywords are available for the current selection.")
 
+    # Trends over time come from the weekly rollups by publish date, not from the frame
+    # above, so they follow the sidebar filters one at a time and ignore search
+    st.subheader("Articles per week")
+    time_series = load_time_series()
+    if time_series is None:
+        st.info("No publish dates counted yet. Run the crawl and the pipeline's trends stage to fill this in.")
+    else:
+        if selected_keyword != "All":
+            weekly = time_series["keyword"].reindex(columns=[selected_keyword], fill_value=0)
+        elif selected_severity != "All":
+            weekly = time_series["severity"].reindex(columns=[selected_severity], fill_value=0)
+        elif selected_trend != "All":
+            weekly = time_series["trend"].reindex(columns=[selected_trend], fill_value=0)
+        else:
+            weekly = time_series["trend"]
+        st.area_chart(weekly, x_label="Week published", y_label="Number of articles")
+        if time_series["undated"]:
+            st.caption(f"{time_series['undated']} articles without a publish date are not shown.")
+
+        st.subheader("Rising keywords")
+        spikes = time_series["spikes"]
+        if len(spikes):
+            st.caption("Keywords seen far more often in the last few weeks than in the half year before.")
+            st.dataframe(
+                spikes.rename(columns={"keyword": "Keyword", "recent": "Recent articles", "expected": "Expected",
+                                       "ratio": "Times expected"})[["Keyword", "Recent articles", "Expected", "Times expected"]].round(2),
+                hide_index=True,
+            )
+        else:
+            st.info("No keyword is rising sharply right now.")
+
 # Top high risk articles tab: surface the most severe cases for quick review
 with tab_highrisk:
     st.subheader("Top high risk articles")
@@ -272,6 +196,8 @@ with tab_highrisk:
         if high_risk.empty:
             st.info("No high risk articles were found for the current filters.")
         else:
+            similar_index = load_embedding_index()
+            title_by_url = dict(zip(df["url"], df["title"]))
             for _, row in high_risk.iterrows():
                 st.markdown(f"**{row['title']}**")
                 st.markdown(f"- Author: {row['author']}")
@@ -280,38 +206,69 @@ with tab_highrisk:
                 st.markdown(f"- Severity level: {row['severity_level']} (score: {row['severity_score']:.2f})")
                 st.markdown(f"- Keywords: {row['keywords_found']}")
                 st.markdown(f"- Summary: {row['summary']}")
+                # Closest articles by embedding, a way to find related cases beyond the keyword list
+                similar = similar_index.similar_to_url(row["url"], k=3) if similar_index else []
+                if similar:
+                    links = "; ".join(f"[{title_by_url.get(url, url)}]({url})" for url, _ in similar)
+                    st.markdown(f"- Similar articles: {links}")
                 st.markdown("---")
 
-# Data table tab: full filtered table plus an option to export the data
+# Data table tab: the filtered table a page at a time, plus exports of the whole slice.
+# Only the rows on screen are sent to the browser, and an export file is written only
+# when asked for, then kept for these filters so reruns and other sessions reuse it
 with tab_table:
     st.subheader("Filtered article data")
     if filtered_df.empty:
         st.info("No data is available to display for the current filters.")
     else:
+        table_columns = [
+            "title",
+            "author",
+            "url",
+            "keywords_found",
+            "trend",
+            "keyword_count",
+            "severity_level",
+            "severity_score",
+            "summary",
+        ] + (["search_score"] if "search_score" in filtered_df.columns else [])
+
         # This table is helpful for analysts who want to scan the raw records
-        st.dataframe(
-            filtered_df[
-                [
-                    "title",
-                    "author",
-                    "url",
-                    "keywords_found",
-                    "trend",
-                    "keyword_count",
-                    "severity_level",
-                    "severity_score",
-                    "summary",
-                ]
-            ]
-        )
-        # Offer a simple way to pull the current slice into a CSV file
-        csv_data = filtered_df.to_csv(index=False).encode("utf-8")
-        st.download_button(
-            label="Download filtered data as CSV",
-            data=csv_data,
-            file_name="fraud_articles_filtered.csv",
-            mime="text/csv",
-        )
+        page_col, size_col = st.columns([3, 1])
+        page_size = size_col.selectbox("Rows per page", [50, 100, 500], index=1)
+        page_count = max(1, -(-len(filtered_df) // page_size))
+        page_number = page_col.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+        first_row = (min(int(page_number), page_count) - 1) * page_size
+        st.dataframe(filtered_df.iloc[first_row:first_row + page_size][table_columns], hide_index=True)
+        st.caption(f"Rows {first_row + 1}-{min(first_row + page_size, len(filtered_df))} of {len(filtered_df)}")
+
+        # Offer a way to pull the current slice into a file
+        export_format = st.radio("Export format", list(EXPORT_FORMATS), horizontal=True)
+        export_filters = {
+            "unique": unique_stories,
+            "trend": selected_trend,
+            "severity": selected_severity,
+            "keyword": selected_keyword,
+            "search": search_query.strip(),
+        }
+        key = export_key(version, export_filters, export_format)
+        path = export_path(key, export_format)
+        if not os.path.exists(path):
+            prepare = st.empty()
+            if prepare.button(f"Prepare {export_format} export"):
+                with st.spinner("Writing export..."), timer("dashboard_export", n=len(filtered_df)):
+                    path = export_file(filtered_df[table_columns], export_format, key)
+                prepare.empty()
+        if os.path.exists(path):
+            extension, mime = EXPORT_FORMATS[export_format]
+            with open(path, "rb") as f:
+                st.download_button(
+                    label=f"Download filtered data as {export_format}",
+                    data=f,
+                    file_name=f"fraud_articles_filtered.{extension}",
+                    mime=mime,
+                    on_click="ignore",
+                )
 
 # Analyzer tab: score a custom text input using the same rule based logic
 with tab_analyzer:
@@ -322,103 +279,13 @@ with tab_analyzer:
     )
     analyze_button = st.button("Run analysis")
 
-    def analyze_text(text: str):
-        # I focus on a small core list of terms to keep the explanation straightforward
-        text_lower = text.lower()
-        all_keywords = ["embezzlement", "bribery", "fraud investigation", "money laundering", "scam"]
-        found_keywords = [kw for kw in all_keywords if kw in text_lower]
-
-        # Trend assignment follows the same style as the main dataset
-        if "money laundering" in text_lower:
-            trend = "Money Laundering"
-        elif "embezzlement" in text_lower:
-            trend = "Embezzlement"
-        elif "bribery" in text_lower:
-            trend = "Bribery or Corruption"
-        elif "scam" in text_lower or "fraud investigation" in text_lower:
-            trend = "Scams or Fraud Cases"
-        elif text.strip() == "":
-            trend = "Uncategorized"
-        else:
-            trend = "General Fraud"
-
-        # Severity and severity level reuse the same scoring logic used for the ACFE articles
-        severity_score = compute_severity(found_keywords)
-        severity_level = bucket_severity(severity_score)
-
-        # Sentiment is included as extra context about tone rather than as a risk driver
-        sentiment = TextBlob(text).sentiment.polarity
-        if sentiment <= -0.3:
-            tone_label = "strongly negative and focused on incidents or losses"
-        elif sentiment >= 0.3:
-            tone_label = "more positive and focused on prevention or response"
-        else:
-            tone_label = "neutral or analytical, closer to an explanation or investigation"
-
-        return {
-            "keywords": found_keywords,
-            "trend": trend,
-            "severity_score": severity_score,
-            "severity_level": severity_level,
-            "sentiment": sentiment,
-            "tone_label": tone_label,
-        }
-
-    def build_explanation(result):
-        # Turning the numeric output into a short narrative that is easier to talk through in a meeting
-        sev = result["severity_level"]
-        trend = result["trend"]
-        kws = result["keywords"]
-        score = result["severity_score"]
-        tone_label = result["tone_label"]
-
-        if sev == "High":
-            risk_line = (
-                f"This text is labeled as high severity with a score around {score:.2f} "
-                f"because it includes higher risk fraud language in our current rule set."
-            )
-            action_line = (
-                "In a real setting at USAA, this type of content could be a good candidate for a weekly fraud update "
-                "and for more detailed analyst review if it connects to ongoing cases."
-            )
-        elif sev == "Medium":
-            risk_line = (
-                f"This text is labeled as medium severity with a score around {score:.2f}. "
-                "It points to a meaningful fraud issue but not the highest tier in this simple scoring approach."
-            )
-            action_line = (
-                "For USAA, this type of text is useful for ongoing monitoring and helps show how this trend develops over time, "
-                "especially if similar stories begin to appear more often."
-            )
-        else:
-            risk_line = (
-                f"This text is labeled as low severity with a score around {score:.2f}. "
-                "It likely reflects general commentary, education, or lower impact fraud activity."
-            )
-            action_line = (
-                "For USAA, this kind of content is more helpful for background context and training rather than immediate response."
-            )
-
-        if kws:
-            kw_line = (
-                f"The main fraud terms that influence this assessment are: {', '.join(kws)}."
-            )
-        else:
-            kw_line = (
-                "None of the core fraud terms in the current rule set were detected, "
-                "so the assessment is mainly driven by general language instead of specific keywords."
-            )
-
-        tone_line = f"The overall tone of the text appears {tone_label}."
-        trend_line = (
-            f"Based on the words used, this text is most closely aligned with the {trend} trend category in the dashboard."
-        )
-
-        explanation = " ".join([risk_line, trend_line, kw_line, tone_line, action_line])
-        return explanation
-
     if analyze_button and input_text.strip():
-        result = analyze_text(input_text)
+        # Imported on first use, so sessions that never open this tab never load the
+        # analyzer (and TextBlob's lexicon behind it)
+        from analyzer import analyze_text, build_explanation
+
+        with timer("dashboard_analyze"):
+            result = analyze_text(input_text)
 
         st.subheader("Analysis results")
         st.write(f"Detected keywords: {', '.join(result['keywords']) if result['keywords'] else 'None'}")
@@ -431,6 +298,19 @@ with tab_analyzer:
         explanation_text = build_explanation(result)
         st.write(explanation_text)
 
+        # The ACFE articles whose embeddings are closest to the pasted text
+        similar_index = load_embedding_index()
+        if similar_index is not None:
+            st.markdown("### Closest ACFE articles")
+            title_by_url = dict(zip(df["url"], df["title"]))
+            with timer("dashboard_similar"):
+                similar = similar_index.similar_to_text(input_text, k=5)
+            for url, similarity in similar:
+                st.markdown(f"- [{title_by_url.get(url, url)}]({url}) (similarity {similarity:.2f})")
+
     elif analyze_button and not input_text.strip():
         # Quick reminder if someone clicks the button without entering text
         st.warning("Please paste some text to analyze.")
+
+observe("dashboard_render", time.perf_counter() - render_start)
+METRICS.flush(job="dashboard")
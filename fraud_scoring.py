@@ -0,0 +1,202 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# One place for the keyword rules used by the scraper, the dashboard and the weekly report.
+# Everything here works on whole pandas Series at once instead of row-by-row .apply calls
+
+# --- FRAUD KEYWORDS ---
+FRAUD_KEYWORDS = [
+    'embezzlement', 'bribery', 'fraud investigation', 'money laundering', 'scam'
+]
+
+# High risk terms add 0.4, medium 0.2 and anything else 0.1 to the severity score
+HIGH_RISK_TERMS = {"money laundering", "embezzlement", "bribery"}
+MEDIUM_RISK_TERMS = {"fraud investigation", "scam"}
+OTHER_TERM_WEIGHT = 0.1
+KEYWORD_WEIGHTS = {
+    **{kw: 0.4 for kw in HIGH_RISK_TERMS},
+    **{kw: 0.2 for kw in MEDIUM_RISK_TERMS},
+}
+
+# Trend labels, checked in this order so the most specific term wins
+TREND_RULES = [
+    ("Money Laundering", ["money laundering"]),
+    ("Embezzlement", ["embezzlement"]),
+    ("Bribery or Corruption", ["bribery"]),
+    ("Scams or Fraud Cases", ["scam", "fraud investigation"]),
+]
+
+# The broader categories used by the weekly report charts
+CATEGORY_RULES = [
+    ("Cyber Fraud", ['phishing', 'cybercrime', 'data breach', 'ransomware']),
+    ("Financial Fraud", ['embezzlement', 'corruption', 'money laundering']),
+    ("Compliance Issues", ['non-compliance', 'error', 'irregularity']),
+]
+
+SEVERITY_LEVELS = ["High", "Medium", "Low"]
+
+
+def keyword_weight(kw):
+    return KEYWORD_WEIGHTS.get(kw, OTHER_TERM_WEIGHT)
+
+
+# --- MATCHER ---
+# Every keyword is compiled once into a pattern that starts with a plain literal and
+# then checks the word boundary with a lookbehind, e.g. scam(?<=\bscam). Starting with
+# a literal lets the regex engine use its fast substring search, where a leading \b
+# or one big alternation falls back to trying every position (about 10x slower on
+# article-length text). The boundary is only checked at the start of the term, so
+# "scam" still catches "scams" and "scammers". Multi-word terms allow any whitespace
+# between the words
+def compile_term(kw):
+    first, *rest = kw.lower().split()
+    first = re.escape(first)
+    return re.compile(first + rf"(?<=\b{first})" + "".join(r"\s+" + re.escape(w) for w in rest))
+
+
+def compile_matcher(keywords):
+    return {kw: compile_term(kw) for kw in keywords}
+
+
+# Plain substring checks are cheaper still, so each term is first looked up as a
+# substring of its first word and the regex only runs on the rows that hit. The result
+# is a boolean (articles x keywords) matrix that the rest of the scoring works on
+def presence_matrix(lowered, matcher):
+    presence = np.zeros((len(lowered), len(matcher)), dtype=bool)
+    for j, (kw, pattern) in enumerate(matcher.items()):
+        first = kw.split()[0].lower()
+        hits = [i for i, text in enumerate(lowered) if first in text]
+        confirmed = [i for i in hits if pattern.search(lowered[i])]
+        presence[confirmed, j] = True
+    return presence
+
+
+TERM_PATTERNS = compile_matcher(FRAUD_KEYWORDS)
+
+
+# --- SCORING HELPERS ---
+def bucket_severity_array(scores):
+    # These thresholds are chosen so that one strong indicator lands in medium
+    # and multiple strong indicators push an article into high severity
+    return np.select([scores >= 0.7, scores >= 0.3], ["High", "Medium"], default="Low")
+
+
+def _trend_from_presence(presence, empty):
+    conditions = [presence[terms].any(axis=1).to_numpy() for _, terms in TREND_RULES]
+    labels = [label for label, _ in TREND_RULES]
+    trend = np.select(conditions, labels, default="General Fraud")
+    return np.where(empty, "Uncategorized", trend)
+
+
+# Turn the keyword presence matrix into keyword lists and "a, b, c" strings. Each row is
+# packed into a bitmask first, so the Python work happens once per distinct combination
+# (at most 2^5) instead of once per article
+def _lists_from_presence(presence, keywords):
+    bits = presence[keywords].to_numpy() @ (1 << np.arange(len(keywords)))
+    codes, uniques = pd.factorize(bits)
+    lists = [[kw for i, kw in enumerate(keywords) if mask >> i & 1] for mask in uniques]
+    joined = np.array([", ".join(kws) for kws in lists], dtype=object)
+    list_column = pd.Series(np.empty(len(codes), dtype=object), index=presence.index)
+    list_column[:] = [lists[c] for c in codes]
+    return joined[codes], list_column
+
+
+# --- TEXT SCORING ---
+# Scan raw article text and return everything the dashboard needs: keywords_found,
+# keyword_list, keyword_count, trend, severity_score and severity_level, in the same
+# row order as the input. Text with no core terms is "General Fraud", only empty
+# text is "Uncategorized" (same as the analyzer tab)
+def score_texts(texts, matcher=None):
+    matcher = matcher or TERM_PATTERNS
+    keywords = list(matcher)
+    texts = pd.Series(texts).fillna("").astype(str)
+    lowered = [text.lower() for text in texts.tolist()]
+    empty = np.array([not text or text.isspace() for text in lowered], dtype=bool)
+    presence = pd.DataFrame(presence_matrix(lowered, matcher), index=texts.index, columns=keywords)
+
+    weights = np.array([keyword_weight(kw) for kw in keywords])
+    counts = presence.sum(axis=1).to_numpy()
+    scores = np.clip(presence.to_numpy() @ weights, 0.0, 1.0)
+    keywords_found, keyword_list = _lists_from_presence(presence, keywords)
+
+    return pd.DataFrame(
+        {
+            "keywords_found": keywords_found,
+            "keyword_list": keyword_list,
+            "keyword_count": counts,
+            "trend": _trend_from_presence(presence, empty),
+            "severity_score": scores,
+            "severity_level": bucket_severity_array(scores),
+        },
+        index=texts.index,
+    )
+
+
+# --- KEYWORD STRING SCORING ---
+# Same outputs, but starting from the comma separated keywords_found column that the
+# scraper already stored. There are only a handful of distinct keyword strings in the
+# whole table, so each distinct string is scored once and the results are spread back
+# out by position. Unknown keywords still count (0.1 each) like before
+def _score_keyword_string(keywords_str):
+    ks = keywords_str.lower()
+    keyword_list = [kw.strip() for kw in ks.split(",") if kw.strip()]
+    score = max(0.0, min(sum(keyword_weight(kw) for kw in keyword_list), 1.0))
+    trend = "General Fraud"
+    for label, terms in TREND_RULES:
+        if any(term in ks for term in terms):
+            trend = label
+            break
+    else:
+        if ks.strip() == "":
+            trend = "Uncategorized"
+    return keyword_list, trend, score
+
+
+def score_keyword_strings(keywords_found):
+    keywords_found = pd.Series(keywords_found).fillna("").astype(str)
+    codes, uniques = pd.factorize(keywords_found)
+    scored = [_score_keyword_string(ks) for ks in uniques]
+
+    lists = [keyword_list for keyword_list, _, _ in scored]
+    counts = np.array([len(keyword_list) for keyword_list in lists], dtype=int)
+    trends = np.array([trend for _, trend, _ in scored], dtype=object)
+    scores = np.array([score for _, _, score in scored], dtype=float)
+
+    keyword_list = pd.Series(np.empty(len(codes), dtype=object), index=keywords_found.index)
+    keyword_list[:] = [lists[c] for c in codes]
+
+    return pd.DataFrame(
+        {
+            "keyword_list": keyword_list,
+            "keyword_count": counts[codes],
+            "trend": trends[codes],
+            "severity_score": scores[codes],
+            "severity_level": bucket_severity_array(scores[codes]),
+        },
+        index=keywords_found.index,
+    )
+
+
+# --- CATEGORIES ---
+# The weekly report's Cyber / Financial / Compliance / Other split
+def classify_categories(keywords_found):
+    lowered = pd.Series(keywords_found).fillna("").astype(str).str.lower()
+    conditions = [
+        lowered.str.contains("|".join(re.escape(t) for t in terms)).to_numpy()
+        for _, terms in CATEGORY_RULES
+    ]
+    labels = [label for label, _ in CATEGORY_RULES]
+    return pd.Series(np.select(conditions, labels, default="Other"), index=lowered.index)
+
+
+# --- SINGLE TEXT ---
+# Convenience wrappers for one article at a time (scraper loop, analyzer tab)
+def detect_keywords(text):
+    text_lower = text.lower()
+    return [kw for kw, pattern in TERM_PATTERNS.items() if pattern.search(text_lower)]
+
+
+def score_text(text):
+    return score_texts(pd.Series([text])).iloc[0].to_dict()
@@ -0,0 +1,252 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Run metrics for the scraper, sync and dashboard: timers and counters around the hot
+# paths, kept in memory and written out at the end of a run (or after every dashboard
+# render) as
+#   - JSON lines: one object per event, plus a final "metrics" snapshot
+#   - a Prometheus text file, for node_exporter's textfile collector or a quick diff
+#   - per stage cProfile (.prof) or pyinstrument (.html) profiles, only when asked for.
+#     Stages timed in worker processes (parse, detect) are recorded but not profiled
+# Nothing is written unless a path is set. The in-memory aggregates are always kept,
+# since every run prints them as its stage report, so an unconfigured timer still costs
+# two clock reads, two getrusage calls and one locked update (about 6 µs): fine around
+# batches and pages, too much for a per-item inner loop.
+# Every setting can also come from the environment, which is how the dashboard
+# (started by streamlit, so it has no flags of its own) turns them on:
+#   METRICS_LOG=run.jsonl METRICS_FILE=metrics.prom METRICS_PROFILE=summarize,upsert
+
+PROFILERS = ["cprofile", "pyinstrument"]
+DEFAULT_PROFILE_DIR = "profiles"
+PROMETHEUS_PREFIX = "fraud_"
+
+
+# Peak resident memory of this process in bytes, or None where getrusage is missing
+def peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# --- PROFILERS ---
+# One profiler per stage, started and stopped around every timed block of that stage so
+# its profile adds up over the whole run. Only one profiler can be active per process,
+# so blocks that overlap one already being profiled (other threads, nested stages) are
+# timed but not profiled
+class CProfileHook:
+    suffix = ".prof"
+
+    def __init__(self):
+        import cProfile
+
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def save(self, path):
+        self.profile.dump_stats(path)
+
+
+class PyinstrumentHook:
+    suffix = ".html"
+
+    def __init__(self):
+        from pyinstrument import Profiler
+
+        self.profiler = Profiler()
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.profiler.output_html())
+
+
+PROFILER_HOOKS = {"cprofile": CProfileHook, "pyinstrument": PyinstrumentHook}
+
+
+# --- REGISTRY ---
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiling = threading.Lock()
+        self.reset()
+        self.configure()
+
+    def reset(self):
+        with self._lock:
+            # name -> {"count", "seconds", "max_seconds", "rss_growth_bytes"}
+            self.timers = {}
+            self.counters = {}
+            self.gauges = {}
+            self._profilers = {}
+            self.started = time.time()
+
+    def configure(self, log_path=None, metrics_path=None, profile=(), profile_dir=None, profiler=None):
+        self.log_path = log_path or os.getenv("METRICS_LOG") or None
+        self.metrics_path = metrics_path or os.getenv("METRICS_FILE") or None
+        profile = profile or [s for s in os.getenv("METRICS_PROFILE", "").split(",") if s]
+        self.profile = set(profile)
+        self.profile_dir = profile_dir or os.getenv("METRICS_PROFILE_DIR") or DEFAULT_PROFILE_DIR
+        self.profiler = profiler or os.getenv("METRICS_PROFILER") or "cprofile"
+        if self.profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler {self.profiler!r}, expected one of {PROFILERS}")
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    # Record time measured somewhere else, for example in a worker process
+    def observe(self, name, seconds, n=1, rss_growth=0):
+        with self._lock:
+            entry = self.timers.setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "rss_growth_bytes": 0})
+            entry["count"] += n
+            entry["seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds / n if n else seconds)
+            entry["rss_growth_bytes"] += rss_growth
+
+    def _profiler_for(self, name):
+        if name not in self.profile and "all" not in self.profile:
+            return None
+        if not self._profiling.acquire(blocking=False):
+            return None
+        try:
+            with self._lock:
+                if name not in self._profilers:
+                    self._profilers[name] = PROFILER_HOOKS[self.profiler]()
+                return self._profilers[name]
+        except BaseException:
+            self._profiling.release()
+            raise
+
+    # Time a block. n is how many items the block handled, so max_seconds stays per item.
+    # The peak memory the block added is kept too, which points at the stage that grew it
+    @contextlib.contextmanager
+    def timer(self, name, n=1):
+        hook = self._profiler_for(name)
+        rss_before = peak_rss()
+        start = time.perf_counter()
+        if hook:
+            hook.start()
+        try:
+            yield
+        finally:
+            if hook:
+                hook.stop()
+                self._profiling.release()
+            rss_after = peak_rss()
+            growth = rss_after - rss_before if rss_before is not None else 0
+            self.observe(name, time.perf_counter() - start, n, growth)
+
+    # --- OUTPUT ---
+    def log(self, event, **fields):
+        if not self.log_path:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str, ensure_ascii=False)
+        with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def snapshot(self):
+        rss = peak_rss()
+        if rss is not None:
+            self.gauge("peak_rss_bytes", rss)
+        with self._lock:
+            return {
+                "elapsed_s": time.time() - self.started,
+                "timers": {name: dict(entry) for name, entry in self.timers.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+            }
+
+    def prometheus_text(self, snapshot=None, labels=None):
+        snapshot = snapshot or self.snapshot()
+        label_text = ",".join(f'{k}="{v}"' for k, v in sorted((labels or {}).items()))
+
+        def sample(metric, value, extra=""):
+            inner = ",".join(part for part in (label_text, extra) if part)
+            return f"{PROMETHEUS_PREFIX}{metric}{{{inner}}} {value}" if inner else f"{PROMETHEUS_PREFIX}{metric} {value}"
+
+        lines = []
+        if snapshot["timers"]:
+            for metric, key, kind in (("stage_seconds_total", "seconds", "counter"),
+                                      ("stage_calls_total", "count", "counter"),
+                                      ("stage_max_seconds", "max_seconds", "gauge"),
+                                      ("stage_rss_growth_bytes", "rss_growth_bytes", "gauge")):
+                lines.append(f"# TYPE {PROMETHEUS_PREFIX}{metric} {kind}")
+                lines.extend(sample(metric, entry[key], f'stage="{name}"') for name, entry in sorted(snapshot["timers"].items()))
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}{name}_total counter")
+            lines.append(sample(f"{name}_total", value))
+        for name, value in sorted(snapshot["gauges"].items()):
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}{name} gauge")
+            lines.append(sample(name, value))
+        return "\n".join(lines) + "\n"
+
+    # Write everything configured: the snapshot as a log line, the Prometheus file
+    # (atomically, so a collector never reads half of it) and the profiles
+    def flush(self, job=None):
+        snapshot = self.snapshot()
+        self.log("metrics", job=job, **snapshot)
+        if self.metrics_path:
+            tmp_path = self.metrics_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text(snapshot, {"job": job} if job else None))
+            os.replace(tmp_path, self.metrics_path)
+        with self._lock:
+            profilers = dict(self._profilers)
+        if profilers:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            for name, hook in profilers.items():
+                hook.save(os.path.join(self.profile_dir, (f"{job}." if job else "") + name + hook.suffix))
+        return snapshot
+
+    def report(self):
+        with self._lock:
+            timers = sorted(self.timers.items(), key=lambda item: -item[1]["seconds"])
+        return ", ".join(f"{name} {entry['seconds']:.2f}s/{entry['count']}" for name, entry in timers)
+
+
+# The registry every module records into
+METRICS = Metrics()
+timer = METRICS.timer
+count = METRICS.count
+observe = METRICS.observe
+log = METRICS.log
+
+
+# --- CLI FLAGS ---
+# The same flags on every script that records metrics
+def add_arguments(parser):
+    parser.add_argument("--metrics-log", help="append structured JSON events to this file")
+    parser.add_argument("--metrics-file", help="write Prometheus text metrics here at the end of the run")
+    parser.add_argument("--profile", nargs="+", default=[], metavar="STAGE",
+                        help="profile these stages ('all' for every one) into --profile-dir")
+    parser.add_argument("--profile-dir", default=None, help=f"where profiles go (default {DEFAULT_PROFILE_DIR})")
+    parser.add_argument("--profiler", choices=PROFILERS, default=None, help="cprofile, or pyinstrument if installed")
+
+
+def configure_from_args(args):
+    METRICS.configure(args.metrics_log, args.metrics_file, args.profile, args.profile_dir, args.profiler)
@@ -0,0 +1,200 @@
+import csv
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+# Append-only output for the scraper. Rows are written to disk as soon as they are
+# ready, so memory does not grow with the crawl and a crash keeps everything written so far
+
+CHUNK_SIZE = 5000
+
+
+def output_format(path):
+    return "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+# --- ROW WRITERS ---
+class CsvRowWriter:
+    def __init__(self, path, columns, truncate=False):
+        write_header = truncate or not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "w" if truncate else "a", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=columns, extrasaction="ignore")
+        if write_header:
+            self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.file.flush()
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlRowWriter:
+    def __init__(self, path, columns, truncate=False):
+        self.columns = columns
+        self.file = open(path, "w" if truncate else "a", encoding="utf-8")
+
+    def write(self, row):
+        self.write_rows([row])
+
+    def write_rows(self, rows):
+        self.file.writelines(
+            json.dumps({c: row.get(c) for c in self.columns}, ensure_ascii=False) + "\n" for row in rows
+        )
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def open_writer(path, columns, truncate=False, fmt=None):
+    writer_class = JsonlRowWriter if (fmt or output_format(path)) == "jsonl" else CsvRowWriter
+    return writer_class(path, columns, truncate=truncate)
+
+
+# --- READING BACK ---
+# Read the output in chunks so nothing ever needs the whole file in memory at once
+def read_chunks(path, columns=None, chunksize=CHUNK_SIZE):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    if output_format(path) == "jsonl":
+        for chunk in pd.read_json(path, lines=True, chunksize=chunksize, dtype=False):
+            # Keys no row has yet come back empty, like a column added to a CSV by ensure_columns
+            yield chunk.reindex(columns=columns) if columns else chunk
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+
+def existing_keys(path, key="url"):
+    keys = set()
+    for chunk in read_chunks(path, columns=[key]):
+        keys.update(chunk[key].dropna())
+    return keys
+
+
+# --- SCHEMA UPGRADE ---
+# A CSV written before a column was added has a header without it, and appending rows
+# with the new column would shift every field. Rewrite such a file once, chunk by chunk,
+# with the missing columns left empty. JSONL rows name their fields, so they need nothing
+def ensure_columns(path, columns):
+    if output_format(path) != "csv" or not os.path.exists(path) or os.path.getsize(path) == 0:
+        return []
+    header = list(pd.read_csv(path, nrows=0).columns)
+    missing = [c for c in columns if c not in header]
+    if not missing:
+        return []
+    tmp_path = path + ".tmp"
+    writer = open_writer(tmp_path, header + missing, truncate=True, fmt="csv")
+    for chunk in read_chunks(path):
+        writer.write_rows(chunk.astype(object).where(chunk.notna(), None).to_dict("records"))
+    writer.close()
+    os.replace(tmp_path, path)
+    return missing
+
+
+# Set one column from a key -> value mapping (adding the column if the file lacks it),
+# rewriting the file chunk by chunk. Rows whose key is not in the mapping keep their value
+def rewrite_column(path, column, values, key="url"):
+    tmp_path = path + ".tmp"
+    writer = None
+    for chunk in read_chunks(path):
+        if column not in chunk.columns:
+            chunk[column] = None
+        mapped = chunk[key].map(values)
+        chunk[column] = mapped.where(mapped.notna(), chunk[column])
+        if writer is None:
+            writer = open_writer(tmp_path, list(chunk.columns), truncate=True, fmt=output_format(path))
+        writer.write_rows(chunk.astype(object).where(chunk.notna(), None).to_dict("records"))
+    if writer is None:
+        return
+    writer.close()
+    os.replace(tmp_path, path)
+
+
+# --- DEDUPE ---
+# When an article changed, its new row was appended after the old one. Keep only the
+# last row per url (and none for urls in drop): one pass over the url column to find
+# the winners, then a second pass that copies them over chunk by chunk
+def dedupe_output(path, key="url", drop=()):
+    last_position = {}
+    position = 0
+    for chunk in read_chunks(path, columns=[key]):
+        for value in chunk[key]:
+            last_position[value] = position
+            position += 1
+    keep = {pos for value, pos in last_position.items() if value not in drop}
+    if len(keep) == position:
+        return 0
+
+    tmp_path = path + ".tmp"
+    columns = None
+    position = 0
+    writer = None
+    for chunk in read_chunks(path):
+        if writer is None:
+            columns = list(chunk.columns)
+            writer = open_writer(tmp_path, columns, truncate=True, fmt=output_format(path))
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for row in chunk.to_dict("records"):
+            if position in keep:
+                writer.write(row)
+            position += 1
+    writer.close()
+    os.replace(tmp_path, path)
+    return position - len(keep)
+
+
+# --- PARQUET COMPACTION ---
+# Optional columnar copy of the output for faster loading, written chunk by chunk
+def compact_to_parquet(path, parquet_path=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet_path = parquet_path or os.path.splitext(path)[0] + ".parquet"
+    tmp_path = parquet_path + ".tmp"
+    writer = None
+    for chunk in read_chunks(path):
+        table = pa.Table.from_pandas(chunk.astype("string"), preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(tmp_path, table.schema, compression="zstd")
+        writer.write_table(table)
+    if writer is None:
+        return None
+    writer.close()
+    os.replace(tmp_path, parquet_path)
+    return parquet_path
+
+
+# --- CHECKPOINT ---
+# Remembers how many URLs of this exact URL list were fully processed, so a restarted
+# run picks up right after the last one instead of starting over
+class Checkpoint:
+    def __init__(self, path, urls, output):
+        self.path = path
+        self.signature = hashlib.sha256("\n".join([output] + list(urls)).encode("utf-8")).hexdigest()
+
+    def resume_index(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("signature") != self.signature:
+            return 0
+        return state.get("next_index", 0)
+
+    def save(self, next_index):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": self.signature, "next_index": next_index}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,292 @@
+import argparse
+import mmap
+import os
+import sqlite3
+import time
+import zlib
+from collections import Counter
+
+from fetch_cache import content_hash
+
+# Every fetched page, kept once under the hash of its content. Pages are zlib
+# compressed with a dictionary of the lines the site's pages share (navigation,
+# footer, scripts), which is most of each page, and appended to one pack file. A small
+# sqlite index maps content hash -> place in the pack, and (url, fetch time) -> hash,
+# so the page a url had at any earlier time can be found again. Reads go through a
+# memory map of the pack, one page at a time, so replaying the whole store never holds
+# more than one page in memory:
+#   python page_store.py stats
+#   python page_store.py get https://www.acfe.com/acfe-insights-blog --at 2024-03-01
+#   python scrape_articles.py --replay          (re-extract every stored article)
+# Pages stored before the dictionary existed stay plain zlib until `recompress`
+
+DEFAULT_PAGE_STORE_PATH = ".page_store"
+PACK_NAME = "pages.pack"
+INDEX_NAME = "index.sqlite"
+
+# A dictionary is trained once this many pages are stored. zlib only looks back
+# 32 KiB, so a bigger dictionary would never be used
+DICT_SAMPLES = 16
+DICT_SIZE = 32 * 1024
+COMPRESSION_LEVEL = 6
+
+
+# --- DICTIONARY ---
+# Lines that appear in at least half of the sample pages, the ones worth the most bytes
+# kept. zlib matches closer data more cheaply, so the most valuable lines go last
+def train_dictionary(samples, size=DICT_SIZE):
+    counts = Counter()
+    for sample in samples:
+        counts.update(set(sample.splitlines(keepends=True)))
+    min_count = max(2, len(samples) // 2)
+    shared = sorted(
+        (line for line, n in counts.items() if n >= min_count and len(line) > 8),
+        key=lambda line: counts[line] * len(line),
+        reverse=True,
+    )
+    chosen = []
+    total = 0
+    for line in shared:
+        if total + len(line) <= size:
+            chosen.append(line)
+            total += len(line)
+    return b"".join(reversed(chosen))
+
+
+def compress(data, zdict=None):
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=zdict) if zdict else zlib.compressobj(COMPRESSION_LEVEL)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress(data, zdict=None):
+    decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+# --- STORE ---
+class PageStore:
+    def __init__(self, root=DEFAULT_PAGE_STORE_PATH):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.pack_path = os.path.join(root, PACK_NAME)
+        self.conn = sqlite3.connect(os.path.join(root, INDEX_NAME))
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                offset INTEGER,
+                length INTEGER,
+                size INTEGER,
+                dict_id INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS fetches (
+                url TEXT,
+                fetched_at REAL,
+                hash TEXT,
+                PRIMARY KEY (url, fetched_at)
+            );
+            CREATE TABLE IF NOT EXISTS dicts (id INTEGER PRIMARY KEY, zdict BLOB, created_at REAL);
+            """
+        )
+        self.dicts = dict(self.conn.execute("SELECT id, zdict FROM dicts"))
+        self.dict_id = max(self.dicts, default=0)
+        self.pack = open(self.pack_path, "ab")
+        self._map = None
+
+    # --- WRITE ---
+    # Store the page a url had at fetched_at (now by default). The content is written
+    # only if no page with the same hash is stored yet. Returns the hash
+    def put(self, url, text, fetched_at=None):
+        data = text.encode("utf-8")
+        digest = content_hash(data)
+        if self.conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone() is None:
+            if not self.dict_id and self.count_blobs() >= DICT_SAMPLES:
+                self.train()
+            blob = compress(data, self.dicts.get(self.dict_id))
+            offset = self.pack.seek(0, os.SEEK_END)
+            self.pack.write(blob)
+            self.pack.flush()
+            self.conn.execute(
+                "INSERT INTO blobs (hash, offset, length, size, dict_id) VALUES (?, ?, ?, ?, ?)",
+                (digest, offset, len(blob), len(data), self.dict_id),
+            )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO fetches (url, fetched_at, hash) VALUES (?, ?, ?)",
+            (url, time.time() if fetched_at is None else fetched_at, digest),
+        )
+        return digest
+
+    # Train a dictionary on the most recently stored pages. Pages stored from now on use it
+    def train(self, samples=DICT_SAMPLES):
+        hashes = [h for (h,) in self.conn.execute("SELECT hash FROM blobs ORDER BY offset DESC LIMIT ?", (samples,))]
+        zdict = train_dictionary([self.read_bytes(h) for h in hashes])
+        if not zdict:
+            return None
+        cursor = self.conn.execute("INSERT INTO dicts (zdict, created_at) VALUES (?, ?)", (zdict, time.time()))
+        self.dict_id = cursor.lastrowid
+        self.dicts[self.dict_id] = zdict
+        self.conn.commit()
+        return self.dict_id
+
+    # --- READ ---
+    def _view(self, end):
+        # The map is made again only when the pack has grown past what it covers
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            with open(self.pack_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _read(self, offset, length, dict_id):
+        view = self._view(offset + length)
+        return decompress(view[offset:offset + length], self.dicts.get(dict_id))
+
+    def read_bytes(self, digest):
+        entry = self.conn.execute("SELECT offset, length, dict_id FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if entry is None:
+            raise KeyError(digest)
+        return self._read(*entry)
+
+    def get(self, digest):
+        return self.read_bytes(digest).decode("utf-8")
+
+    # (fetched_at, hash) of the newest page of url fetched at or before `at`, or None
+    def lookup(self, url, at=None):
+        return self.conn.execute(
+            "SELECT fetched_at, hash FROM fetches WHERE url = ? AND fetched_at <= ? ORDER BY fetched_at DESC LIMIT 1",
+            (url, time.time() if at is None else at),
+        ).fetchone()
+
+    def page(self, url, at=None):
+        found = self.lookup(url, at)
+        return None if found is None else self.get(found[1])
+
+    def history(self, url):
+        return self.conn.execute("SELECT fetched_at, hash FROM fetches WHERE url = ? ORDER BY fetched_at", (url,)).fetchall()
+
+    # (url, fetched_at, text) for the newest page of every url (or of the urls given),
+    # read one at a time in pack order so the reads stay mostly sequential
+    def iter_pages(self, urls=None, at=None):
+        wanted = None if urls is None else set(urls)
+        rows = self.conn.execute(
+            """
+            SELECT f.url, f.fetched_at, b.offset, b.length, b.dict_id
+            FROM fetches f
+            JOIN (SELECT url, MAX(fetched_at) AS latest FROM fetches WHERE fetched_at <= ? GROUP BY url) l
+              ON f.url = l.url AND f.fetched_at = l.latest
+            JOIN blobs b ON b.hash = f.hash
+            ORDER BY b.offset
+            """,
+            (time.time() if at is None else at,),
+        ).fetchall()
+        for url, fetched_at, offset, length, dict_id in rows:
+            if wanted is None or url in wanted:
+                yield url, fetched_at, self._read(offset, length, dict_id).decode("utf-8")
+
+    def count_blobs(self):
+        return self.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+
+    def stats(self):
+        blobs, raw, stored = self.conn.execute("SELECT COUNT(*), SUM(size), SUM(length) FROM blobs").fetchone()
+        urls, fetches = self.conn.execute("SELECT COUNT(DISTINCT url), COUNT(*) FROM fetches").fetchone()
+        return {
+            "urls": urls,
+            "fetches": fetches,
+            "pages": blobs,
+            "raw_bytes": raw or 0,
+            "stored_bytes": stored or 0,
+            "ratio": (raw or 0) / stored if stored else 0.0,
+            "dictionary": self.dict_id or None,
+        }
+
+    # --- MAINTENANCE ---
+    # Train a fresh dictionary on a sample of stored pages and rewrite the whole pack
+    # with it. The new pack is written next to the old one and swapped in with the index
+    # update, so a crash part way leaves the old store as it was
+    def recompress(self, samples=64):
+        hashes = [h for (h,) in self.conn.execute("SELECT hash FROM blobs ORDER BY offset DESC LIMIT ?", (samples,))]
+        zdict = train_dictionary([self.read_bytes(h) for h in hashes])
+        tmp_path = self.pack_path + ".tmp"
+        placed = []
+        with open(tmp_path, "wb") as out:
+            for (digest,) in self.conn.execute("SELECT hash FROM blobs ORDER BY offset").fetchall():
+                blob = compress(self.read_bytes(digest), zdict)
+                placed.append((out.tell(), len(blob), digest))
+                out.write(blob)
+        with self.conn:
+            cursor = self.conn.execute("INSERT INTO dicts (zdict, created_at) VALUES (?, ?)", (zdict, time.time()))
+            dict_id = cursor.lastrowid
+            self.conn.executemany(
+                "UPDATE blobs SET offset = ?, length = ?, dict_id = ? WHERE hash = ?",
+                [(offset, length, dict_id, digest) for offset, length, digest in placed],
+            )
+            self.conn.execute("DELETE FROM dicts WHERE id != ?", (dict_id,))
+            self.pack.close()
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            os.replace(tmp_path, self.pack_path)
+        self.pack = open(self.pack_path, "ab")
+        self.dicts = {dict_id: zdict}
+        self.dict_id = dict_id
+        return self.stats()
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+        self.pack.close()
+        if self._map is not None:
+            self._map.close()
+
+
+# "2024-03-01" or "2024-03-01T12:00:00" as a timestamp, None stays None
+def parse_time(value):
+    if value is None:
+        return None
+    fmt = "%Y-%m-%dT%H:%M:%S" if "T" in value else "%Y-%m-%d"
+    return time.mktime(time.strptime(value, fmt))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compressed store of every fetched page")
+    parser.add_argument("--store", default=DEFAULT_PAGE_STORE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="pages, urls and compression ratio")
+    get = sub.add_parser("get", help="print the page a url had at some time")
+    get.add_argument("url")
+    get.add_argument("--at", help="date or date and time, default now")
+    add = sub.add_parser("add", help="store a page saved to a file, such as acfe_blog.txt")
+    add.add_argument("path")
+    add.add_argument("url")
+    sub.add_parser("recompress", help="train a new dictionary and rewrite every page with it")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = PageStore(args.store)
+    try:
+        if args.command == "get":
+            text = store.page(args.url, parse_time(args.at))
+            if text is None:
+                raise SystemExit(f"No page stored for {args.url}")
+            print(text)
+            return
+        if args.command == "add":
+            with open(args.path, encoding="utf-8") as f:
+                print(store.put(args.url, f.read(), fetched_at=os.path.getmtime(args.path)))
+        elif args.command == "recompress":
+            store.recompress()
+        s = store.stats()
+        print(f"{s['pages']} pages for {s['urls']} urls ({s['fetches']} fetches): "
+              f"{s['raw_bytes'] / 1e6:.1f} MB stored in {s['stored_bytes'] / 1e6:.1f} MB ({s['ratio']:.1f}x)")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+# One entry point for the whole nightly run:
+#   crawl  (scrape_blog.py)      blog index of every source -> article_urls.txt, and its
+#                                new URLs onto the pending list
+#   scrape (scrape_articles.py)  pending URLs -> fraud_articles_summarized.csv
+#   then, in parallel, from the CSV:
+#   dataset (dataset.py)         the partitioned Parquet copy
+#   report  (week_4_code.py)     the weekly report charts
+#   embed   (embeddings.py)      article vectors for "similar articles"
+#   trends  (timeseries.py)      per day/week counts for the dashboard's time charts
+#   and from the dataset, once it is written:
+#   sync    (update_supabase.py) new and changed rows to Supabase
+# Each stage declares the files it reads and writes, and the order follows from them.
+# Stages that only read local files are skipped when the hash of their inputs and
+# settings matches their last successful run. crawl, scrape and sync talk to the
+# website or Supabase, so they always run (each is incremental on its own).
+# Stages that record run metrics (crawl, scrape, sync) share one registry, so they take
+# turns while the others run alongside them. After a failure, --resume reruns only the
+# stages that did not finish in that run:
+#   python pipeline.py
+#   python pipeline.py --resume
+#   python pipeline.py --stages report sync --force
+
+DEFAULT_PIPELINE_STATE_PATH = ".pipeline_state.json"
+
+
+# --- HASHING ---
+# Files hash by content, directories by their relative file names and contents,
+# missing paths as missing
+def path_hash(path, digest):
+    digest.update(path.encode("utf-8") + b"\0")
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                path_hash(os.path.join(root, name), digest)
+    elif os.path.exists(path):
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    else:
+        digest.update(b"<missing>")
+
+
+# --- STAGES ---
+@dataclass
+class Stage:
+    name: str
+    run: object              # run(args) -> rows handled
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    params: dict = field(default_factory=dict)
+    volatile: bool = False   # reads something outside the repo, never cached
+    # Records into the process-wide metrics registry, which scrape and sync reset when
+    # they start, so two of these never run at once
+    metrics: bool = False
+
+    def input_hash(self):
+        digest = hashlib.sha256()
+        digest.update(json.dumps({"stage": self.name, "params": self.params}, sort_keys=True).encode("utf-8"))
+        for path in self.inputs:
+            path_hash(path, digest)
+        return digest.hexdigest()
+
+
+# --- PENDING URLS ---
+# Article URLs the crawl found that the scrape has not handled yet. A crawl only reports
+# a URL as new once, so they are kept here until a scrape succeeds: a failed or limited
+# scrape leaves the rest for the next run instead of losing them
+def read_urls(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def write_urls(path, urls):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(url + "\n" for url in urls)
+    os.replace(tmp_path, path)
+
+
+def run_crawl(args):
+    import scrape_blog
+
+    found = scrape_blog.main(["--urls", args.urls, "--new-urls", args.new_urls, "--sources", *args.sources]
+                             + (["--max-pages", str(args.max_pages)] if args.max_pages is not None else [])
+                             + (["--sources-file", args.sources_file] if args.sources_file else []))
+    write_urls(args.pending, list(dict.fromkeys(read_urls(args.new_urls) + read_urls(args.pending))))
+    return found
+
+
+# Only the pending URLs are scraped, so a nightly run touches new articles alone. Known
+# articles are not re-checked for edits here; `python scrape_articles.py` over
+# article_urls.txt does that. With no output yet everything known is scraped, and
+# what --limit leaves over goes onto the pending list like any other URL
+def run_scrape(args):
+    import scrape_articles
+
+    full = not os.path.exists(args.output)
+    urls_path = args.urls if full else args.pending
+    if not full and not os.path.exists(urls_path):
+        write_urls(urls_path, [])
+    found = scrape_articles.main(["--urls", urls_path, "--output", args.output, "--limit", str(args.limit)]
+                                 + (["--sources-file", args.sources_file] if args.sources_file else []))
+    # scrape_articles handles the first --limit URLs, the rest wait for the next run
+    write_urls(args.pending, read_urls(urls_path)[args.limit:])
+    return found
+
+
+def run_dataset(args):
+    from dataset import import_file
+
+    written, removed = import_file(args.output, args.dataset, prune=True)
+    print(f"🗂️  Dataset {args.dataset}: {written} rows written, {removed} removed")
+    return written
+
+
+def run_report(args):
+    from week_4_code import build_report
+
+    results = build_report(args.output, args.report_dir, workers=args.report_workers)
+    failed = [name for name, status, _, _ in results if status == "failed"]
+    if failed:
+        raise RuntimeError(f"charts failed: {', '.join(failed)}")
+    return sum(status == "built" for _, status, _, _ in results)
+
+
+def run_embed(args):
+    import embeddings
+
+    return embeddings.main(["--store", args.embeddings, "build", args.output, "--prune"])
+
+
+def run_trends(args):
+    import timeseries
+
+    return timeseries.main(["--store", args.timeseries, "update", args.output, "--prune"])
+
+
+def run_sync(args):
+    import update_supabase
+
+    return update_supabase.main(["--input", args.dataset])
+
+
+def build_stages(args):
+    from week_4_code import TASKS
+
+    charts = [os.path.join(args.report_dir, task.output) for task in TASKS]
+    return [
+        Stage("crawl", run_crawl, outputs=[args.urls, args.pending],
+              params={"max_pages": args.max_pages, "sources": args.sources}, volatile=True, metrics=True),
+        Stage("scrape", run_scrape, inputs=[args.pending], outputs=[args.output], params={"limit": args.limit},
+              volatile=True, metrics=True),
+        Stage("dataset", run_dataset, inputs=[args.output], outputs=[args.dataset]),
+        Stage("report", run_report, inputs=[args.output], outputs=charts),
+        Stage("embed", run_embed, inputs=[args.output], outputs=[args.embeddings]),
+        Stage("trends", run_trends, inputs=[args.output], outputs=[args.timeseries]),
+        Stage("sync", run_sync, inputs=[args.dataset], volatile=True, metrics=True),
+    ]
+
+
+# A stage waits for every stage that writes one of its inputs
+def dependencies(stages):
+    writers = {path: stage.name for stage in stages for path in stage.outputs}
+    return {stage.name: {writers[p] for p in stage.inputs if p in writers and writers[p] != stage.name} for stage in stages}
+
+
+# --- STATE ---
+# "cache": stage -> input hash of its last successful run
+# "last_run": status of the last run and of each of its stages, for --resume
+class PipelineState:
+    def __init__(self, path):
+        self.path = path
+        self.cache = {}
+        self.last_run = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.cache = state.get("cache", {})
+            self.last_run = state.get("last_run", {})
+
+    # Stages that finished in a run that then failed, so --resume can skip them
+    def finished_before_failure(self):
+        if self.last_run.get("status") != "failed":
+            return set()
+        return {name for name, entry in self.last_run.get("stages", {}).items() if entry["status"] in ("ran", "cached")}
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"cache": self.cache, "last_run": self.last_run}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+# --- RUN ---
+# Returns {stage: {"status", "seconds", "rows", "error"}}. status is one of ran, cached
+# (inputs unchanged), resumed (finished in the failed run being resumed), skipped (not
+# selected), failed, or blocked (something it depends on failed)
+def run_pipeline(args):
+    stages = build_stages(args)
+    depends_on = dependencies(stages)
+    state = PipelineState(args.state)
+    already_done = state.finished_before_failure() if args.resume else set()
+    previous = state.last_run.get("stages", {}) if already_done else {}
+    # A resumed run keeps the stage selection of the run it resumes
+    selected = set(args.stages or (already_done and state.last_run.get("selected")) or [s.name for s in stages])
+
+    results = {}
+    for stage in stages:
+        if stage.name not in selected:
+            results[stage.name] = {"status": "skipped", "seconds": 0.0, "rows": None, "error": None}
+        elif stage.name in already_done:
+            results[stage.name] = {**previous[stage.name], "status": "resumed"}
+    state.last_run = {"status": "running", "started_at": time.time(), "selected": sorted(selected), "stages": dict(results)}
+    state.save()
+
+    def execute(stage):
+        start = time.perf_counter()
+        input_hash = stage.input_hash()
+        outputs_exist = all(os.path.exists(p) for p in stage.outputs)
+        if not args.force and not stage.volatile and outputs_exist and state.cache.get(stage.name) == input_hash:
+            return {"status": "cached", "seconds": time.perf_counter() - start, "rows": None, "error": None}, None
+        # Stage entry points are CLI mains, which stop with SystemExit on bad input or a
+        # remote schema problem. That fails the stage like any other error, instead of
+        # ending the whole run with nothing recorded for --resume
+        try:
+            rows = stage.run(args)
+        except (Exception, SystemExit) as e:
+            error = f"{type(e).__name__}: {e}"
+            return {"status": "failed", "seconds": time.perf_counter() - start, "rows": None, "error": error}, None
+        return {"status": "ran", "seconds": time.perf_counter() - start, "rows": rows, "error": None}, input_hash
+
+    def finish(stage, outcome):
+        results[stage.name] = outcome
+        state.last_run["stages"][stage.name] = outcome
+        state.save()
+
+    pending = {stage.name: stage for stage in stages if stage.name not in results}
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        running = {}
+        while pending or running:
+            for name, stage in list(pending.items()):
+                deps = depends_on[name]
+                if any(results.get(d, {}).get("status") in ("failed", "blocked") for d in deps):
+                    finish(stage, {"status": "blocked", "seconds": 0.0, "rows": None, "error": None})
+                    del pending[name]
+                elif all(d in results for d in deps) and not (
+                        stage.metrics and any(other.metrics for other in running.values())):
+                    print(f"\n▶️  {name}")
+                    running[pool.submit(execute, stage)] = stage
+                    del pending[name]
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                outcome, input_hash = future.result()
+                if input_hash is not None:
+                    state.cache[stage.name] = input_hash
+                finish(stage, outcome)
+
+    failed = any(r["status"] in ("failed", "blocked") for r in results.values())
+    state.last_run["status"] = "failed" if failed else "ok"
+    state.save()
+    return {stage.name: results[stage.name] for stage in stages}
+
+
+def print_summary(results, elapsed):
+    print(f"\n{'stage':<10} {'status':<8} {'seconds':>8} {'rows':>7}")
+    for name, r in results.items():
+        rows = "" if r["rows"] is None else r["rows"]
+        print(f"{name:<10} {r['status']:<8} {r['seconds']:8.2f} {rows:>7}" + (f"  {r['error']}" if r["error"] else ""))
+    ran = {name: r for name, r in results.items() if r["status"] == "ran"}
+    slowest = max(ran, key=lambda name: ran[name]["seconds"]) if ran else None
+    print(f"\n⏱️  Pipeline took {elapsed:.2f}s" + (f", most of it in {slowest}" if slowest else ""))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run crawl, scrape, dataset, report, embed, trends and sync as one pipeline")
+    parser.add_argument("--stages", nargs="+", choices=["crawl", "scrape", "dataset", "report", "embed", "trends", "sync"],
+                        help="only run these stages (the rest use whatever files are already there)")
+    parser.add_argument("--resume", action="store_true", help="after a failed run, only rerun the stages that did not finish")
+    parser.add_argument("--force", action="store_true", help="run cached stages even if their inputs are unchanged")
+    parser.add_argument("--workers", type=int, default=2, help="stages run at once when they do not depend on each other")
+    parser.add_argument("--state", default=DEFAULT_PIPELINE_STATE_PATH, help="stage hashes and last run status")
+    parser.add_argument("--urls", default="article_urls.txt")
+    parser.add_argument("--new-urls", default="new_article_urls.txt", help="crawl: the URLs found in this run")
+    parser.add_argument("--pending", default=".pending_article_urls.txt", help="URLs found but not scraped yet")
+    parser.add_argument("--output", default="fraud_articles_summarized.csv")
+    parser.add_argument("--dataset", default="articles_dataset")
+    parser.add_argument("--report-dir", default=".")
+    parser.add_argument("--embeddings", default=".embeddings")
+    parser.add_argument("--timeseries", default=".timeseries.sqlite")
+    parser.add_argument("--report-workers", type=int, default=2)
+    parser.add_argument("--max-pages", type=int, help="crawl: blog index pages to read (default per source)")
+    parser.add_argument("--sources", nargs="+", default=["acfe"], help="crawl: sources to crawl (see sources.py)")
+    parser.add_argument("--sources-file", help="crawl and scrape: JSON list of extra sources")
+    parser.add_argument("--limit", type=int, default=250, help="scrape: only the first N pending URLs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    results = run_pipeline(args)
+    print_summary(results, time.perf_counter() - start)
+    if any(r["status"] in ("failed", "blocked") for r in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from fraud_scoring import SEVERITY_LEVELS as SEVERITY_ORDER
+
+# Precomputed counts behind the dashboard Overview tab. Once per data version we count
+# articles per (trend, severity), per (keyword, trend, severity) and per
+# (filter keyword, keyword, trend, severity). Any combination of the sidebar trend,
+# severity and keyword filters is then answered by slicing and summing these small
+# arrays instead of re-scanning the filtered frame on every rerun
+
+
+# Everything the Overview tab shows, however it was computed
+@dataclass
+class OverviewStats:
+    total: int
+    severity_counts: pd.Series   # High / Medium / Low, in that order
+    trend_counts: pd.Series      # most common first
+    severity_by_trend: pd.DataFrame  # trend x High / Medium / Low
+    keyword_counts: pd.Series    # most common first
+
+    @property
+    def top_trend(self):
+        return self.trend_counts.index[0] if len(self.trend_counts) else "N/A"
+
+
+def _stats(trends, keywords, by_trend_severity, keyword_totals):
+    severity_by_trend = pd.DataFrame(by_trend_severity, index=trends, columns=SEVERITY_ORDER)
+    severity_by_trend = severity_by_trend[severity_by_trend.sum(axis=1) > 0]
+    trend_counts = severity_by_trend.sum(axis=1).sort_values(ascending=False, kind="stable")
+    keyword_counts = pd.Series(keyword_totals, index=keywords)
+    keyword_counts = keyword_counts[keyword_counts > 0].sort_values(ascending=False, kind="stable")
+    return OverviewStats(
+        total=int(by_trend_severity.sum()),
+        severity_counts=pd.Series(by_trend_severity.sum(axis=0), index=SEVERITY_ORDER),
+        trend_counts=trend_counts,
+        severity_by_trend=severity_by_trend.loc[trend_counts.index],
+        keyword_counts=keyword_counts,
+    )
+
+
+class Rollups:
+    def __init__(self, df):
+        self.trends = sorted(df["trend"].dropna().unique().tolist())
+        self.keywords = sorted({kw for kws in df["keyword_list"] for kw in kws})
+        trend_codes = pd.Categorical(df["trend"], categories=self.trends).codes
+        severity_codes = pd.Categorical(df["severity_level"], categories=SEVERITY_ORDER).codes
+        valid = (trend_codes >= 0) & (severity_codes >= 0)
+        cell = np.where(valid, trend_codes * len(SEVERITY_ORDER) + severity_codes, -1)
+
+        n_cells = len(self.trends) * len(SEVERITY_ORDER)
+        n_kw = len(self.keywords)
+        kw_pos = {kw: i for i, kw in enumerate(self.keywords)}
+
+        # One (keyword, article cell) entry per keyword occurrence, flattened once
+        lengths = df["keyword_list"].map(len).to_numpy()
+        kw_ids = np.fromiter(
+            (kw_pos[kw] for kws in df["keyword_list"] for kw in kws), dtype=np.int64, count=int(lengths.sum())
+        )
+        kw_rows = np.repeat(np.arange(len(df)), lengths)
+        kw_cells = cell[kw_rows]
+        keep = kw_cells >= 0
+        kw_ids, kw_rows, kw_cells = kw_ids[keep], kw_rows[keep], kw_cells[keep]
+
+        self.articles = np.bincount(cell[valid], minlength=n_cells).reshape(len(self.trends), len(SEVERITY_ORDER))
+        self.by_keyword = np.bincount(
+            kw_ids * n_cells + kw_cells, minlength=n_kw * n_cells
+        ).reshape(n_kw, len(self.trends), len(SEVERITY_ORDER))
+
+        # Keyword co-occurrence: every ordered pair of keyword occurrences inside the
+        # same article (a keyword paired with itself counts the article once)
+        _, row_start, row_len = np.unique(kw_rows, return_index=True, return_counts=True)
+        occ_start = np.repeat(row_start, row_len)
+        occ_len = np.repeat(row_len, row_len)
+        left = np.repeat(np.arange(len(kw_ids)), occ_len)
+        within = np.arange(len(left)) - np.repeat(np.cumsum(occ_len) - occ_len, occ_len)
+        right = np.repeat(occ_start, occ_len) + within
+        cells = kw_cells[left]
+        left, right = kw_ids[left], kw_ids[right]
+        self.pairs = np.bincount(
+            (left * n_kw + right) * n_cells + cells, minlength=n_kw * n_kw * n_cells
+        ).reshape(n_kw, n_kw, len(self.trends), len(SEVERITY_ORDER))
+
+    # trend, severity and keyword are either None (no filter) or a single value
+    def query(self, trend=None, severity=None, keyword=None):
+        if keyword is not None:
+            if keyword not in self.keywords:
+                return self.empty()
+            k = self.keywords.index(keyword)
+            articles = self.by_keyword[k]
+            keywords = self.pairs[k]
+        else:
+            articles = self.articles
+            keywords = self.by_keyword
+
+        # Zero out the cells the trend and severity filters exclude
+        cell_mask = np.ones(articles.shape, dtype=bool)
+        if trend is not None:
+            cell_mask &= np.array([t == trend for t in self.trends])[:, None]
+        if severity is not None:
+            cell_mask &= np.array([s == severity for s in SEVERITY_ORDER])[None, :]
+        articles = articles * cell_mask
+        keyword_totals = (keywords * cell_mask).sum(axis=(1, 2))
+        return _stats(self.trends, self.keywords, articles, keyword_totals)
+
+    def empty(self):
+        return _stats(self.trends, self.keywords, self.articles * 0, np.zeros(len(self.keywords), dtype=np.int64))
+
+
+# For slices no cube can answer (full text search results), count the frame directly
+def overview_stats(df):
+    trends = sorted(df["trend"].dropna().unique().tolist())
+    by_trend_severity = (
+        pd.crosstab(df["trend"], df["severity_level"])
+        .reindex(index=trends, columns=SEVERITY_ORDER, fill_value=0)
+        .to_numpy()
+    )
+    keyword_counts = df["keyword_list"].explode().dropna().value_counts()
+    return _stats(trends, keyword_counts.index.tolist(), by_trend_severity, keyword_counts.to_numpy())
@@ -1,78 +1,343 @@
-import bs4
-import requests
-import pandas as pd
-import nltk
-from nltk.tokenize import sent_tokenize
+import argparse
+import csv
+import os
+from collections import namedtuple
 
-nltk.download('punkt')
+from article_parser import PARSERS, process_pages
+from dataset import import_file
+from dedup import DEFAULT_DEDUP_INDEX_PATH, DedupIndex, index_file
+from fetch_cache import DEFAULT_CACHE_PATH, FetchCache
+from fetcher import FetchStats, fetch_all
+import metrics
+from metrics import METRICS, count, observe, timer
+from output_writer import (Checkpoint, compact_to_parquet, dedupe_output, ensure_columns, existing_keys, open_writer,
+                           read_chunks, rewrite_column)
+from page_store import DEFAULT_PAGE_STORE_PATH, PageStore
+from scrape_blog import DEFAULT_DATES_PATH
+from sources import DEFAULT_SOURCE, host_limits, interleave, load_sources, source_for_url
+from sentiment import DEFAULT_SENTIMENT_CACHE_PATH, SentimentCache, cached_polarity_batch
+from summarizer import BACKENDS, DEFAULT_SUMMARY_CACHE_PATH, Summarizer
 
-# --- FRAUD KEYWORDS ---
-FRAUD_KEYWORDS = [
-    'embezzlement', 'bribery', 'fraud investigation', 'money laundering', 'scam'
-]
+DEFAULT_CHECKPOINT_PATH = ".scrape_checkpoint.json"
 
-# --- LOAD URLS ---
-with open("article_urls.txt", 'r', encoding='utf-8') as f:
-    urls = [line.strip() for line in f if line.strip()]
+OUTPUT_COLUMNS = ['title', 'author', 'url', 'text', 'keywords_found', 'summary', 'sentiment', 'cluster_id', 'published', 'source']
 
-# --- CREATE DATAFRAME ---
-articles_df = pd.DataFrame(columns=['title', 'author', 'url', 'text', 'keywords_found', 'summary'])
 
-articles_found = 0
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape ACFE articles and keep the fraud-related ones")
+    parser.add_argument("--urls", default="article_urls.txt", help="file with one article URL per line, from any source")
+    parser.add_argument("--sources-file", help="JSON list of sources to add to the built-in ones (see sources.py)")
+    parser.add_argument("--output", default="fraud_articles_summarized.csv", help="a .csv or .jsonl file, appended to as rows are ready")
+    parser.add_argument("--dates", default=DEFAULT_DATES_PATH, help="url,published file written by scrape_blog.py")
+    parser.add_argument("--limit", type=int, default=250, help="only scrape the first N URLs")
+    parser.add_argument("--workers", type=int, default=8, help="number of fetches in flight at once, over all sources")
+    parser.add_argument("--per-host", type=int, help="max open requests per host (default per source)")
+    parser.add_argument("--rps", type=float, help="max requests per second per host (default per source)")
+    parser.add_argument("--retries", type=int, default=3, help="retries on timeouts and 429/5xx responses")
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="fetch cache used for conditional requests")
+    parser.add_argument("--full", action="store_true", help="ignore the fetch cache and rescrape everything")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH, help="progress file used to resume a crashed run")
+    parser.add_argument("--checkpoint-every", type=int, default=10, help="save progress every N URLs")
+    parser.add_argument("--parquet", action="store_true", help="also write a compacted .parquet copy of the output")
+    parser.add_argument("--dataset", help="also keep this partitioned Parquet dataset in step with the output")
+    parser.add_argument("--parse-workers", type=int, default=1, help="processes used for parsing and summarizing (1 = inline)")
+    parser.add_argument("--parser", choices=PARSERS, default="html.parser", help="HTML parser backend, lxml is faster")
+    parser.add_argument("--no-strain", action="store_true", help="parse the whole page instead of only the nodes we read")
+    parser.add_argument("--summarizer", choices=BACKENDS, default="textrank", help="summary backend, transformers needs a model download")
+    parser.add_argument("--summary-cache", default=DEFAULT_SUMMARY_CACHE_PATH, help="on-disk summary memo ('' to disable)")
+    parser.add_argument("--summary-batch", type=int, default=32, help="articles summarized together")
+    parser.add_argument("--sentiment-cache", default=DEFAULT_SENTIMENT_CACHE_PATH, help="on-disk sentiment memo")
+    parser.add_argument("--dedup-index", default=DEFAULT_DEDUP_INDEX_PATH, help="near-duplicate signature store")
+    parser.add_argument("--page-store", default=DEFAULT_PAGE_STORE_PATH, help="compressed copy of every fetched page ('' to disable)")
+    parser.add_argument("--replay", action="store_true",
+                        help="re-extract every URL from the page store instead of fetching it (implies --full)")
+    metrics.add_arguments(parser)
+    return parser.parse_args(argv)
 
-# --- SCRAPE, DETECT, SUMMARIZE ---
-for i, current_url in enumerate(urls[:250]):
+
+# --- PIPELINE STAGES ---
+# fetch -> incremental check -> parse/detect -> summarize.
+# Each stage takes a stream of items (one per URL) and passes them on one at a time,
+# so only a handful of pages are ever in memory. Items are never dropped, a stage
+# just leaves its field unset, so the last step can still record every URL as done.
+# URLs of every source share the --workers fetches in flight, and each host is held to
+# its own source's limits (hosts of no source to the default source's)
+def fetch_stage(urls, args, cache, stats, full, sources, start=0):
+    default = sources[DEFAULT_SOURCE]
+    fetched = fetch_all(
+        urls[start:],
+        workers=args.workers,
+        per_host=args.per_host or default.per_host,
+        rps=args.rps or default.rps,
+        timeout=args.timeout,
+        retries=args.retries,
+        stats=stats,
+        cache=None if full else cache,
+        limits=host_limits(sources, args.per_host, args.rps),
+    )
+    for i, (url, response, error) in enumerate(fetched, start=start):
+        yield {'index': i, 'url': url, 'response': response, 'error': error}
+
+
+# What replay hands on in place of a response: the page as it was last stored
+StoredPage = namedtuple("StoredPage", ["text", "fetched_at"])
+
+
+# Same items as fetch_stage, read from the page store. Pages come out of a memory map
+# one at a time, so a replay never holds more than the pages in flight
+def replay_stage(urls, store, start=0):
+    for i, url in enumerate(urls[start:], start=start):
+        found = store.lookup(url)
+        if found is None:
+            yield {'index': i, 'url': url, 'response': None, 'error': "not in the page store"}
+        else:
+            fetched_at, digest = found
+            yield {'index': i, 'url': url, 'response': StoredPage(store.get(digest), fetched_at), 'error': None}
+
+
+def classify_stage(items, cache, full):
+    for item in items:
+        if item['error'] is None:
+            # --- INCREMENTAL CHECK ---
+            item['status'] = "new" if full else cache.classify(item['url'], item['response'])
+        yield item
+
+
+# Parsing and fraud detection are CPU-bound, so they run together in
+# article_parser.process_page, optionally on a process pool. Each page is read with
+# the compiled extractor of the source its URL belongs to
+def extract_stage(items, args, sources):
+    jobs = (
+        (item, item['response'].text if item['error'] is None and item['status'] != "unchanged" else None, item['url'],
+         source_for_url(item['url'], sources).extractor)
+        for item in items
+    )
+    for item, result in process_pages(jobs, workers=args.parse_workers, parser=args.parser, strain=not args.no_strain):
+        if result is not None:
+            for stage, seconds in result['timings'].items():
+                observe(stage, seconds)
+            if result['error']:
+                item['error'] = result['error']
+            item['article'] = result['article']
+            item['keywords'] = result['keywords']
+            item['row'] = result['row']
+        yield item
+
+
+# Fraud-related rows are summarized a batch at a time, which lets the backend share
+# work across articles and the cache answer a whole batch with one query. The summary's
+# sentiment polarity is stored with the row, so later analysis never recomputes it
+def summarize_stage(items, summarizer, sentiment_cache, batch_size):
+    def flush(batch):
+        with_rows = [item for item in batch if item.get('row')]
+        with timer("summarize", n=len(with_rows)):
+            summaries = summarizer.summarize_batch(
+                [item['row']['text'] for item in with_rows], [item['keywords'] for item in with_rows]
+            )
+        with timer("sentiment", n=len(with_rows)):
+            polarities = cached_polarity_batch(summaries, sentiment_cache)
+        for item, summary, polarity in zip(with_rows, summaries, polarities):
+            item['row']['summary'] = summary
+            item['row']['sentiment'] = float(polarity)
+        return batch
+
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield from flush(batch)
+            batch = []
+    yield from flush(batch)
+
+
+# Each fraud-related row gets the id of its near-duplicate cluster. The index keeps
+# every signature seen so far, so new articles are only checked against their buckets
+def dedup_stage(items, index, batch_size):
+    def flush(batch):
+        with_rows = [item for item in batch if item.get('row')]
+        with timer("dedup", n=len(with_rows)):
+            cluster_ids = index.add_many([item['url'] for item in with_rows], [item['row']['text'] for item in with_rows])
+        for item, cluster_id in zip(with_rows, cluster_ids):
+            item['row']['cluster_id'] = cluster_id
+        return batch
+
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield from flush(batch)
+            batch = []
+    yield from flush(batch)
+
+
+# --- PUBLISH DATES ---
+# url -> "YYYY-MM-DD" from the blog crawl, empty when it has not run yet
+def load_dates(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8", newline="") as f:
+        return {row["url"]: row["published"] for row in csv.DictReader(f) if row["published"]}
+
+
+# Rows scraped before a column existed, or before its value was known, get it from
+# value_for(url) (None to leave the row as it is). The output is only rewritten when
+# some row actually changes. Used for the publish dates from the crawl, the source tag
+# and cluster ids that changed when two clusters merged
+def backfill_column(path, column, value_for):
+    if not os.path.exists(path):
+        return 0
+    updates = {}
+    for chunk in read_chunks(path, columns=['url', column]):
+        stored = chunk[column].astype(object).where(chunk[column].notna(), None)
+        for url, old in zip(chunk['url'], stored):
+            value = value_for(url)
+            if value is not None and value != old:
+                updates[url] = value
+    if updates:
+        rewrite_column(path, column, updates)
+    return len(updates)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    metrics.configure_from_args(args)
+    METRICS.reset()
+
+    # --- LOAD URLS ---
+    with open(args.urls, 'r', encoding='utf-8') as f:
+        urls = [line.strip() for line in f if line.strip()]
+    # Sources with looser limits get their URLs earlier, so no source waits behind another
+    sources = load_sources(args.sources_file)
+    urls = interleave(urls[:args.limit], sources, args.rps)
+
+    dates = load_dates(args.dates)
+    articles_found = 0
+    skipped = 0
+    stats = FetchStats()
+
+    # Resume right after the last checkpointed URL if the previous run did not finish
+    checkpoint = Checkpoint(args.checkpoint, urls, args.output)
+    start = 0 if args.full else checkpoint.resume_index()
+    if start:
+        print(f"Resuming from URL {start + 1}/{len(urls)}")
+
+    # Without an existing output file the cache is useless, since the rows it
+    # would let us skip are gone, so fall back to a full scrape
+    # A replay re-extracts everything it has, so it rewrites the output like --full
+    full = args.full or args.replay or not os.path.exists(args.output)
+    if args.replay and not args.page_store:
+        raise SystemExit("--replay needs a --page-store to read from")
+    summarizer = Summarizer(args.summarizer, cache_path=args.summary_cache)
+    summarizer.prepare()
+    page_store = PageStore(args.page_store) if args.page_store else None
+    cache = FetchCache(args.cache)
+    sentiment_cache = SentimentCache(args.sentiment_cache)
+    dedup_index = DedupIndex(args.dedup_index)
+    # Rows this run keeps get their cluster ids from the new signatures first
+    if dedup_index.rebuilt and os.path.exists(args.output) and not (full and start == 0):
+        print(f"🔗 Near-duplicate signatures changed, re-indexing {args.output}")
+        index_file(dedup_index, args.output)
+
+    # Rows for URLs we already have replace the old row, which needs a dedupe pass at the end
+    known_urls = set() if full else existing_keys(args.output)
+    needs_dedupe = start > 0
+    dropped_urls = set()
+    if not (full and start == 0):
+        added = ensure_columns(args.output, OUTPUT_COLUMNS)
+        if added:
+            print(f"Added columns {', '.join(added)} to {args.output}")
+    writer = open_writer(args.output, OUTPUT_COLUMNS, truncate=full and start == 0)
+
+    # --- SCRAPE, DETECT, SUMMARIZE ---
+    # If the run dies part way, whatever was written and cached so far is kept and
+    # the next run resumes from the checkpoint
     try:
-        raw_article = requests.get(current_url, timeout=10)
-        raw_article.raise_for_status()
-        souped_article = bs4.BeautifulSoup(raw_article.text, 'html.parser')
-
-        article_title = souped_article.find('h1')
-        article_author = souped_article.find('h5', class_='margin-top-1')
-        article_body = souped_article.find('div', class_='cell large-8')
-
-        if not article_title or not article_body:
-            print(f"Skipping (missing content): {current_url}")
-            continue
-
-        title = article_title.get_text(strip=True)
-        author = article_author.get_text(strip=True) if article_author else "Unknown"
-        body_text = article_body.get_text(separator=' ', strip=True)
-        body_lower = body_text.lower()
-
-        # --- FRAUD DETECTION ---
-        found_keywords = [kw for kw in FRAUD_KEYWORDS if kw.lower() in body_lower]
-
-        if found_keywords:
-            articles_found += 1
-
-            # --- SIMPLE SUMMARIZATION ---
-            sentences = sent_tokenize(body_text)
-            summary_sentences = []
-            for sent in sentences:
-                if any(kw in sent.lower() for kw in found_keywords):
-                    summary_sentences.append(sent)
-            # Combine 2–3 keyword-heavy sentences as summary
-            summary = " ".join(summary_sentences[:3])
-            if not summary:
-                summary = body_text[:300] + "..."
-
-            # --- STORE ---
-            articles_df.loc[len(articles_df)] = {
-                'title': title,
-                'author': author,
-                'url': current_url,
-                'text': body_text,
-                'keywords_found': ', '.join(found_keywords),
-                'summary': summary
-            }
-
-        print(f"Processed ({i+1}/{len(urls)}): {title[:60]}...")
-
-    except Exception as e:
-        print(f"Error scraping {current_url}: {e}")
-
-# --- SAVE RESULTS ---
-articles_df.to_csv('fraud_articles_summarized.csv', index=False, encoding='utf-8')
-print(f"\n✅ Found {articles_found} fraud-related articles.")
-print("💾 Saved as fraud_articles_summarized.csv")
\ No newline at end of file
+        if args.replay:
+            pages = replay_stage(urls, page_store, start)
+        else:
+            pages = fetch_stage(urls, args, cache, stats, full, sources, start)
+        items = extract_stage(classify_stage(pages, cache, full), args, sources)
+        items = summarize_stage(items, summarizer, sentiment_cache, args.summary_batch)
+        items = dedup_stage(items, dedup_index, args.summary_batch)
+        for item in items:
+            current_url = item['url']
+            if item['error'] is not None:
+                outcome = "error"
+                print(f"Error scraping {current_url}: {item['error']}")
+            elif item['status'] == "unchanged":
+                outcome = "unchanged"
+                skipped += 1
+            elif item.get('article') is None:
+                outcome = "missing_content"
+                print(f"Skipping (missing content): {current_url}")
+            else:
+                # --- STORE ---
+                if item.get('row'):
+                    outcome = "fraud"
+                    articles_found += 1
+                    item['row']['published'] = dates.get(current_url)
+                    item['row']['source'] = source_for_url(current_url, sources).name
+                    with timer("write"):
+                        writer.write(item['row'])
+                    needs_dedupe = needs_dedupe or current_url in known_urls
+                else:
+                    outcome = "not_fraud"
+                    if current_url in known_urls:
+                        # It used to be fraud-related but no longer is, so the old row has to go
+                        dropped_urls.add(current_url)
+                        needs_dedupe = True
+                print(f"Processed ({item['index']+1}/{len(urls)}): {item['article']['title'][:60]}...")
+            count(f"pages_{outcome}")
+            metrics.log("page", index=item['index'], url=current_url, outcome=outcome,
+                        error=None if item['error'] is None else str(item['error']))
+
+            if item['error'] is None and not args.replay:
+                cache.store(current_url, item['response'])
+                if page_store is not None and item['response'].status_code != 304:
+                    page_store.put(current_url, item['response'].text)
+            if (item['index'] + 1) % args.checkpoint_every == 0:
+                cache.commit()
+                if page_store is not None:
+                    page_store.commit()
+                checkpoint.save(item['index'] + 1)
+    finally:
+        writer.close()
+        cache.close()
+        summarizer.close()
+        sentiment_cache.close()
+        # Rows written before their cluster merged with an older one get its id below
+        remapped = dedup_index.remapped()
+        dedup_index.close()
+        if page_store is not None:
+            page_store.close()
+        METRICS.flush(job="scrape")
+
+    # --- SAVE RESULTS ---
+    if needs_dedupe:
+        removed = dedupe_output(args.output, drop=dropped_urls)
+        print(f"🧹 Replaced {removed} outdated rows")
+    dated = backfill_column(args.output, 'published', dates.get)
+    if dated:
+        print(f"📅 Added publish dates to {dated} rows")
+    backfill_column(args.output, 'source', lambda url: source_for_url(url, sources).name)
+    regrouped = backfill_column(args.output, 'cluster_id', remapped.get) if remapped else 0
+    if regrouped:
+        print(f"🔗 Moved {regrouped} rows into the older story they turned out to share")
+    checkpoint.clear()
+    if args.parquet:
+        print(f"🗜️  Compacted to {compact_to_parquet(args.output)}")
+    if args.dataset:
+        # New and changed rows land in today's partition, rows gone from the output are removed
+        written, removed = import_file(args.output, args.dataset, prune=True)
+        print(f"🗂️  Dataset {args.dataset}: {written} rows written, {removed} removed")
+    print(f"\n✅ Found {articles_found} new or changed fraud-related articles ({skipped} unchanged pages skipped).")
+    print(f"💾 Saved as {args.output}")
+    print(f"⏱️  {stats.report()}")
+    print(f"⏱️  {summarizer.report()}")
+    print(f"⏱️  Stages: {METRICS.report()}")
+    return articles_found
+
+
+if __name__ == "__main__":
+    main()
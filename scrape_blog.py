@@ -1,20 +1,335 @@
-import bs4
-import requests
+import argparse
+import csv
+import dataclasses
+import datetime
+import json
 import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+import bs4
+
+from article_parser import compile_selector
+from fetch_cache import DEFAULT_CACHE_PATH, FetchCache
+from fetcher import FetchStats, HostLimiter, fetch_all, make_session
+from page_store import DEFAULT_PAGE_STORE_PATH, PageStore
+from sources import ACFE, DEFAULT_SOURCE, date_pattern, host_limits, load_sources, select_sources
+
+# Finds article URLs on the blog index of every source in the registry (sources.py),
+# the ACFE Insights Blog by default. Index pages are fetched a few at a time, newest
+# first, and a source's crawl stops as soon as it reaches URLs it already knows from an
+# earlier run, so a run only costs as many pages as there are new posts. Sources are
+# crawled side by side under one --workers budget, each within its own rate limits, so
+# adding a source adds about nothing to the run time unless it is the slowest one.
+# Every card on an index page shows its post's publish date, which is kept with the URL
+# and written to article_dates.csv for the article scraper
+
+BLOG_URL = ACFE.index_url
+DEFAULT_FRONTIER_PATH = ".blog_frontier.json"
+DEFAULT_DATES_PATH = "article_dates.csv"
+
+# Query parameters that only track where a click came from and never change the page
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find new article URLs on the blog index of every source")
+    parser.add_argument("--sources", nargs="+", default=[DEFAULT_SOURCE], help="names of the sources to crawl")
+    parser.add_argument("--sources-file", help="JSON list of sources to add to the built-in ones")
+    parser.add_argument("--start", help="first index page (one source only, default from the source)")
+    parser.add_argument("--page-url", help="URL of index page N, with {page} in place of N (one source only)")
+    parser.add_argument("--selector", help="CSS selector of article links on an index page (one source only)")
+    parser.add_argument("--max-pages", type=int, help="never crawl deeper than this many index pages (default per source)")
+    parser.add_argument("--urls", default="article_urls.txt", help="every known article URL, newest first")
+    parser.add_argument("--new-urls", default="new_article_urls.txt", help="only the URLs found in this run")
+    parser.add_argument("--dates", default=DEFAULT_DATES_PATH, help="publish date of every known article, as url,published")
+    parser.add_argument("--dump", default="acfe_blog.txt", help="where to save the first source's first index page ('' to skip)")
+    parser.add_argument("--page-store", default=DEFAULT_PAGE_STORE_PATH, help="compressed copy of every fetched page ('' to disable)")
+    parser.add_argument("--frontier", default=DEFAULT_FRONTIER_PATH, help="URLs seen by earlier runs")
+    parser.add_argument("--workers", type=int, default=4, help="index pages fetched at once, over all sources")
+    parser.add_argument("--per-host", type=int, help="max open requests per host (default per source)")
+    parser.add_argument("--rps", type=float, help="max requests per second per host (default per source)")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="fetch cache used for conditional requests")
+    parser.add_argument("--full", action="store_true", help="crawl to --max-pages even past known URLs")
+    return parser.parse_args(argv)
+
+
+# --- URL NORMALIZATION ---
+# The same article can show up with a different case host, a trailing slash, a #fragment or
+# tracking parameters. Reduce all of those to one spelling so dedupe is a set lookup
+def normalize_url(href, base=BLOG_URL):
+    scheme, netloc, path, query, _ = urlsplit(urljoin(base, href.strip()))
+    scheme = scheme.lower()
+    netloc = netloc.lower()
+    if netloc.endswith(":443") or netloc.endswith(":80"):
+        netloc = netloc.rsplit(":", 1)[0]
+    if len(path) > 1:
+        path = path.rstrip("/")
+    params = [(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if not k.lower().startswith(TRACKING_PARAMS)]
+    return urlunsplit((scheme, netloc, path or "/", urlencode(sorted(params)), ""))
+
+
+# "Oct 21, 2025 By ..." -> "2025-10-21", None when there is no date in the text
+def parse_card_date(text, date_format=ACFE.date_format):
+    found = date_pattern(date_format).search(text)
+    if not found:
+        return None
+    try:
+        return datetime.datetime.strptime(found.group(0), date_format).date().isoformat()
+    except ValueError:
+        return None
+
+
+# (url, publish date or None) for every article link on an index page of source. A card
+# is the link and the source's date tag right after it (a <p> holding the date and
+# author on ACFE). With a simple link selector (tag, tag.class or .class) only those two
+# tags are ever read from an index page, so nothing else gets a tree node. A compound
+# one ("h2.entry-title a") needs the link's ancestors, so the whole page is parsed
+def extract_cards(html, base, source=ACFE):
+    date_tag = source.date_tag or None
+    soup = bs4.BeautifulSoup(html, "html.parser", parse_only=card_strainer(source.link_selector, date_tag))
+    cards = []
+    for a in soup.select(source.link_selector):
+        href = a.get("href")
+        if not href:
+            continue
+        published = None
+        if date_tag:
+            # The next date tag only belongs to this card if no other link comes before it
+            after = a.find_next(["a", date_tag])
+            if after is not None and after.name == date_tag:
+                published = parse_card_date(after.get_text(" ", strip=True), source.date_format)
+        cards.append((normalize_url(href, base), published))
+    return cards
+
+
+def card_strainer(link_selector, date_tag):
+    try:
+        compile_selector(link_selector)
+    except ValueError:
+        return None
+    return bs4.SoupStrainer(["a", date_tag] if date_tag else "a")
+
+
+# --- FRONTIER ---
+# Every article URL found so far, newest first, and the publish dates seen for them.
+# It is seeded from article_urls.txt the first time, so switching to this crawler does
+# not re-emit the whole archive (those URLs get their dates once a --full crawl sees them)
+class Frontier:
+    def __init__(self, path, seed_path=None):
+        self.path = path
+        self.known = []
+        self.dates = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.known = state["known"]
+            self.dates = state.get("dates", {})
+        elif seed_path and os.path.exists(seed_path):
+            with open(seed_path, encoding="utf-8") as f:
+                self.known = list(dict.fromkeys(normalize_url(line) for line in f if line.strip()))
+        self.known_set = set(self.known)
+
+    def __contains__(self, url):
+        return url in self.known_set
+
+    # New URLs go in front, since the index lists the newest posts first
+    def add(self, urls):
+        self.known = list(urls) + self.known
+        self.known_set.update(urls)
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"known": self.known, "dates": self.dates}, f)
+        os.replace(tmp_path, self.path)
+
+
+# --- CRAWL ---
+# The crawl of one source's index, in waves: page 1 alone first (a 304 there means
+# nothing is new), then `workers` pages at a time. Within a wave pages are read in
+# order, and the crawl stops at the first page that
+#   - reaches a URL we already know (everything after it is older),
+#   - has no article links, or only links seen on earlier pages (past the last page,
+#     or the site ignores the page parameter),
+#   - does not exist or failed to fetch.
+# Every index page read is kept in page_store, if given, and the dates of every card
+# read, new or known, go into frontier.dates. Waves are fetched elsewhere (see
+# crawl_sources); reading them only ever happens on the main thread, which is what
+# the fetch cache, the page store and the frontier expect
+class IndexCrawl:
+    def __init__(self, source, args, frontier, cache, page_store=None):
+        self.source = source
+        self.args = args
+        self.frontier = frontier
+        self.cache = cache
+        self.page_store = page_store
+        self.max_pages = source.max_pages if args.max_pages is None else args.max_pages
+        self.page = 1
+        self.seen = set()
+        self.new_urls = []
+        self.first_page = None
+        self.pages_fetched = 0
+        self.stop_reason = None if self.max_pages >= 1 else f"reached --max-pages ({self.max_pages})"
+
+    @property
+    def done(self):
+        return self.stop_reason is not None
+
+    # The page numbers and URLs of the next wave
+    def wave(self):
+        wave_size = 1 if self.page == 1 else self.args.workers
+        numbers = range(self.page, min(self.page + wave_size, self.max_pages + 1))
+        return numbers, [self.source.index_url if n == 1 else self.source.page_url.format(page=n) for n in numbers]
+
+    def read(self, numbers, fetched):
+        name = self.source.name
+        stop_reason = None
+        for n, (url, response, error) in zip(numbers, fetched):
+            self.pages_fetched += 1
+            if stop_reason:
+                # The rest of the wave was fetched speculatively, there is nothing to read on it
+                continue
+            if error is not None:
+                missing = response is not None and response.status_code == 404
+                stop_reason = f"page {n} does not exist" if missing else f"page {n} failed: {error}"
+                continue
+            if n == 1:
+                self.first_page = response
+            if self.page_store is not None and response.status_code != 304:
+                self.page_store.put(url, response.text)
+            if not self.args.full and self.cache.classify(url, response) == "unchanged":
+                stop_reason = f"page {n} unchanged since last run"
+                continue
+
+            cards = extract_cards(response.text, url, self.source)
+            self.frontier.dates.update((link, published) for link, published in cards if published)
+            links = [link for link in dict.fromkeys(link for link, _ in cards) if link not in self.seen]
+            self.seen.update(links)
+            if not links:
+                stop_reason = f"page {n} has no new links"
+                continue
+            fresh = [link for link in links if link not in self.frontier]
+            self.new_urls.extend(fresh)
+            self.cache.store(url, response)
+            print(f"{name} index page {n}: {len(links)} links, {len(fresh)} new")
+            if len(fresh) < len(links) and not self.args.full:
+                stop_reason = f"page {n} reached known URLs"
+
+        self.page = numbers[-1] + 1
+        if not stop_reason and self.page > self.max_pages:
+            stop_reason = f"reached --max-pages ({self.max_pages})"
+        if stop_reason:
+            self.stop_reason = stop_reason
+            print(f"{name} stopped: {stop_reason}")
+
+
+# Run every crawl at once. Each source has one wave in flight at a time, fetched on its
+# own thread; all of them share one limiter, which holds every host to its source's
+# limits and all of them together to `workers` open requests. Finished waves are read
+# here as they come in, so a slow source never holds up the others
+def crawl_sources(crawls, args, cache, stats, session=None):
+    session = session or make_session(pool_size=max(args.workers, 4) * len(crawls))
+    sources = {crawl.source.name: crawl.source for crawl in crawls}
+    limiter = HostLimiter(limits=host_limits(sources, args.per_host, args.rps), budget=args.workers)
+
+    def fetch_wave(urls):
+        return list(fetch_all(
+            urls,
+            workers=len(urls),
+            timeout=args.timeout,
+            retries=args.retries,
+            session=session,
+            stats=stats,
+            cache=None if args.full else cache,
+            limiter=limiter,
+        ))
+
+    with ThreadPoolExecutor(max_workers=max(1, len(crawls))) as pool:
+        running = {}
+
+        def submit(crawl):
+            if not crawl.done:
+                numbers, urls = crawl.wave()
+                running[pool.submit(fetch_wave, urls)] = (crawl, numbers)
+
+        for crawl in crawls:
+            submit(crawl)
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                crawl, numbers = running.pop(future)
+                crawl.read(numbers, future.result())
+                submit(crawl)
+    return crawls
+
+
+def write_urls(path, urls):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(url + "\n" for url in urls)
+    os.replace(tmp_path, path)
+
+
+# url,published for every known URL with a date, newest first like the URL list
+def write_dates(path, frontier):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["url", "published"])
+        writer.writerows((url, frontier.dates[url]) for url in frontier.known if url in frontier.dates)
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sources = select_sources(load_sources(args.sources_file), args.sources)
+    overrides = {name: value for name, value in (("index_url", args.start), ("page_url", args.page_url),
+                                                 ("link_selector", args.selector)) if value}
+    if overrides:
+        if len(sources) > 1:
+            raise SystemExit("--start, --page-url and --selector only apply when crawling a single source")
+        sources = [dataclasses.replace(sources[0], **overrides)]
+
+    frontier = Frontier(args.frontier, seed_path=args.urls)
+    cache = FetchCache(args.cache)
+    page_store = PageStore(args.page_store) if args.page_store else None
+    stats = FetchStats()
+
+    try:
+        crawls = [IndexCrawl(source, args, frontier, cache, page_store) for source in sources]
+        crawl_sources(crawls, args, cache, stats)
+        first_page = crawls[0].first_page
+        if args.dump and first_page is not None and first_page.status_code != 304:
+            with open(args.dump, "w", encoding="utf-8") as f:
+                f.write(first_page.text)
+
+        # --- EMIT ---
+        # The article scraper can take either file: the new URLs alone, or everything
+        # known (it skips unchanged articles on its own through the fetch cache)
+        new_urls = list(dict.fromkeys(url for crawl in crawls for url in crawl.new_urls))
+        frontier.add(new_urls)
+        write_urls(args.new_urls, new_urls)
+        write_urls(args.urls, frontier.known)
+        if args.dates:
+            write_dates(args.dates, frontier)
+        frontier.save()
+    finally:
+        cache.close()
+        if page_store is not None:
+            page_store.close()
+
+    stats.stop()
+    pages_fetched = sum(crawl.pages_fetched for crawl in crawls)
+    of_sources = f" of {len(crawls)} sources" if len(crawls) > 1 else ""
+    print(f"\n✅ Found {len(new_urls)} new article URLs on {pages_fetched} index pages{of_sources} "
+          f"({len(frontier.known)} known in total).")
+    print(f"💾 New URLs saved to {args.new_urls}, all URLs to {args.urls}")
+    print(f"⏱️  {stats.report()}")
+    return len(new_urls)
+
 
-# Gets html of main blog page
-blog_scrape = "https://www.acfe.com/acfe-insights-blog"
-raw_blog = requests.get(blog_scrape)
-soup_blog = bs4.BeautifulSoup(raw_blog.text, 'html.parser')
-
-with open("acfe_blog.txt", 'w', encoding='utf-8') as f:
-    f.write(str(soup_blog))
-
-# Identifies links to blog articles and writes them to a text file
-articles = soup_blog.find_all("a", class_='color-secondary')
-article_links = ""
-for article in articles:
-    link = article.get('href')
-    article_links += link + "\n"
-with open("article_urls.txt", 'w', encoding='utf-8') as f:
-    f.write(str(article_links))
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import glob
+import math
+import os
+import pickle
+import re
+from collections import defaultdict
+
+import numpy as np
+
+# Inverted index over article title, summary and text with positional postings, so
+# phrase queries like "money laundering" and BM25 ranked search only touch the
+# articles that actually contain the query terms instead of scanning every row
+
+INDEX_DIR = ".search_index"
+INDEX_FIELDS = ("title", "summary", "text")
+
+# Positions jump by this much between fields so a phrase can never match across
+# the end of the title and the start of the summary
+FIELD_GAP = 100
+
+# Standard BM25 parameters
+K1 = 1.2
+B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+QUERY_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def tokenize(text):
+    if not isinstance(text, str):
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+# --- KEYWORD POSTINGS ---
+# keyword -> sorted row positions, built from the keyword_list column. This is what
+# the sidebar keyword filter uses instead of a str.contains scan over every row
+def keyword_postings(keyword_lists):
+    postings = defaultdict(list)
+    for row, keywords in enumerate(keyword_lists):
+        for kw in set(keywords):
+            postings[kw].append(row)
+    return {kw: np.array(rows, dtype=np.int64) for kw, rows in postings.items()}
+
+
+# --- FULL TEXT INDEX ---
+# Each term maps to four arrays: the docs it appears in, its count in each doc, and
+# its positions flattened into one array with offsets marking where each doc starts
+class SearchIndex:
+    def __init__(self, doc_keys, doc_lengths, postings):
+        self.doc_keys = list(doc_keys)
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float64)
+        self.postings = postings
+        self.avg_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+
+    def __len__(self):
+        return len(self.doc_keys)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((self.doc_keys, self.doc_lengths, self.postings), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            doc_keys, doc_lengths, postings = pickle.load(f)
+        return cls(doc_keys, doc_lengths, postings)
+
+    # --- LOOKUPS ---
+    # All (doc, position) pairs of a term, restricted to the given docs
+    def _doc_positions(self, term, docs):
+        doc_ids, tfs, offsets, positions = self.postings[term]
+        idx = np.searchsorted(doc_ids, docs)
+        counts = tfs[idx]
+        group_starts = np.cumsum(counts) - counts
+        flat = np.repeat(offsets[idx] - group_starts, counts) + np.arange(counts.sum())
+        return np.repeat(docs, counts), positions[flat].astype(np.int64)
+
+    # Docs containing every word of the phrase next to each other, with how often
+    # the phrase occurs in each of them. Each (doc, start position) pair is packed
+    # into one int64, so checking adjacency is a chain of sorted array intersections
+    def phrase_matches(self, phrase_terms):
+        if not phrase_terms or any(t not in self.postings for t in phrase_terms):
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        if len(phrase_terms) == 1:
+            doc_ids, tfs, _, _ = self.postings[phrase_terms[0]]
+            return doc_ids, tfs
+
+        # Only docs that contain every term can match
+        candidates = self.postings[phrase_terms[0]][0]
+        for term in phrase_terms[1:]:
+            candidates = np.intersect1d(candidates, self.postings[term][0], assume_unique=True)
+
+        starts = None
+        for offset, term in enumerate(phrase_terms):
+            docs, positions = self._doc_positions(term, candidates)
+            keys = (docs << 32) | (positions - offset + FIELD_GAP)
+            starts = keys if starts is None else np.intersect1d(starts, keys)
+            if len(starts) == 0:
+                return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        return np.unique(starts >> 32, return_counts=True)
+
+    # --- SEARCH ---
+    # Quoted parts of the query are phrases, everything else is a single term. Each
+    # term or phrase contributes its BM25 weight; a doc has to contain at least one.
+    # Returns (doc_key, score) pairs, best first
+    def search(self, query, limit=None):
+        n_docs = len(self.doc_keys)
+        if n_docs == 0:
+            return []
+        scores = np.zeros(n_docs)
+        matched = np.zeros(n_docs, dtype=bool)
+        for phrase, word in QUERY_PATTERN.findall(query):
+            terms = tokenize(phrase or word)
+            if not terms:
+                continue
+            doc_ids, tfs = self.phrase_matches(terms)
+            if len(doc_ids) == 0:
+                continue
+            idf = math.log(1 + (n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            lengths = self.doc_lengths[doc_ids]
+            tf_part = tfs * (K1 + 1) / (tfs + K1 * (1 - B + B * lengths / self.avg_length))
+            np.add.at(scores, doc_ids, idf * tf_part)
+            matched[doc_ids] = True
+
+        hits = np.flatnonzero(matched)
+        if limit is not None and len(hits) > limit:
+            hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self.doc_keys[i], float(scores[i])) for i in hits]
+
+
+def build_index(records, key="url", fields=INDEX_FIELDS):
+    doc_keys, doc_lengths = [], []
+    term_docs = defaultdict(list)
+    term_positions = defaultdict(list)
+
+    for doc_id, record in enumerate(records):
+        doc_keys.append(record[key])
+        per_doc = defaultdict(list)
+        position = 0
+        length = 0
+        for field in fields:
+            tokens = tokenize(record.get(field))
+            for offset, token in enumerate(tokens):
+                per_doc[token].append(position + offset)
+            position += len(tokens) + FIELD_GAP
+            length += len(tokens)
+        doc_lengths.append(length)
+        for term, positions in per_doc.items():
+            term_docs[term].append(doc_id)
+            term_positions[term].append(positions)
+
+    postings = {}
+    for term, docs in term_docs.items():
+        position_lists = term_positions[term]
+        tfs = np.array([len(p) for p in position_lists], dtype=np.int64)
+        offsets = np.zeros(len(tfs) + 1, dtype=np.int64)
+        np.cumsum(tfs, out=offsets[1:])
+        positions = np.fromiter((p for ps in position_lists for p in ps), dtype=np.int32, count=int(offsets[-1]))
+        postings[term] = (np.array(docs, dtype=np.int64), tfs, offsets, positions)
+
+    return SearchIndex(doc_keys, doc_lengths, postings)
+
+
+# --- PERSISTENCE ---
+# One file per data version; older versions are removed once a new one is written
+def index_path(data_version, index_dir=INDEX_DIR):
+    return os.path.join(index_dir, f"index-{data_version}.pkl")
+
+
+def load_or_build(data_version, load_records, index_dir=INDEX_DIR):
+    path = index_path(data_version, index_dir)
+    if os.path.exists(path):
+        return SearchIndex.load(path)
+    index = build_index(load_records())
+    index.save(path)
+    for old_path in glob.glob(os.path.join(index_dir, "index-*.pkl")):
+        if old_path != path:
+            os.remove(old_path)
+    return index
@@ -0,0 +1,210 @@
+import re
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from fetch_cache import HashCache, content_hash
+
+# TextBlob's default polarity (the pattern library's lexicon rules) without building
+# a TextBlob per text. The lexicon is read once per process. A batch is tokenized with
+# one regex per text, every distinct token of the batch is looked up once, and runs of
+# words that cannot affect the score are collapsed with numpy, so only a small part
+# of each text goes through the (sequential) negation / intensifier rules.
+# Scores match TextBlob(text).sentiment.polarity; `python benchmark.py sentiment`
+# checks that against TextBlob on the stored articles
+
+DEFAULT_SENTIMENT_CACHE_PATH = ".sentiment_cache.sqlite"
+
+# Same character classes TextBlob's tokenizer uses: punctuation is split off the
+# start and end of words, quotes and apostrophes are always tokens of their own,
+# and "n't" is split from the word before it
+PUNCTUATION = ".,;:!?()[]{}`'\"@#$^&*+-|=~_"
+QUOTES = "'\"“”‘’"
+_P = re.escape(PUNCTUATION)
+_Q = re.escape(QUOTES)
+_INNER = re.escape("".join(c for c in PUNCTUATION if c not in QUOTES))
+TOKEN_PATTERN = re.compile(
+    rf"[^\s{_P}{_Q}]+(?:[{_INNER}]+[^\s{_P}{_Q}]+)*"  # word, inner punctuation kept
+    rf"|\(\s*!\s*\)"                                 # sarcasm mark (!)
+    rf"|\.\.\."                                      # ellipsis
+    rf"|\S"                                          # any other single character
+)
+CONTRACTION = re.compile(r"n't")
+
+
+# Emoticons are matched on the space separated tokens, the way TextBlob does it, so
+# ": (" split apart by the tokenizer still counts as a frown
+def _emoticon_pattern():
+    from textblob._text import EMOTICONS
+
+    emoticons = sorted({e for group in EMOTICONS.values() for e in group}, key=len, reverse=True)
+    return re.compile(r"(%s)($|\s)" % "|".join(r" ?".join(re.escape(c) for c in e) for e in emoticons))
+
+# Token kinds
+PLAIN, KNOWN, OTHER = 0, 1, 2
+
+
+# --- LEXICON ---
+# word -> (polarity, subjectivity, intensity, is_modifier), averaged over senses and
+# part-of-speech tags exactly like TextBlob does for untagged text
+class Lexicon:
+    def __init__(self):
+        from textblob.en import sentiment as pattern_sentiment
+        from textblob._text import EMOTICONS
+
+        if not dict.__len__(pattern_sentiment):
+            pattern_sentiment.load()
+        self.negations = set(pattern_sentiment.negations)
+        self.modifiers = pattern_sentiment.modifiers
+        self.words = {
+            w: (pos[None][0], pos[None][1], pos[None][2], any(m in pos for m in self.modifiers))
+            for w, pos in dict.items(pattern_sentiment)
+        }
+        self.emoticons = {e.lower(): p for (_, p), group in EMOTICONS.items() for e in group}
+        self.emoticon_pattern = _emoticon_pattern()
+
+    # How the rules treat one token: (token, kind, known entry or None, negation,
+    # resets negation, resets modifier, emoticon polarity or None)
+    def classify(self, token):
+        negation = token in self.negations
+        entry = self.words.get(token)
+        if entry is not None:
+            return token, KNOWN, entry, negation, False, False, None
+        resets_n = len(token.strip("'")) > 1
+        resets_m = len(token) > 2
+        emoticon = None
+        if not token.isalpha() and len(token) <= 5 and token not in PUNCTUATION:
+            emoticon = self.emoticons.get(token)
+        special = negation or token in ("!", "(!)") or emoticon is not None
+        if resets_n and resets_m and not special:
+            return token, PLAIN, None, False, True, True, None
+        return token, OTHER, None, negation, resets_n, resets_m, emoticon
+
+
+_lexicon = None
+
+
+def get_lexicon():
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = Lexicon()
+    return _lexicon
+
+
+def tokenize(text, emoticon_pattern=None):
+    if "n't" in text:
+        text = CONTRACTION.sub(" n't", text)
+    joined = " ".join(TOKEN_PATTERN.findall(text))
+    if emoticon_pattern is not None and emoticon_pattern.search(joined):
+        joined = emoticon_pattern.sub(lambda m: m.group(1).replace(" ", "") + m.group(2), joined)
+    return joined.lower().split()
+
+
+# --- RULES ---
+# The pattern library's assessment loop over the (collapsed) tokens of one text:
+# known words are scored, an intensifier before a known word multiplies it, a negation
+# flips it to -0.5x, "!" boosts the word before it, (!) and emoticons add their own score
+def _polarity(codes, info):
+    scores = []  # [polarity, intensity, negated] per assessment
+    m = None
+    n = None
+    for code in codes:
+        w, kind, entry, negation, resets_n, resets_m, emoticon = info[code]
+        if kind == PLAIN:
+            m = n = None
+            continue
+        if kind == KNOWN:
+            p, _, i, is_modifier = entry
+            if m is None:
+                scores.append([p, i, False])
+            else:
+                last = scores[-1]
+                last[0] = max(-1.0, min(p * last[1], 1.0))
+                last[1] = i
+            if n is not None:
+                scores[-1][1] = 1.0 / scores[-1][1]
+                scores[-1][2] = True
+            m = w if is_modifier else None
+            n = w if negation else None
+            continue
+
+        if negation:
+            n = w
+        elif n and resets_n:
+            n = None
+        if n is not None and m is not None and m.endswith("ly"):
+            scores[-1][2] = True
+            n = None
+        elif m and resets_m:
+            m = None
+        if w == "!" and scores:
+            scores[-1][0] = max(-1.0, min(scores[-1][0] * 1.25, 1.0))
+        if w == "(!)":
+            scores.append([0.0, 1.0, False])
+        if emoticon is not None:
+            scores.append([emoticon, 1.0, False])
+
+    if not scores:
+        return 0.0
+    return sum(p * -0.5 if negated else p for p, _, negated in scores) / len(scores)
+
+
+# --- BATCH ---
+# Polarity for every text, in order, as a float array. Missing texts score 0.0
+def polarity_batch(texts):
+    lexicon = get_lexicon()
+    texts = ["" if not isinstance(t, str) else t for t in texts]
+    token_lists = [tokenize(t, lexicon.emoticon_pattern) for t in texts]
+    lengths = np.fromiter((len(t) for t in token_lists), dtype=np.int64, count=len(token_lists))
+    codes, uniques = pd.factorize(pd.Series(list(chain.from_iterable(token_lists)), dtype=object))
+    info = [lexicon.classify(u) for u in uniques]
+    plain = np.array([i[1] == PLAIN for i in info], dtype=bool)
+
+    # Drop every plain word that follows another plain word: it only repeats the reset
+    token_plain = plain[codes] if len(codes) else np.zeros(0, dtype=bool)
+    starts = np.concatenate([[0], np.cumsum(lengths)])
+    previous_plain = np.concatenate([[False], token_plain[:-1]])
+    previous_plain[starts[:-1][lengths > 0]] = False
+    keep = ~(token_plain & previous_plain)
+    kept_starts = np.concatenate([[0], np.cumsum(keep)])[starts]
+    kept_codes = codes[keep].tolist()
+
+    return np.array([
+        _polarity(kept_codes[kept_starts[k]:kept_starts[k + 1]], info) for k in range(len(texts))
+    ])
+
+
+def polarity(text):
+    return float(polarity_batch([text])[0])
+
+
+# --- CACHE ---
+class SentimentCache(HashCache):
+    table = "sentiment"
+    column = "polarity"
+
+
+# Same as polarity_batch, but texts scored by an earlier run come from the cache
+def cached_polarity_batch(texts, cache):
+    texts = ["" if not isinstance(t, str) else t for t in texts]
+    keys = [content_hash(t) for t in texts]
+    found = cache.get_many(set(keys))
+    missing = [i for i, key in enumerate(keys) if key not in found]
+    if missing:
+        scores = polarity_batch([texts[i] for i in missing])
+        computed = {keys[i]: float(score) for i, score in zip(missing, scores)}
+        cache.put_many(computed.items())
+        found.update(computed)
+    return np.array([found[key] for key in keys], dtype=float)
+
+
+# Stored sentiment wins; rows without one are scored from `source`. Rows with no
+# source text stay NaN, like the old .dropna().apply(...) did
+def fill_sentiment(df, source="summary", target="sentiment"):
+    stored = pd.to_numeric(df[target], errors="coerce") if target in df.columns else pd.Series(np.nan, index=df.index)
+    todo = stored.isna() & df[source].notna()
+    if todo.any():
+        stored[todo] = polarity_batch(df.loc[todo, source].astype(str).tolist())
+    df[target] = stored
+    return df
@@ -0,0 +1,129 @@
+import functools
+import json
+import re
+from dataclasses import dataclass, field, fields
+from urllib.parse import urlsplit
+
+from article_parser import Extractor
+
+# Every site we scrape, declared as data: where its index lives, how its index pages
+# are numbered, which links on them are articles, where each card shows its publish
+# date, which elements of an article page hold the title, author and body, and how
+# hard we may hit it. The article selectors are compiled once into an
+# article_parser.Extractor when the source is declared. Sites other than ACFE go in a
+# JSON file (a list of objects with the same fields) passed as --sources-file:
+#   [{"name": "example", "index_url": "https://example.com/news",
+#     "page_url": "https://example.com/news/page/{page}", "link_selector": "a.entry-link",
+#     "title_selector": "h1", "body_selector": "div.entry-content", "rps": 1}]
+# Article URLs are matched to their source by host; pages from any other host are read
+# with the default source's selectors
+
+DEFAULT_SOURCE = "acfe"
+
+
+@dataclass(frozen=True)
+class Source:
+    name: str
+    index_url: str           # index page 1
+    page_url: str            # index page N, with {page} in place of N
+    link_selector: str       # CSS selector of article links on an index page (tag.class ones parse fastest)
+    title_selector: str = "h1"
+    body_selector: str = "article"
+    author_selector: str = None
+    date_tag: str = "p"              # first tag after a link holding the card's publish date ('' for none)
+    date_format: str = "%b %d, %Y"   # strptime format of that date
+    max_pages: int = 20
+    per_host: int = 4        # politeness: requests open at once
+    rps: float = 5.0         # politeness: requests started per second
+    extractor: Extractor = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        extractor = Extractor.from_selectors(self.title_selector, self.body_selector, self.author_selector)
+        object.__setattr__(self, "extractor", extractor)
+
+    @property
+    def host(self):
+        return urlsplit(self.index_url).netloc.lower()
+
+
+ACFE = Source(
+    name="acfe",
+    index_url="https://www.acfe.com/acfe-insights-blog",
+    page_url="https://www.acfe.com/acfe-insights-blog?page={page}",
+    link_selector="a.color-secondary",
+    title_selector="h1",
+    body_selector="div.cell.large-8",
+    author_selector="h5.margin-top-1",
+)
+
+SOURCES = {ACFE.name: ACFE}
+
+
+# --- REGISTRY ---
+# The built-in sources plus any declared in path. A source in the file replaces a
+# built-in one of the same name
+def load_sources(path=None):
+    sources = dict(SOURCES)
+    if not path:
+        return sources
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    known = {f.name for f in fields(Source) if f.init}
+    for entry in entries:
+        unknown = set(entry) - known
+        if unknown:
+            raise ValueError(f"Unknown fields {sorted(unknown)} in source {entry.get('name')!r}, expected some of {sorted(known)}")
+        source = Source(**entry)
+        sources[source.name] = source
+    return sources
+
+
+def select_sources(sources, names):
+    missing = [name for name in names if name not in sources]
+    if missing:
+        raise ValueError(f"Unknown sources {missing}, expected some of {sorted(sources)}")
+    return [sources[name] for name in names]
+
+
+def source_for_url(url, sources, default=DEFAULT_SOURCE):
+    host = urlsplit(url).netloc.lower()
+    for source in sources.values():
+        if source.host == host:
+            return source
+    return sources[default]
+
+
+# {host: (per_host, rps)} for HostLimiter. per_host and rps, when given, override every source
+def host_limits(sources, per_host=None, rps=None):
+    return {
+        source.host: (per_host or source.per_host, rps or source.rps)
+        for source in sources.values()
+    }
+
+
+# --- SCHEDULING ---
+# Order URLs from several sources by when each source's rate limit lets them start:
+# the i-th URL of a source at rps r is due at i / r seconds. Fetched in that order, no
+# source waits behind another one's backlog, so a mixed crawl takes about as long as
+# its slowest source instead of the sum of all of them. One source keeps its order
+def interleave(urls, sources, rps=None):
+    seen = {}
+    due = []
+    for position, url in enumerate(urls):
+        source = source_for_url(url, sources)
+        i = seen.get(source.name, 0)
+        seen[source.name] = i + 1
+        due.append((i / (rps or source.rps or 1.0), position))
+    return [urls[position] for _, position in sorted(due)]
+
+
+# --- DATES ---
+# A regex for the dates a strptime format writes, to find one inside a card's text
+DATE_PARTS = {"%b": r"[A-Z][a-z]{2}", "%B": r"[A-Z][a-z]+", "%d": r"\d{1,2}", "%m": r"\d{1,2}",
+              "%Y": r"\d{4}", "%y": r"\d{2}", "%%": "%"}
+
+
+@functools.lru_cache(maxsize=None)
+def date_pattern(fmt):
+    parts = re.split(r"(%.)", fmt)
+    return re.compile("".join(DATE_PARTS.get(part, re.escape(part)) if part else "" for part in parts))
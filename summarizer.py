@@ -0,0 +1,262 @@
+import time
+
+import nltk
+import numpy as np
+from nltk.tokenize import sent_tokenize
+
+from fetch_cache import HashCache, content_hash
+from search_index import tokenize
+
+# Extractive summaries for scraped articles. Backends are picked by name:
+#   "textrank"     (default) TF-IDF sentence vectors + TextRank centrality, numpy only
+#   "keyword"      the original rule: the first sentences that mention a detected keyword
+#   "transformers" an abstractive model from Hugging Face, much slower, needs
+#                  transformers + torch installed
+# Summaries are memoized on disk by a hash of the article text, its keywords and the
+# backend settings, so an unchanged article is never summarized twice
+
+DEFAULT_SUMMARY_CACHE_PATH = ".summary_cache.sqlite"
+DEFAULT_MODEL = "sshleifer/distilbart-cnn-12-6"
+SUMMARY_SENTENCES = 3
+
+# TextRank settings: the usual PageRank damping, and how much extra weight a sentence
+# gets for mentioning one of the article's fraud keywords
+DAMPING = 0.85
+RANK_ITERATIONS = 30
+KEYWORD_BOOST = 0.5
+
+# Fallback when no sentence can be picked, same as the original summarizer
+FALLBACK_CHARS = 300
+
+
+def fallback_summary(body_text):
+    return body_text[:FALLBACK_CHARS] + "..."
+
+
+# --- NLTK DATA ---
+# sent_tokenize needs the punkt sentence models (punkt_tab since nltk 3.9). They are
+# looked up locally and only downloaded when missing, once per process and only when a
+# summary actually has to be computed, instead of calling nltk.download on every run.
+# A failed download (offline, say) raises before the batch is tokenized, and is tried
+# again on the next batch
+PUNKT_RESOURCE = "punkt_tab"
+_punkt_ready = False
+
+
+def _punkt_installed():
+    try:
+        nltk.data.find(f"tokenizers/{PUNKT_RESOURCE}/english/")
+    except LookupError:
+        return False
+    return True
+
+
+def ensure_punkt():
+    global _punkt_ready
+    if _punkt_ready:
+        return
+    if not _punkt_installed():
+        nltk.download(PUNKT_RESOURCE, quiet=True)
+        if not _punkt_installed():
+            raise RuntimeError(f"NLTK {PUNKT_RESOURCE} sentence models are missing and could not be downloaded; "
+                               f"run `python -m nltk.downloader {PUNKT_RESOURCE}` while online")
+    _punkt_ready = True
+
+
+# --- KEYWORD BACKEND ---
+# Combine 2–3 keyword-heavy sentences as summary. Each sentence is lowercased once
+def keyword_summary(body_text, found_keywords, n_sentences=SUMMARY_SENTENCES):
+    summary_sentences = []
+    for sent in sent_tokenize(body_text):
+        lowered = sent.lower()
+        if any(kw in lowered for kw in found_keywords):
+            summary_sentences.append(sent)
+            if len(summary_sentences) == n_sentences:
+                break
+    return " ".join(summary_sentences) or fallback_summary(body_text)
+
+
+# --- TEXTRANK BACKEND ---
+# Every sentence of the batch is tokenized once and the tokens are turned into integer
+# ids, so term counts and document frequencies for the whole batch come out of two
+# np.unique calls over packed (sentence, term) and (article, term) pairs. IDF is taken
+# within each article, so a summary does not depend on which batch it was computed in
+# and can be cached. Sentences are then ranked per article: cosine similarity between
+# their TF-IDF vectors and a few rounds of power iteration. Keyword sentences get a
+# boost in the teleport vector, and the top sentences come back in their original order
+def textrank_summaries(texts, keyword_lists, n_sentences=SUMMARY_SENTENCES):
+    sentences = [sent_tokenize(text) for text in texts]
+    vocab = {}
+    sentence_ids, term_ids = [], []
+    sentence_id = 0
+    for article in sentences:
+        for sent in article:
+            for token in tokenize(sent):
+                sentence_ids.append(sentence_id)
+                term_ids.append(vocab.setdefault(token, len(vocab)))
+            sentence_id += 1
+
+    sentence_counts = np.array([len(a) for a in sentences], dtype=np.int64)
+    article_of_sentence = np.repeat(np.arange(len(sentences)), sentence_counts)
+    sentence_ids = np.array(sentence_ids, dtype=np.int64)
+    term_ids = np.array(term_ids, dtype=np.int64)
+    pairs, counts = np.unique((sentence_ids << 32) | term_ids, return_counts=True)
+    pair_sentences = pairs >> 32
+    pair_terms = pairs & 0xFFFFFFFF
+    pair_articles = article_of_sentence[pair_sentences]
+    _, article_term, doc_freq = np.unique(
+        (pair_articles << 32) | pair_terms, return_inverse=True, return_counts=True
+    )
+    idf = np.log((1 + sentence_counts[pair_articles]) / (1 + doc_freq[article_term])) + 1.0
+    weights = (1 + np.log(counts)) * idf
+    bounds = np.searchsorted(pair_sentences, np.concatenate([[0], np.cumsum(sentence_counts)]))
+
+    summaries = []
+    first_sentence = 0
+    for article, text, keywords, start, end in zip(sentences, texts, keyword_lists, bounds[:-1], bounds[1:]):
+        summaries.append(_rank_article(
+            article, text, keywords, pair_sentences[start:end] - first_sentence,
+            pair_terms[start:end], weights[start:end], n_sentences,
+        ))
+        first_sentence += len(article)
+    return summaries
+
+
+def _rank_article(article, text, keywords, rows, terms, weights, n_sentences):
+    if len(article) <= n_sentences:
+        return " ".join(article) or fallback_summary(text)
+
+    local_terms, cols = np.unique(terms, return_inverse=True)
+    matrix = np.zeros((len(article), len(local_terms)))
+    matrix[rows, cols] = weights
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1, norms)
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = similarity / np.where(out_weight == 0, 1, out_weight)
+
+    teleport = np.ones(len(article))
+    if keywords:
+        teleport += KEYWORD_BOOST * np.array([any(kw in s.lower() for kw in keywords) for s in article])
+    teleport /= teleport.sum()
+
+    rank = teleport.copy()
+    for _ in range(RANK_ITERATIONS):
+        rank = (1 - DAMPING) * teleport + DAMPING * (transition.T @ rank)
+    best = np.sort(np.argsort(-rank, kind="stable")[:n_sentences])
+    return " ".join(article[i] for i in best)
+
+
+# --- TRANSFORMERS BACKEND ---
+# Loaded on first use, so nothing heavy is imported unless this backend is picked
+class TransformersBackend:
+    def __init__(self, model=DEFAULT_MODEL, max_length=130, min_length=30):
+        from transformers import pipeline
+
+        self.pipe = pipeline("summarization", model=model, device=-1)
+        self.max_length = max_length
+        self.min_length = min_length
+
+    def __call__(self, texts, keyword_lists, n_sentences=SUMMARY_SENTENCES):
+        results = self.pipe(
+            list(texts), max_length=self.max_length, min_length=self.min_length, truncation=True,
+        )
+        return [r["summary_text"] for r in results]
+
+
+BACKENDS = ["textrank", "keyword", "transformers"]
+
+
+# --- SUMMARY CACHE ---
+# key -> summary, where the key covers the text, the keywords and the backend settings
+class SummaryCache(HashCache):
+    table = "summaries"
+    column = "summary"
+
+
+# --- SUMMARIZER ---
+# summarize_batch(texts, keyword_lists) -> summaries, in order. Cached articles are
+# looked up in one query and the rest go to the backend together. latencies holds
+# the time spent per article, for picking a backend per deployment: backend time is
+# split evenly over the articles of a batch, cache hits only pay for the lookup
+class Summarizer:
+    def __init__(self, backend="textrank", cache_path=DEFAULT_SUMMARY_CACHE_PATH,
+                 n_sentences=SUMMARY_SENTENCES, model=DEFAULT_MODEL):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown summarizer backend {backend!r}, expected one of {BACKENDS}")
+        self.backend = backend
+        self.n_sentences = n_sentences
+        self.settings = f"{backend}:{n_sentences}" + (f":{model}" if backend == "transformers" else "")
+        self.model = model
+        self._transformers = None
+        self.cache = SummaryCache(cache_path) if cache_path else None
+        self.latencies = []
+        self.hits = 0
+        self.misses = 0
+
+    # Makes sure the backend's data is there before a run starts, so a missing model
+    # fails up front with a clear error instead of in the middle of a batch
+    def prepare(self):
+        if self.backend in ("keyword", "textrank"):
+            ensure_punkt()
+
+    def _run_backend(self, texts, keyword_lists):
+        self.prepare()
+        if self.backend == "keyword":
+            return [keyword_summary(t, k, self.n_sentences) for t, k in zip(texts, keyword_lists)]
+        if self.backend == "textrank":
+            return textrank_summaries(texts, keyword_lists, self.n_sentences)
+        if self._transformers is None:
+            self._transformers = TransformersBackend(self.model)
+        return self._transformers(texts, keyword_lists, self.n_sentences)
+
+    def cache_key(self, text, keywords):
+        return content_hash("\0".join([self.settings, text, ",".join(keywords)]))
+
+    def summarize_batch(self, texts, keyword_lists):
+        texts = list(texts)
+        keyword_lists = [list(k) for k in keyword_lists]
+        if not texts:
+            return []
+        start = time.perf_counter()
+        keys = [self.cache_key(t, k) for t, k in zip(texts, keyword_lists)]
+        cached = self.cache.get_many(set(keys)) if self.cache else {}
+        lookup_s = (time.perf_counter() - start) / len(texts)
+
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        per_article_s = 0.0
+        if missing:
+            start = time.perf_counter()
+            fresh = self._run_backend([texts[i] for i in missing], [keyword_lists[i] for i in missing])
+            per_article_s = (time.perf_counter() - start) / len(missing)
+            computed = {keys[i]: summary for i, summary in zip(missing, fresh)}
+            if self.cache:
+                self.cache.put_many(computed.items())
+            cached.update(computed)
+
+        missing_set = set(missing)
+        for i in range(len(texts)):
+            self.latencies.append(lookup_s + (per_article_s if i in missing_set else 0.0))
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return [cached[key] for key in keys]
+
+    def summarize(self, text, keywords):
+        return self.summarize_batch([text], [keywords])[0]
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return 0.0
+        return float(np.percentile(self.latencies, pct))
+
+    def report(self):
+        total = len(self.latencies)
+        return (
+            f"Summarized {total} articles with {self.backend} ({self.hits} cached, {self.misses} computed): "
+            f"p50 {self.percentile(50) * 1000:.1f} ms, p95 {self.percentile(95) * 1000:.1f} ms per article"
+        )
+
+    def close(self):
+        if self.cache:
+            self.cache.close()
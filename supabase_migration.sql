@@ -0,0 +1,7 @@
+-- Columns the sync sends that the original articles_summarized table does not have.
+-- Run once in the Supabase SQL editor (or psql) before the first sync; safe to rerun.
+alter table articles_summarized
+    add column if not exists sentiment double precision,
+    add column if not exists cluster_id bigint,
+    add column if not exists published text,
+    add column if not exists source text;
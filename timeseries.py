@@ -0,0 +1,306 @@
+import argparse
+import datetime
+import math
+import os
+import sqlite3
+import time
+from collections import Counter
+
+import pandas as pd
+
+from fraud_scoring import score_keyword_strings
+
+# Article counts over time, by publish date: per day and per ISO week (buckets named by
+# their Monday), for every trend, keyword and severity level, plus the total. The counts
+# live in a small sqlite file next to a record of what each article added to them, so
+# new and changed articles are folded in without recounting the rest: a changed article
+# takes its old contribution back out and adds the new one. The dashboard's time charts
+# read these few thousand rows instead of the articles. On top of the weekly keyword
+# counts, spikes() flags keywords showing up far more often lately than they used to:
+#   python timeseries.py update fraud_articles_summarized.csv --prune
+#   python timeseries.py show --dim trend
+#   python timeseries.py spikes
+
+DEFAULT_TIMESERIES_PATH = ".timeseries.sqlite"
+PERIODS = ["day", "week"]
+DIMENSIONS = ["all", "trend", "severity", "keyword"]
+
+# Spike detection: the last SPIKE_WINDOW weeks against the SPIKE_BASELINE weeks before them
+SPIKE_WINDOW = 4
+SPIKE_BASELINE = 26
+SPIKE_MIN_COUNT = 2
+SPIKE_MIN_RATIO = 2.0
+SPIKE_MIN_Z = 2.0
+# A keyword never seen in the baseline is still expected this many times, so one
+# mention of something new is not a spike
+MIN_EXPECTED = 0.5
+
+
+# "2025-10-21" -> {"day": "2025-10-21", "week": "2025-10-20"}, None for a missing date
+def buckets(published):
+    try:
+        day = datetime.date.fromisoformat(str(published)[:10])
+    except ValueError:
+        return None
+    return {"day": day.isoformat(), "week": (day - datetime.timedelta(days=day.weekday())).isoformat()}
+
+
+# Every (period, bucket, dim, value) one article counts towards
+def contribution(published, trend, severity, keywords):
+    found = buckets(published)
+    if found is None:
+        return []
+    cells = [("all", ""), ("trend", trend), ("severity", severity)] + [("keyword", kw) for kw in dict.fromkeys(keywords)]
+    return [(period, bucket, dim, value) for period, bucket in found.items() for dim, value in cells if value is not None]
+
+
+def _key(published, trend, severity, keywords):
+    return "\x1f".join([published or "", trend or "", severity or ""] + list(keywords))
+
+
+# --- STORE ---
+class TimeSeriesStore:
+    def __init__(self, path=DEFAULT_TIMESERIES_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS counts (
+                period TEXT,
+                bucket TEXT,
+                dim TEXT,
+                value TEXT,
+                n INTEGER,
+                PRIMARY KEY (period, dim, value, bucket)
+            );
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                published TEXT,
+                trend TEXT,
+                severity TEXT,
+                keywords TEXT,
+                key TEXT
+            );
+            """
+        )
+
+    def _apply(self, delta):
+        delta = [(period, bucket, dim, value, n) for (period, bucket, dim, value), n in delta.items() if n]
+        self.conn.executemany(
+            """
+            INSERT INTO counts (period, bucket, dim, value, n) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (period, dim, value, bucket) DO UPDATE SET n = n + excluded.n
+            """,
+            delta,
+        )
+        self.conn.execute("DELETE FROM counts WHERE n <= 0")
+
+    def _old(self, urls):
+        old = {}
+        urls = list(urls)
+        for i in range(0, len(urls), 500):
+            part = urls[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT url, published, trend, severity, keywords, key FROM articles WHERE url IN ({','.join('?' * len(part))})",
+                part,
+            )
+            old.update((row[0], row[1:]) for row in rows)
+        return old
+
+    # Fold in a frame of articles with url, published and keywords_found (trend too, if
+    # it was stored upstream). Articles whose date, trend, severity and keywords are
+    # unchanged cost one lookup. Returns how many articles changed the counts
+    def update(self, df):
+        df = df[df["url"].notna()].drop_duplicates("url", keep="last")
+        if not len(df):
+            return 0
+        scored = score_keyword_strings(df["keywords_found"])
+        trends = df["trend"].where(df["trend"].notna(), scored["trend"]) if "trend" in df.columns else scored["trend"]
+        published = df["published"] if "published" in df.columns else pd.Series(None, index=df.index, dtype=object)
+        old = self._old(df["url"])
+
+        delta = Counter()
+        changed = []
+        for url, date, trend, severity, keywords in zip(df["url"], published, trends, scored["severity_level"], scored["keyword_list"]):
+            date = None if pd.isna(date) or buckets(date) is None else str(date)[:10]
+            key = _key(date, trend, severity, keywords)
+            previous = old.get(url)
+            if previous is not None and previous[-1] == key:
+                continue
+            if previous is not None:
+                delta.subtract(Counter(contribution(previous[0], previous[1], previous[2], _split(previous[3]))))
+            delta.update(contribution(date, trend, severity, keywords))
+            changed.append((url, date, trend, severity, ",".join(keywords), key))
+        with self.conn:
+            self._apply(delta)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO articles (url, published, trend, severity, keywords, key) VALUES (?, ?, ?, ?, ?, ?)",
+                changed,
+            )
+        return len(changed)
+
+    # Take out every article not in keep. Returns how many went
+    def prune(self, keep):
+        keep = set(keep)
+        gone = [row for row in self.conn.execute("SELECT url, published, trend, severity, keywords FROM articles") if row[0] not in keep]
+        delta = Counter()
+        for _, date, trend, severity, keywords in gone:
+            delta.subtract(Counter(contribution(date, trend, severity, _split(keywords))))
+        with self.conn:
+            self._apply(delta)
+            self.conn.executemany("DELETE FROM articles WHERE url = ?", [(row[0],) for row in gone])
+        return len(gone)
+
+    # --- QUERIES ---
+    # Bucket x value counts for one dimension, with every bucket between the first and
+    # last one present (empty weeks are 0, not missing). values limits the columns
+    def series(self, dim="trend", period="week", values=None, start=None):
+        query = "SELECT bucket, value, n FROM counts WHERE period = ? AND dim = ?"
+        params = [period, dim]
+        if start:
+            query += " AND bucket >= ?"
+            params.append(start)
+        rows = pd.DataFrame(self.conn.execute(query, params).fetchall(), columns=["bucket", "value", "n"])
+        if values is not None:
+            rows = rows[rows["value"].isin(list(values))]
+        if not len(rows):
+            return pd.DataFrame(dtype=int)
+        table = rows.pivot_table(index="bucket", columns="value", values="n", aggfunc="sum", fill_value=0)
+        table.index = pd.to_datetime(table.index)
+        full = pd.date_range(table.index.min(), table.index.max(), freq="D" if period == "day" else "W-MON")
+        table = table.reindex(full, fill_value=0)
+        table.index.name = period
+        table.columns.name = dim
+        return table.astype(int)
+
+    def total(self, period="week", start=None):
+        table = self.series("all", period, start=start)
+        return table[""] if len(table.columns) else pd.Series(dtype=int)
+
+    def undated(self):
+        return self.conn.execute("SELECT COUNT(*) FROM articles WHERE published IS NULL").fetchone()[0]
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    # --- SPIKES ---
+    # Keywords whose share of articles in the last `window` weeks is well above their share
+    # in the `baseline` weeks before. A keyword's expected count in the window is its
+    # baseline share times the window's article count; it is flagged when it was seen at
+    # least min_count times, at least min_ratio times as often as expected, and
+    # min_z Poisson standard deviations above it. as_of defaults to the latest week
+    def spikes(self, window=SPIKE_WINDOW, baseline=SPIKE_BASELINE, min_count=SPIKE_MIN_COUNT,
+               min_ratio=SPIKE_MIN_RATIO, min_z=SPIKE_MIN_Z, as_of=None):
+        columns = ["keyword", "recent", "expected", "baseline", "ratio", "z"]
+        totals = self.total("week")
+        if not len(totals):
+            return pd.DataFrame(columns=columns)
+        end = pd.Timestamp(buckets(as_of)["week"]) if as_of else totals.index.max()
+        split = end - pd.Timedelta(weeks=window - 1)
+        first = split - pd.Timedelta(weeks=baseline)
+        keywords = self.series("keyword", "week", start=first.date().isoformat())
+        if not len(keywords.columns):
+            return pd.DataFrame(columns=columns)
+        keywords = keywords[keywords.index <= end]
+        recent = keywords[keywords.index >= split].sum()
+        before = keywords[keywords.index < split].sum()
+        recent_total = totals[(totals.index >= split) & (totals.index <= end)].sum()
+        baseline_total = totals[(totals.index >= first) & (totals.index < split)].sum()
+
+        rows = []
+        for keyword in keywords.columns:
+            share = before[keyword] / baseline_total if baseline_total else 0.0
+            expected = max(share * recent_total, MIN_EXPECTED)
+            ratio = recent[keyword] / expected
+            z = (recent[keyword] - expected) / math.sqrt(expected)
+            if recent[keyword] >= min_count and ratio >= min_ratio and z >= min_z:
+                rows.append((keyword, int(recent[keyword]), expected, int(before[keyword]), ratio, z))
+        return pd.DataFrame(rows, columns=columns).sort_values("z", ascending=False, ignore_index=True)
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def _split(keywords):
+    return [kw for kw in (keywords or "").split(",") if kw]
+
+
+# --- BUILD ---
+# Output written before publish dates were captured has no published column; its
+# articles are recorded as undated until a scrape backfills the dates
+def input_chunks(path, chunksize):
+    from dataset import is_dataset, iter_articles
+    from output_writer import output_format, read_chunks
+
+    columns = ["url", "published", "keywords_found"]
+    if is_dataset(path):
+        return iter_articles(path, columns=columns, chunksize=chunksize)
+    if output_format(path) == "csv" and os.path.exists(path):
+        header = pd.read_csv(path, nrows=0).columns
+        columns = [c for c in columns if c in header]
+    return read_chunks(path, columns=columns, chunksize=chunksize)
+
+
+# Fold every article of a scraped CSV/JSONL or the Parquet dataset into the store. With
+# prune, articles no longer in the input are taken out. Returns (read, changed, pruned)
+def update(path, store_path=DEFAULT_TIMESERIES_PATH, prune=False, chunksize=5000):
+    store = TimeSeriesStore(store_path)
+    seen = []
+    changed = 0
+    try:
+        for chunk in input_chunks(path, chunksize):
+            changed += store.update(chunk)
+            seen.extend(chunk["url"])
+        pruned = store.prune(seen) if prune else 0
+    finally:
+        store.close()
+    return len(seen), changed, pruned
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Article counts per day and week, and keyword spikes")
+    parser.add_argument("--store", default=DEFAULT_TIMESERIES_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    update_parser = sub.add_parser("update", help="fold new and changed articles into the counts")
+    update_parser.add_argument("input", help="scraped CSV/JSONL or Parquet dataset directory")
+    update_parser.add_argument("--prune", action="store_true", help="take out articles no longer in the input")
+    show = sub.add_parser("show", help="print counts per bucket for one dimension")
+    show.add_argument("--dim", choices=DIMENSIONS, default="trend")
+    show.add_argument("--period", choices=PERIODS, default="week")
+    show.add_argument("--since", help="first bucket to show, YYYY-MM-DD")
+    spikes = sub.add_parser("spikes", help="keywords rising sharply in the latest weeks")
+    spikes.add_argument("--window", type=int, default=SPIKE_WINDOW, help="recent weeks")
+    spikes.add_argument("--baseline", type=int, default=SPIKE_BASELINE, help="weeks before those to compare with")
+    spikes.add_argument("--min-count", type=int, default=SPIKE_MIN_COUNT)
+    spikes.add_argument("--min-ratio", type=float, default=SPIKE_MIN_RATIO)
+    spikes.add_argument("--min-z", type=float, default=SPIKE_MIN_Z)
+    spikes.add_argument("--as-of", help="week to end the window on, YYYY-MM-DD (default the latest)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "update":
+        start = time.perf_counter()
+        read, changed, pruned = update(args.input, args.store, args.prune)
+        print(f"📈 Counted {read} articles ({changed} new or changed, {pruned} pruned) in {time.perf_counter() - start:.2f}s")
+        return changed
+
+    store = TimeSeriesStore(args.store)
+    try:
+        if args.command == "show":
+            table = store.series(args.dim, args.period, start=args.since)
+            print(table.to_string() if len(table) else "No dated articles counted yet")
+            undated = store.undated()
+            if undated:
+                print(f"({undated} articles without a publish date are not counted)")
+        else:
+            found = store.spikes(args.window, args.baseline, args.min_count, args.min_ratio, args.min_z, args.as_of)
+            print(found.to_string(index=False, float_format="{:.2f}".format) if len(found) else "No keyword spikes")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,232 @@
+import argparse
+import hashlib
+import json
 import os
+import time
+
 from dotenv import load_dotenv
 import pandas as pd
-import streamlit as st
-from supabase import create_client, client
-import json
-import csv
+from supabase import create_client
+
+from dataset import DEFAULT_DATASET_PATH, is_dataset, read_articles
+import metrics
+from metrics import METRICS, count, timer
+
+TABLE_NAME = 'articles_summarized'
+DEFAULT_STATE_PATH = '.supabase_sync.json'
+# Read when no --input is given and there is no dataset yet
+DEFAULT_CSV_PATH = 'fraud_articles_summarized.csv'
+# Adds the columns the sync sends on top of the original table (sentiment, cluster_id,
+# published, source). PostgREST answers PGRST204 for a column the table does not have
+MIGRATION_PATH = 'supabase_migration.sql'
+MISSING_COLUMN_CODE = 'PGRST204'
+
+
+# Dataset columns that only exist locally and are never sent
+LOCAL_ONLY_COLUMNS = ['scrape_date', 'text_hash']
+
+
+def to_records(articles_df):
+    return articles_df.astype(object).where(articles_df.notna(), None).to_dict('records')
+
+
+# --- LOAD ---
+# Read the scraped CSV straight into plain dicts; NaN becomes None so it is sent as null.
+# From the Parquet dataset only the metadata is loaded: rows carry text_hash in place of
+# the body, so diffing never reads article text
+def load_rows(path):
+    if is_dataset(path):
+        return to_records(read_articles(path, columns=['url', 'title', 'author', 'keywords_found',
+                                                         'summary', 'sentiment', 'cluster_id', 'published',
+                                                         'source', 'text_hash']))
+    articles_df = pd.read_csv(path)
+    if 'cluster_id' in articles_df.columns:
+        # Read back as float when some rows have none, but stored as an integer
+        articles_df['cluster_id'] = articles_df['cluster_id'].astype('Int64')
+    return to_records(articles_df)
+
+
+# Turn a batch of dataset rows into what Supabase stores: the bodies of just these
+# urls are read, and the local-only columns are dropped
+def with_text(root, batch):
+    urls = [row['url'] for row in batch]
+    bodies = read_articles(root, columns=['url', 'text'], filters=[('url', 'in', urls)])
+    text = dict(zip(bodies['url'], bodies['text'].astype(object).where(bodies['text'].notna(), None)))
+    return [
+        {**{k: v for k, v in row.items() if k not in LOCAL_ONLY_COLUMNS}, 'text': text.get(row['url'])}
+        for row in batch
+    ]
+
+
+# One row per near-duplicate cluster, the first one seen winning. Rows without a
+# cluster id are their own story
+def one_per_story(rows):
+    seen = set()
+    kept = []
+    for row in rows:
+        cluster = row.get('cluster_id')
+        if cluster is not None and cluster in seen:
+            continue
+        seen.add(cluster)
+        kept.append(row)
+    return kept
+
+
+def story_count(rows):
+    clusters = [row.get('cluster_id') for row in rows]
+    return len({c for c in clusters if c is not None}) + sum(c is None for c in clusters)
+
+
+# --- DIFF ---
+# A stable hash of everything in the row, so any edited field counts as a change
+def row_hash(row):
+    encoded = json.dumps(row, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
 
-load_dotenv()
-articles_pd = pd.read_csv("fraud_articles_summarized.csv")
-articles_pd.to_json('articles_summarized.json')
+def load_state(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
 
-with open('articles_summarized.json') as articles_in:
-    articles_in2 = json.load(articles_in)
-articles_df = pd.DataFrame(articles_in2)
 
-DATABASE_URL = os.getenv("SUPABASE_URL")
-if not DATABASE_URL:
-    print("URL not found")
-    exit
+def save_state(state, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+# Split rows into new and changed ones, compared with the hashes we synced last time.
+# Rows are keyed by url since that is what identifies an article
+def diff_rows(rows, state, key='url'):
+    new_rows, changed_rows = [], []
+    unchanged = 0
+    for row in rows:
+        previous = state.get(row[key])
+        if previous is None:
+            new_rows.append(row)
+        elif previous != row_hash(row):
+            changed_rows.append(row)
+        else:
+            unchanged += 1
+    return new_rows, changed_rows, unchanged
+
+
+# --- SYNC ---
+# Upsert in batches instead of one HTTP call per row. The state file is saved
+# after every batch, so a failure part way through only resends what is left.
+# prepare, if given, turns a batch into the rows actually sent; the state keeps
+# the hash of the rows as they were diffed
+def sync_rows(table, rows, state, batch_size=500, key='url', state_path=None, prepare=None):
+    sent = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        if prepare:
+            with timer("prepare", n=len(batch)):
+                batch_to_send = prepare(batch)
+        else:
+            batch_to_send = batch
+        with timer("upsert", n=len(batch)):
+            table.upsert(batch_to_send).execute()
+        count("rows_upserted", len(batch))
+        metrics.log("upsert", rows=len(batch), sent=sent + len(batch), total=len(rows))
+        for row in batch:
+            state[row[key]] = row_hash(row)
+        if state_path:
+            save_state(state, state_path)
+        sent += len(batch)
+    return sent
+
+
+def print_diff(new_rows, changed_rows, unchanged):
+    print(f"{len(new_rows)} new, {len(changed_rows)} changed, {unchanged} unchanged "
+          f"({story_count(new_rows + changed_rows)} distinct stories to send)")
+    for label, rows in (("+", new_rows), ("~", changed_rows)):
+        for row in rows:
+            print(f"  {label} {row.get('title')} ({row.get('url')})")
+
 
 def init_connection():
-    url = DATABASE_URL
+    url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
     return create_client(url, key)
-supabaser = init_connection()
 
-for row in articles_df.index:
-    response = (supabaser.table('articles_summarized').upsert(articles_df.loc[row].to_dict()).execute())
\ No newline at end of file
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sync new and changed articles to Supabase")
+    parser.add_argument("--input", help=f"Parquet dataset directory or scraped CSV (default {DEFAULT_DATASET_PATH}, "
+                                        f"or {DEFAULT_CSV_PATH} until the dataset exists)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, help="hashes of the rows synced last time")
+    parser.add_argument("--dry-run", action="store_true", help="print what would be sent without sending it")
+    parser.add_argument("--full", action="store_true", help="ignore the state file and resend every row")
+    parser.add_argument("--one-per-story", action="store_true", help="only send the first article of each near-duplicate cluster")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    # The dataset is diffed on its metadata alone, bodies are only read for rows being sent
+    if args.input is None:
+        args.input = DEFAULT_DATASET_PATH if is_dataset(DEFAULT_DATASET_PATH) else DEFAULT_CSV_PATH
+    return args
+
+
+def run_sync(args, client=None):
+    load_dotenv()
+
+    with timer("load"):
+        rows = load_rows(args.input)
+    if args.one_per_story:
+        rows = one_per_story(rows)
+    with timer("diff", n=len(rows)):
+        state = {} if args.full else load_state(args.state)
+        new_rows, changed_rows, unchanged = diff_rows(rows, state)
+    print_diff(new_rows, changed_rows, unchanged)
+    metrics.log("diff", new=len(new_rows), changed=len(changed_rows), unchanged=unchanged)
+
+    if args.dry_run:
+        print("Dry run, nothing was sent")
+        return 0
+
+    to_send = new_rows + changed_rows
+    if not to_send:
+        print("Supabase is already up to date")
+        return 0
+
+    if client is None:
+        if not os.getenv("SUPABASE_URL"):
+            print("URL not found")
+            return 0
+        client = init_connection()
+
+    start = time.perf_counter()
+    prepare = (lambda batch: with_text(args.input, batch)) if is_dataset(args.input) else None
+    try:
+        sent = sync_rows(
+            client.table(TABLE_NAME), to_send, state, batch_size=args.batch_size, state_path=args.state, prepare=prepare,
+        )
+    except Exception as e:
+        if getattr(e, 'code', None) == MISSING_COLUMN_CODE:
+            raise SystemExit(f"{TABLE_NAME} is missing a column the sync sends ({getattr(e, 'message', e)}). "
+                             f"Run {MIGRATION_PATH} against the database once, then sync again") from e
+        raise
+    elapsed = time.perf_counter() - start
+    rate = sent / elapsed if elapsed > 0 else 0.0
+    print(f"Upserted {sent} rows in {elapsed:.2f}s ({rate:.0f} rows/sec)")
+    return sent
+
+
+# Metrics are written however the run ends, failed runs being the interesting ones
+def main(argv=None, client=None):
+    args = parse_args(argv)
+    metrics.configure_from_args(args)
+    METRICS.reset()
+    try:
+        return run_sync(args, client)
+    finally:
+        METRICS.flush(job="sync")
+        print(f"⏱️  Stages: {METRICS.report()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,237 @@
-import pandas as pd
-df = pd.read_csv("fraud_articles_summarized.csv")
-print(df.head())
-print(f"Total fraud-related articles: {len(df)}")
-
-######
-
-from collections import Counter
-import matplotlib.pyplot as plt
-
-# Split and count all keywords
-all_keywords = []
-for item in df['keywords_found'].dropna():
-    all_keywords.extend([kw.strip().lower() for kw in item.split(',')])
-
-keyword_counts = Counter(all_keywords)
-top5 = keyword_counts.most_common(5)
-print("Top 5 Keywords:", top5)
-
-# Plot
-plt.bar([k for k, _ in top5], [v for _, v in top5])
-plt.title("Top 5 Fraud-Related Keywords")
-plt.xlabel("Keyword")
-plt.ylabel("Frequency")
-plt.tight_layout()
-plt.savefig("top_5_keywords.png")
-plt.close()
-
-
-#########
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 
+import pandas as pd
 
-def classify_trend(keywords):
-    k = keywords.lower()
-    if any(x in k for x in ['phishing', 'cybercrime', 'data breach', 'ransomware']):
-        return 'Cyber Fraud'
-    elif any(x in k for x in ['embezzlement', 'corruption', 'money laundering']):
-        return 'Financial Fraud'
-    elif any(x in k for x in ['non-compliance', 'error', 'irregularity']):
-        return 'Compliance Issues'
+from fraud_scoring import classify_categories
+
+# The weekly report: four charts built from the scraped article CSV. Each chart is a
+# task that declares the columns it reads and the settings it draws with. A task is
+# skipped when the hash of its input columns and settings matches the last run and its
+# PNG is still there, so after a small data change only the affected charts are redrawn.
+# The rest run on a process pool, each worker getting only the columns its chart needs:
+#   python week_4_code.py --workers 4
+#   python week_4_code.py --force --only common_words_cloud
+
+DEFAULT_REPORT_STATE_PATH = ".report_state.json"
+
+# Bump when the drawing code changes, so every chart is redrawn once
+REPORT_VERSION = 1
+
+
+# --- CHARTS ---
+# Each one takes the frame of its declared columns, the task params and the output
+# path, draws with a standalone Figure (no pyplot state shared between tasks) and
+# returns a short line for the console
+def _figure(params):
+    from matplotlib.figure import Figure
+
+    return Figure(figsize=params.get("figsize", (6.4, 4.8)))
+
+
+def top_keywords_chart(df, params, path):
+    # Split and count all keywords
+    keywords = df['keywords_found'].dropna().str.split(',').explode().str.strip().str.lower()
+    top = keywords[keywords != ""].value_counts().head(params["top"])
+    top_pairs = list(zip(top.index, top.tolist()))
+
+    fig = _figure(params)
+    ax = fig.subplots()
+    ax.bar(top.index, top.to_numpy())
+    ax.set_title(f"Top {params['top']} Fraud-Related Keywords")
+    ax.set_xlabel("Keyword")
+    ax.set_ylabel("Frequency")
+    fig.tight_layout()
+    fig.savefig(path)
+    return f"Top {params['top']} Keywords: {top_pairs}"
+
+
+def trends_chart(df, params, path):
+    # Cyber / Financial / Compliance / Other, computed for the whole column at once
+    trend_counts = classify_categories(df['keywords_found']).value_counts()
+
+    fig = _figure(params)
+    ax = fig.subplots()
+    trend_counts.plot(kind='bar', color=params["color"], title='Top Fraud Trends', ax=ax)
+    ax.set_ylabel("Number of Articles")
+    fig.tight_layout()
+    fig.savefig(path)
+    return "Trends: " + ", ".join(f"{trend} {count}" for trend, count in trend_counts.items())
+
+
+def word_cloud_chart(df, params, path):
+    from wordcloud import WordCloud
+
+    text_all = " ".join(df['summary'].dropna())
+    wordcloud = WordCloud(
+        width=params["width"], height=params["height"], background_color=params["background"]
+    ).generate(text_all)
+
+    fig = _figure(params)
+    ax = fig.subplots()
+    ax.imshow(wordcloud, interpolation='bilinear')
+    ax.axis("off")
+    ax.set_title("Common Words in Fraud Summaries")
+    fig.savefig(path)
+    return f"Word cloud over {df['summary'].notna().sum()} summaries"
+
+
+def sentiment_chart(df, params, path):
+    from sentiment import fill_sentiment
+
+    # The scraper stores each summary's polarity; only older rows without one get scored here
+    sentiment = fill_sentiment(df.copy())['sentiment'].dropna()
+
+    fig = _figure(params)
+    ax = fig.subplots()
+    ax.hist(sentiment, bins=params["bins"], color='orange', edgecolor='black')
+    ax.set_title("Sentiment Distribution of Fraud Summaries")
+    ax.set_xlabel("Polarity (–1 = Negative, +1 = Positive)")
+    ax.set_ylabel("Count")
+    fig.savefig(path)
+    return f"Sentiment mean {sentiment.mean():.3f} over {len(sentiment)} summaries"
+
+
+# --- TASKS ---
+@dataclass
+class ChartTask:
+    name: str
+    output: str
+    columns: list      # the only CSV columns the chart reads
+    render: object     # render(df, params, path) -> console line
+    params: dict = field(default_factory=dict)
+
+    # Hash of everything the PNG depends on: the declared columns' values, the params
+    # and the report version. Columns missing from the CSV hash as absent
+    def input_hash(self, df):
+        digest = hashlib.sha256()
+        digest.update(json.dumps(
+            {"version": REPORT_VERSION, "columns": self.columns, "params": self.params}, sort_keys=True
+        ).encode("utf-8"))
+        present = [c for c in self.columns if c in df.columns]
+        digest.update(json.dumps(present).encode("utf-8"))
+        if present:
+            digest.update(pd.util.hash_pandas_object(df[present], index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+
+
+TASKS = [
+    ChartTask("top_5_keywords", "top_5_keywords.png", ["keywords_found"], top_keywords_chart, {"top": 5}),
+    ChartTask("top_trends", "top_trends.png", ["keywords_found"], trends_chart, {"color": "steelblue"}),
+    ChartTask(
+        "common_words_cloud", "common_words_cloud.png", ["summary"], word_cloud_chart,
+        {"width": 800, "height": 400, "background": "white"},
+    ),
+    ChartTask("sentiment_distribution", "sentiment_distribution.png", ["summary", "sentiment"], sentiment_chart, {"bins": 10}),
+]
+
+
+# --- REPORT STATE ---
+# task name -> input hash of the last successful render, written atomically like the
+# scraper checkpoint
+class ReportState:
+    def __init__(self, path):
+        self.path = path
+        self.hashes = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.hashes = json.load(f).get("hashes", {})
+
+    def is_current(self, task, input_hash, path):
+        return self.hashes.get(task.name) == input_hash and os.path.exists(path)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"hashes": self.hashes}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+# Runs in a worker process: draw one chart and time it
+def run_task(task, df, path):
+    start = time.perf_counter()
+    line = task.render(df, task.params, path)
+    return line, time.perf_counter() - start
+
+
+def load_columns(path, tasks):
+    wanted = sorted({c for task in tasks for c in task.columns})
+    header = pd.read_csv(path, nrows=0).columns
+    return pd.read_csv(path, usecols=[c for c in wanted if c in header])
+
+
+# Returns [(task name, status, seconds, console line)] in TASKS order
+def build_report(input_path, output_dir=".", workers=1, state_path=DEFAULT_REPORT_STATE_PATH, force=False, only=None):
+    tasks = [t for t in TASKS if not only or t.name in only]
+    df = load_columns(input_path, tasks)
+    print(f"Total fraud-related articles: {len(df)}")
+
+    state = ReportState(state_path)
+    results = {}
+    todo = []
+    for task in tasks:
+        path = os.path.join(output_dir, task.output)
+        input_hash = task.input_hash(df)
+        if not force and state.is_current(task, input_hash, path):
+            results[task.name] = ("skipped", 0.0, "unchanged")
+        else:
+            frame = df[[c for c in task.columns if c in df.columns]]
+            todo.append((task, frame, path, input_hash))
+
+    def finish(task, input_hash, outcome):
+        try:
+            line, seconds = outcome()
+        except Exception as e:
+            # One broken chart should not throw away the others; it stays out of the
+            # state file so the next run tries it again
+            results[task.name] = ("failed", 0.0, f"{type(e).__name__}: {e}")
+            return
+        state.hashes[task.name] = input_hash
+        results[task.name] = ("built", seconds, line)
+
+    if workers <= 1 or len(todo) <= 1:
+        for task, frame, path, input_hash in todo:
+            finish(task, input_hash, lambda: run_task(task, frame, path))
     else:
-        return 'Other'
-
-df['trend'] = df['keywords_found'].fillna('').apply(classify_trend)
-trend_counts = df['trend'].value_counts()
-print(trend_counts)
-
-trend_counts.plot(kind='bar', color='steelblue', title='Top Fraud Trends')
-plt.ylabel("Number of Articles")
-plt.tight_layout()
-plt.savefig("top_trends.png")
-plt.close()
-
-
-########
-
-from wordcloud import WordCloud
-
-text_all = " ".join(df['summary'].dropna())
-wordcloud = WordCloud(width=800, height=400, background_color='white').generate(text_all)
-
-plt.imshow(wordcloud, interpolation='bilinear')
-plt.axis("off")
-plt.title("Common Words in Fraud Summaries")
-plt.savefig("common_words_cloud.png")
-plt.close()
-
-
-######
-
-from textblob import TextBlob
-
-df['sentiment'] = df['summary'].dropna().apply(lambda x: TextBlob(str(x)).sentiment.polarity)
-print(df['sentiment'].describe())
-
-plt.hist(df['sentiment'], bins=10, color='orange', edgecolor='black')
-plt.title("Sentiment Distribution of Fraud Summaries")
-plt.xlabel("Polarity (–1 = Negative, +1 = Positive)")
-plt.ylabel("Count")
-plt.savefig("sentiment_distribution.png")
-
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            futures = [(task, input_hash, pool.submit(run_task, task, frame, path)) for task, frame, path, input_hash in todo]
+            for task, input_hash, future in futures:
+                finish(task, input_hash, future.result)
+    state.save()
+    return [(task.name, *results[task.name]) for task in tasks]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the weekly fraud report charts, redrawing only what changed")
+    parser.add_argument("--input", default="fraud_articles_summarized.csv", help="scraped article CSV")
+    parser.add_argument("--output-dir", default=".", help="where the PNGs are written")
+    parser.add_argument("--workers", type=int, default=2, help="processes drawing charts at once (1 = inline)")
+    parser.add_argument("--state", default=DEFAULT_REPORT_STATE_PATH, help="input hashes of the last run ('' to disable)")
+    parser.add_argument("--force", action="store_true", help="redraw every chart even if its inputs are unchanged")
+    parser.add_argument("--only", nargs="+", choices=[t.name for t in TASKS], help="only build these charts")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    results = build_report(args.input, args.output_dir, args.workers, args.state, args.force, args.only)
+
+    for name, status, seconds, line in results:
+        print(f"{name:<24} {status:<8} {seconds:6.2f}s  {line}")
+    built = sum(status == "built" for _, status, _, _ in results)
+    print(f"\n✅ Built {built} of {len(results)} charts in {time.perf_counter() - start:.2f}s")
+    if any(status == "failed" for _, status, _, _ in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()